@@ -0,0 +1,94 @@
+# ann_index.py
+# Pilihan tipe index FAISS saat build (Flat, IVF-Flat, HNSW, IVF-PQ, IVF-SQ8) dan parameter
+# pencarian saat query (nprobe untuk IVF, efSearch untuk HNSW).
+
+import json
+import math
+import os
+from typing import Dict, Optional
+
+import faiss
+import numpy as np
+
+INDEX_CONFIG_FILE = "index_config.json"
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq", "ivfsq8")
+
+DEFAULT_PARAMS = {
+    "nlist": None,          # None = otomatis ~4*sqrt(n)
+    "nprobe": 8,
+    "hnsw_m": 32,
+    "ef_construction": 200,
+    "ef_search": 64,
+    "pq_m": 16,
+    "pq_bits": 8,
+}
+
+
+def auto_nlist(n_vectors: int) -> int:
+    """Jumlah cluster IVF; FAISS butuh ~39 titik training per cluster"""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39 or 1))
+
+
+def factory_string(index_type: str, dim: int, n_vectors: int, params: Dict) -> str:
+    nlist = params.get("nlist") or auto_nlist(n_vectors)
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{params['hnsw_m']}"
+    if index_type == "ivfpq":
+        if dim % params["pq_m"]:
+            raise ValueError(f"❌ Dimensi {dim} harus habis dibagi pq_m={params['pq_m']}")
+        return f"IVF{nlist},PQ{params['pq_m']}x{params['pq_bits']}"
+    if index_type == "ivfsq8":
+        return f"IVF{nlist},SQ8"
+    raise ValueError(f"❌ Tipe index tidak dikenal: {index_type} (pilih: {', '.join(INDEX_TYPES)})")
+
+
+def build_ann_index(vectors: np.ndarray, index_type: str = "flat", **overrides):
+    """Bangun index FAISS (metric L2) dari matriks vektor; urutan baris = posisi di index"""
+    params = {**DEFAULT_PARAMS, **{k: v for k, v in overrides.items() if v is not None}}
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+    if index_type.startswith("ivf"):
+        params["nlist"] = params["nlist"] or auto_nlist(n_vectors)
+    spec = factory_string(index_type, dim, n_vectors, params)
+    index = faiss.index_factory(dim, spec)
+
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efConstruction = params["ef_construction"]
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = params["nprobe"]
+        # Direct map supaya reconstruct() tetap bisa dipakai (build incremental, MMR)
+        ivf.make_direct_map()
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = params["ef_search"]
+    return index, {"type": index_type, "factory": spec, **params}
+
+
+def search_parameters(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """SearchParameters per query (thread-safe, tidak mengubah index yang dipakai bersama)"""
+    if nprobe is not None and faiss.try_extract_index_ivf(index) is not None:
+        return faiss.SearchParametersIVF(nprobe=int(nprobe))
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search))
+    return None
+
+
+def save_index_config(index_dir: str, config: Dict):
+    with open(os.path.join(index_dir, INDEX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+
+def load_index_config(index_dir: str) -> Dict:
+    path = os.path.join(index_dir, INDEX_CONFIG_FILE)
+    if not os.path.exists(path):
+        return {"type": "flat"}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,357 @@
+# api_server.py
+# Mode API headless (asyncio + aiohttp) untuk aplikasi mobile: pipeline yang sama dengan main.py
+# (run_agent, FaissRetriever, ekstraksi PDF), tetapi retriever/embedding/LLM dipakai bersama semua
+# request, tiap layanan hulu punya batas konkurensi + antrean terbatas, dan jawaban di-stream
+# sebagai server-sent events.
+#
+#   python api_server.py --port 8080                 # Cohere + Gemini + Google (butuh .env)
+#   python api_server.py --stub --port 8080          # backend fake lokal untuk load test
+#
+#   POST /v1/chat       {"message", "session_id"?, "client_id"?, "stream"?: true}  -> SSE atau JSON
+#                       (riwayat disimpan per client_id opaque milik klien; tanpa client_id per session_id)
+#   POST /v1/documents  body PDF (header X-Session-Id)                       -> ringkasan dokumen
+#   GET  /healthz, GET /metrics
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import tempfile
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+from conversation_memory import ConversationMemory, make_llm_summarizer
+from document_index import build_document_index
+from llm_pool import get_llm_pool
+from main import GEMINI_MODEL, run_agent
+from mental_health_processor import extract_mental_health_document
+from retriever import DEFAULT_INDEX_PATH, FaissRetriever, create_cohere_embeddings
+from shard_registry import load_registry
+from search_service import GoogleSearchBackend, SearchService, set_search_service
+from token_utils import count_tokens
+from tools.save_history import client_key, get_history_store
+from tracing import get_tracer
+from upstream import LimitedEmbeddings, LimitedLLM, LimitedSearchBackend, UpstreamBusy, UpstreamLimiter
+
+DEFAULT_MAX_INFLIGHT = 32
+DEFAULT_MAX_QUEUE = 128
+MAX_SESSIONS = 10000
+MAX_PDF_BYTES = 20 * 1024 * 1024
+
+
+class RequestGate:
+    """Admission control: maks `max_inflight` request diproses, maks `max_queue` menunggu, sisanya 503"""
+
+    def __init__(self, max_inflight: int, max_queue: int):
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_inflight)
+        self.waiting = 0
+        self.rejected = 0
+
+    async def __aenter__(self):
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise UpstreamBusy("api", "antrean request penuh")
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
+
+
+class SSECallbackHandler(BaseCallbackHandler):
+    """Teruskan token LLM dari thread worker ke antrean asyncio request"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, events: asyncio.Queue):
+        self.loop = loop
+        self.events = events
+        self.streamed = False
+        # Satu chunk stream bisa berisi banyak token: token dihitung dengan tokenizer
+        self.token_count = 0
+        self.chunk_count = 0
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if not token:
+            return
+        self.streamed = True
+        self.token_count += count_tokens(token)
+        self.chunk_count += 1
+        self.loop.call_soon_threadsafe(self.events.put_nowait, ("token", token))
+
+    def on_notice(self, message: str) -> None:
+        self.loop.call_soon_threadsafe(self.events.put_nowait, ("notice", message))
+
+
+class Session:
+    __slots__ = ("memory", "pdf_index", "lock")
+
+    def __init__(self, memory: ConversationMemory):
+        self.memory = memory
+        self.pdf_index = None
+        self.lock = asyncio.Lock()
+
+
+class ChatAPI:
+    """Resource bersama untuk semua request: retriever, LLM, layanan pencarian, limiter, dan sesi"""
+
+    def __init__(self, retriever: FaissRetriever, llm, limiters: Dict[str, UpstreamLimiter],
+                 max_inflight: int = DEFAULT_MAX_INFLIGHT, max_queue: int = DEFAULT_MAX_QUEUE):
+        self.retriever = retriever
+        self.llm = llm
+        self.limiters = limiters
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        # Thread worker untuk pipeline sinkron; jumlahnya = request yang boleh diproses bersamaan
+        self.executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="api-worker")
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.history = get_history_store()
+        self.gate: Optional[RequestGate] = None
+
+    def session(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = Session(ConversationMemory(summarizer=make_llm_summarizer(self.llm)))
+            while len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+        self.sessions.move_to_end(session_id)
+        return session
+
+    async def on_startup(self, app: web.Application):
+        self.gate = RequestGate(self.max_inflight, self.max_queue)
+
+    @staticmethod
+    def busy(error: UpstreamBusy) -> web.Response:
+        return web.json_response({"error": str(error), "upstream": error.name}, status=503,
+                                 headers={"Retry-After": "1"})
+
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            return web.json_response({"error": "Body harus JSON"}, status=400)
+        message = str(body.get("message", "")).strip()
+        if not message:
+            return web.json_response({"error": "Field 'message' wajib diisi"}, status=400)
+        session_id = str(body.get("session_id") or uuid.uuid4().hex)
+        # Kunci riwayat per klien, tidak pernah satu konstanta bersama untuk semua klien API
+        user = client_key(str(body.get("client_id") or session_id))
+        stream = bool(body.get("stream", True))
+
+        try:
+            async with self.gate:
+                session = self.session(session_id)
+                async with session.lock:
+                    return await self._answer(request, session, session_id, user, message, stream)
+        except UpstreamBusy as e:
+            return self.busy(e)
+
+    async def _answer(self, request: web.Request, session: Session, session_id: str, user: str,
+                      message: str, stream: bool) -> web.StreamResponse:
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        handler = SSECallbackHandler(loop, events)
+        history = session.memory.context()
+        session.memory.add("user", message)
+        self.history.append(user, session_id, "user", message)
+
+        future = loop.run_in_executor(self.executor, partial(
+            run_agent, message, self.retriever, callback_handler=handler, stream=stream,
+            pdf_index=session.pdf_index, llm=self.llm, history=history
+        ))
+
+        if not stream:
+            try:
+                answer = await future
+            except UpstreamBusy as e:
+                return self.busy(e)
+            session.memory.add("assistant", answer)
+            self.history.append(user, session_id, "assistant", answer)
+            return web.json_response({"session_id": session_id, "answer": answer})
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Session-Id": session_id,
+        })
+        await response.prepare(request)
+        future.add_done_callback(lambda _: events.put_nowait(("done", None)))
+
+        async def send(event: str, data: Dict[str, Any]):
+            await response.write(f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        try:
+            while True:
+                kind, token = await events.get()
+                if kind == "token":
+                    await send("token", {"token": token})
+                    continue
+                if kind == "notice":
+                    await send("notice", {"message": token})
+                    continue
+                break
+            try:
+                answer = future.result()
+            except UpstreamBusy as e:
+                await send("error", {"error": str(e), "upstream": e.name, "retry_after": 1})
+                return response
+            except Exception as e:
+                await send("error", {"error": f"Kesalahan pipeline: {str(e)}"})
+                return response
+            if not handler.streamed:
+                # Jawaban dari cache semantik / fallback pencarian tidak lewat token LLM
+                await send("token", {"token": answer})
+            session.memory.add("assistant", answer)
+            self.history.append(user, session_id, "assistant", answer)
+            await send("done", {"session_id": session_id, "answer": answer, "tokens": handler.token_count,
+                                "chunks": handler.chunk_count})
+        except ConnectionResetError:
+            # Klien putus; pipeline di thread worker tetap selesai dan hasilnya dibuang
+            pass
+        return response
+
+    async def documents(self, request: web.Request) -> web.Response:
+        session_id = request.headers.get("X-Session-Id") or request.query.get("session_id") or uuid.uuid4().hex
+        data = await request.read()
+        if not data:
+            return web.json_response({"error": "Body PDF kosong"}, status=400)
+        if len(data) > MAX_PDF_BYTES:
+            return web.json_response({"error": "Dokumen terlalu besar"}, status=413)
+
+        loop = asyncio.get_running_loop()
+        session = self.session(session_id)
+
+        def process():
+            with self.limiters["pdf"].slot():
+                result = extract_mental_health_document(io.BytesIO(data))
+            if "error" in result:
+                return result, None
+            return result, build_document_index(result["full_text"], self.retriever.embeddings, session.pdf_index)
+
+        try:
+            async with self.gate:
+                result, pdf_index = await loop.run_in_executor(self.executor, process)
+        except UpstreamBusy as e:
+            return self.busy(e)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=422)
+        if pdf_index is None:
+            return web.json_response({"error": result["error"]}, status=422)
+        session.pdf_index = pdf_index
+        return web.json_response({"session_id": session_id, "summary": result.get("summary", ""),
+                                  "content_hash": result.get("content_hash")})
+
+    async def healthz(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "index_version": list(self.retriever.version)})
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        lines = [get_tracer().prometheus_text().rstrip("\n"),
+                 "# TYPE kindora_upstream_active gauge", "# TYPE kindora_upstream_waiting gauge",
+                 "# TYPE kindora_upstream_rejected_total counter"]
+        for name, limiter in sorted(self.limiters.items()):
+            stats = limiter.stats()
+            lines.append(f'kindora_upstream_active{{upstream="{name}"}} {stats["active"]}')
+            lines.append(f'kindora_upstream_waiting{{upstream="{name}"}} {stats["waiting"]}')
+            lines.append(f'kindora_upstream_rejected_total{{upstream="{name}"}} {stats["rejected"]}')
+        if self.gate is not None:
+            lines.append(f"kindora_api_waiting {self.gate.waiting}")
+            lines.append(f"kindora_api_rejected_total {self.gate.rejected}")
+        lines.append(f"kindora_api_sessions {len(self.sessions)}")
+        return web.Response(text="\n".join(lines) + "\n", content_type="text/plain")
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=MAX_PDF_BYTES + 1024)
+        app.on_startup.append(self.on_startup)
+        app.add_routes([
+            web.post("/v1/chat", self.chat),
+            web.post("/v1/documents", self.documents),
+            web.get("/healthz", self.healthz),
+            web.get("/metrics", self.metrics),
+        ])
+        return app
+
+
+def make_limiters(args) -> Dict[str, UpstreamLimiter]:
+    return {
+        "embed": UpstreamLimiter("embed", args.embed_limit, max_queue=args.upstream_queue),
+        "llm": UpstreamLimiter("llm", args.llm_limit, max_queue=args.upstream_queue),
+        "search": UpstreamLimiter("search", args.search_limit, max_queue=args.upstream_queue),
+        "pdf": UpstreamLimiter("pdf", args.pdf_limit, max_queue=args.upstream_queue),
+    }
+
+
+def build_api(args) -> ChatAPI:
+    """Rakit resource bersama: backend asli (Cohere/Gemini/Google) atau stub lokal (--stub)"""
+    load_dotenv()
+    limiters = make_limiters(args)
+
+    if args.stub:
+        from benchmarks.fakes import FakeChatModel, FakeEmbeddings, FakeSearchBackend
+        from create_index import create_faiss_index
+
+        embeddings = FakeEmbeddings(latency=args.stub_embed_latency)
+        llm = FakeChatModel(first_token_latency=args.stub_llm_ttft, token_latency=args.stub_llm_token_latency)
+        search_backend = FakeSearchBackend(latency=args.stub_search_latency)
+        index_path = args.index
+        if index_path is None and not args.shards:
+            # Vektor fake tidak cocok dengan index Cohere, jadi index stub dibangun sendiri
+            index_path = os.path.join(tempfile.mkdtemp(prefix="kindora-stub-"), "faiss_index")
+            create_faiss_index(incremental=False, index_dir=index_path,
+                               embeddings=FakeEmbeddings(latency=0.0), requests_per_second=1000.0)
+    else:
+        api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("❌ GOOGLE_API_KEY / GEMINI_API_KEY tidak ditemukan di .env")
+        cohere_api_key = os.getenv("COHERE_API_KEY")
+        if not cohere_api_key:
+            raise ValueError("❌ COHERE_API_KEY tidak ditemukan di .env")
+        embeddings = create_cohere_embeddings(cohere_api_key)
+        llm = get_llm_pool().get(api_key, GEMINI_MODEL, temperature=0.2)
+        search_backend = GoogleSearchBackend()
+        index_path = args.index or DEFAULT_INDEX_PATH
+
+    shards = load_registry(args.shards) if args.shards else None
+    retriever = FaissRetriever(index_path=index_path, embeddings=LimitedEmbeddings(embeddings, limiters["embed"]),
+                               shards=shards)
+    set_search_service(SearchService([LimitedSearchBackend(search_backend, limiters["search"])]))
+    return ChatAPI(retriever, LimitedLLM(llm, limiters["llm"]), limiters,
+                   max_inflight=args.max_inflight, max_queue=args.max_queue)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Kindora chat API (asyncio + SSE)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--index", help=f"Folder index FAISS (default {DEFAULT_INDEX_PATH})")
+    parser.add_argument("--shards", default=os.getenv("KINDORA_SHARDS"),
+                        help="Registry JSON beberapa index bernama (menggantikan --index)")
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT, help="Request diproses bersamaan")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE, help="Request menunggu sebelum 503")
+    parser.add_argument("--embed-limit", type=int, default=8, help="Panggilan embedding bersamaan")
+    parser.add_argument("--llm-limit", type=int, default=16, help="Panggilan LLM bersamaan")
+    parser.add_argument("--search-limit", type=int, default=4, help="Pencarian web bersamaan")
+    parser.add_argument("--pdf-limit", type=int, default=2, help="Ekstraksi PDF bersamaan")
+    parser.add_argument("--upstream-queue", type=int, default=64, help="Antrean maks per layanan hulu")
+    parser.add_argument("--stub", action="store_true", help="Pakai backend fake (tanpa API key/jaringan)")
+    parser.add_argument("--stub-embed-latency", type=float, default=0.05)
+    parser.add_argument("--stub-llm-ttft", type=float, default=0.3)
+    parser.add_argument("--stub-llm-token-latency", type=float, default=0.01)
+    parser.add_argument("--stub-search-latency", type=float, default=0.3)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    api = build_api(args)
+    web.run_app(api.make_app(), host=args.host, port=args.port)
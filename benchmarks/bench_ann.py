@@ -0,0 +1,132 @@
+# benchmarks/bench_ann.py
+# Recall@k vs index exact (Flat), latensi query p50/p99, dan ukuran disk/RAM untuk tiap tipe index.
+#
+#   python -m benchmarks.bench_ann --index data/faiss_index            # vektor dari index yang ada
+#   python -m benchmarks.bench_ann --synthetic 100000 --dim 1024       # korpus sintetis
+#   python -m benchmarks.bench_ann --synthetic 50000 --json ann.json   # simpan hasil untuk dibandingkan
+
+import argparse
+import json
+import os
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import build_ann_index
+from index_pointer import resolve_index_dir
+
+
+def rss_bytes() -> int:
+    """RSS proses saat ini (Linux); 0 kalau tidak tersedia"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def load_vectors(index_dir: str) -> np.ndarray:
+    index = faiss.read_index(os.path.join(resolve_index_dir(index_dir), "index.faiss"))
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 64, seed: int = 7) -> np.ndarray:
+    """Vektor ternormalisasi yang berkelompok (lebih mirip embedding asli daripada noise seragam)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=n)] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def make_queries(vectors: np.ndarray, n_queries: int, seed: int = 11) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.integers(0, len(vectors), size=n_queries)]
+    queries = picked + 0.1 * rng.normal(size=picked.shape).astype(np.float32)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def measure(index, queries: np.ndarray, truth: np.ndarray, k: int, params=None) -> dict:
+    latencies, recalls = [], []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        if params is not None:
+            _, found = index.search(query.reshape(1, -1), k, params=params)
+        else:
+            _, found = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(set(found[0]) & set(truth[i])) / k)
+    return {
+        "recall_at_k": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run(vectors: np.ndarray, n_queries: int, k: int, index_types, nprobes, ef_searches):
+    queries = make_queries(vectors, n_queries)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for index_type in index_types:
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        index, config = build_ann_index(vectors, index_type)
+        build_seconds = time.perf_counter() - start
+        disk_bytes = int(faiss.serialize_index(index).size)
+        ram_bytes = max(rss_bytes() - rss_before, 0)
+
+        if index_type.startswith("ivf"):
+            sweep = [("nprobe", value, faiss.SearchParametersIVF(nprobe=value)) for value in nprobes]
+        elif index_type == "hnsw":
+            sweep = [("efSearch", value, faiss.SearchParametersHNSW(efSearch=value)) for value in ef_searches]
+        else:
+            sweep = [(None, None, None)]
+
+        for knob, value, params in sweep:
+            row = {
+                "index": index_type,
+                "factory": config["factory"],
+                "knob": f"{knob}={value}" if knob else "-",
+                "build_s": round(build_seconds, 3),
+                "disk_mb": round(disk_bytes / 1e6, 2),
+                "ram_mb": round(ram_bytes / 1e6, 2),
+                **measure(index, queries, truth, k, params),
+            }
+            results.append(row)
+        del index
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tipe index ANN: recall vs latensi vs ukuran")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--index", default="data/faiss_index", help="Folder index FAISS yang sudah ada")
+    source.add_argument("--synthetic", type=int, help="Jumlah vektor sintetis")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=["flat", "ivf", "hnsw", "ivfpq", "ivfsq8"])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--json", help="Simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.synthetic, args.dim) if args.synthetic else load_vectors(args.index)
+    print(f"📦 {len(vectors)} vektor, dimensi {vectors.shape[1]}, {args.queries} query, k={args.k}")
+    rows = run(vectors, args.queries, args.k, args.types, args.nprobe, args.ef_search)
+
+    header = f"{'index':<8} {'knob':<13} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} {'disk MB':>8} {'RAM MB':>8} {'build s':>8}"
+    print(header)
+    for row in rows:
+        print(f"{row['index']:<8} {row['knob']:<13} {row['recall_at_k']:>9.3f} {row['p50_ms']:>8.3f} "
+              f"{row['p99_ms']:>8.3f} {row['disk_mb']:>8.2f} {row['ram_mb']:>8.2f} {row['build_s']:>8.2f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,106 @@
+# benchmarks/bench_coalescer.py
+# Load test embedding query dengan banyak user bersamaan terhadap fake embedding server lokal
+# (kompatibel /v1/embed Cohere, lewat client Cohere asli): satu request HTTP per query vs
+# EmbeddingCoalescer (micro-batch + dedupe in-flight). Dilaporkan jumlah request ke server,
+# ukuran batch, delay antrean tambahan, latensi p50/p95/p99, dan throughput.
+#
+#   python -m benchmarks.bench_coalescer
+#   python -m benchmarks.bench_coalescer --users 64 --queries 20 --latency-ms 80 --window-ms 2 5 10
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.fake_embedding_server import start_server
+from embedding_cache import CachedEmbeddings, QueryEmbeddingCache
+from embedding_coalescer import EmbeddingCoalescer, query_batch_embedder
+
+TOPICS = ["depresi", "kecemasan", "insomnia", "stres kerja", "serangan panik", "burnout", "trauma",
+          "kesepian", "overthinking", "gangguan makan", "bipolar", "duka"]
+
+
+def make_queries(users: int, per_user: int, duplicate_ratio: float, seed: int = 7):
+    """Query per user; sebagian memakai pertanyaan populer yang sama (duplikat antar sesi)"""
+    rng = random.Random(seed)
+    popular = [f"apa itu {topic}?" for topic in TOPICS]
+    return [[rng.choice(popular) if rng.random() < duplicate_ratio
+             else f"bagaimana cara mengatasi {rng.choice(TOPICS)} ({user}-{i})" for i in range(per_user)]
+            for user in range(users)]
+
+
+def run_load(embeddings: CachedEmbeddings, workload) -> dict:
+    latencies = []
+
+    def user(queries):
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            embeddings.embed_query(query)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(workload)) as pool:
+        for samples in pool.map(user, workload):
+            latencies.extend(samples)
+    wall = time.perf_counter() - start
+    arr = np.asarray(latencies) * 1000
+    return {"queries": len(latencies), "wall_s": round(wall, 3), "qps": round(len(latencies) / wall, 1),
+            "p50_ms": round(float(np.percentile(arr, 50)), 2), "p95_ms": round(float(np.percentile(arr, 95)), 2),
+            "p99_ms": round(float(np.percentile(arr, 99)), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test micro-batching embedding query")
+    parser.add_argument("--users", type=int, default=32, help="User bersamaan")
+    parser.add_argument("--queries", type=int, default=10, help="Query per user")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3, help="Porsi pertanyaan populer (duplikat)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latensi fake server per request")
+    parser.add_argument("--window-ms", nargs="+", type=float, default=[2.0, 5.0, 10.0])
+    parser.add_argument("--max-batch", type=int, default=96)
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    server = start_server(latency_ms=args.latency_ms)
+    os.environ["COHERE_BASE_URL"] = server.url
+    os.environ.setdefault("COHERE_API_KEY", "dummy")
+    from retriever import EMBEDDING_MODEL, create_cohere_embeddings
+    base = create_cohere_embeddings("dummy")
+    workload = make_queries(args.users, args.queries, args.duplicate_ratio)
+    report = {"params": {k: v for k, v in vars(args).items() if k != "output"}}
+
+    def server_delta(before):
+        after = server.stats()
+        requests = after["requests"] - before["requests"]
+        texts = after["texts"] - before["texts"]
+        return {"server_requests": requests, "server_texts": texts,
+                "server_avg_batch": round(texts / requests, 2) if requests else 0.0}
+
+    # Tanpa coalescer: tiap cache miss = satu request HTTP satu teks (perilaku lama)
+    before = server.stats()
+    embeddings = CachedEmbeddings(base, QueryEmbeddingCache(cache_dir=None), EMBEDDING_MODEL)
+    report["direct"] = {**run_load(embeddings, workload), **server_delta(before)}
+
+    for window_ms in args.window_ms:
+        before = server.stats()
+        coalescer = EmbeddingCoalescer(query_batch_embedder(base), window_ms=window_ms, max_batch=args.max_batch)
+        embeddings = CachedEmbeddings(base, QueryEmbeddingCache(cache_dir=None), EMBEDDING_MODEL, coalescer)
+        result = {**run_load(embeddings, workload), **server_delta(before)}
+        result["coalescer"] = coalescer.stats()
+        report[f"coalesced_{window_ms:g}ms"] = result
+
+    server.shutdown()
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Hasil disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
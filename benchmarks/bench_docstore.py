@@ -0,0 +1,134 @@
+# benchmarks/bench_docstore.py
+# Docstore pickle (index.pkl) vs docstore memory-mapped (doc_store.py): waktu load, tambahan RSS
+# setelah load, dan latensi mengambil k dokumen hasil pencarian. Tiap format diukur di proses baru
+# supaya RSS dan cache Python tidak tercampur. Korpus = FAQ yang direplikasi seperti bench_pipeline.
+# Waktu load dan RSS mencakup index.faiss yang sama untuk kedua format; selisihnya = docstore.
+# Butuh /proc/self/status (Linux) untuk rincian RSS.
+#
+#   python -m benchmarks.bench_docstore
+#   python -m benchmarks.bench_docstore --scales 1 10 100 --runs 5 --output docstore.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+from benchmarks.bench_pipeline import write_corpus
+from benchmarks.fakes import FakeEmbeddings
+from create_index import CSV_PATH, create_faiss_index
+from doc_store import PICKLE_FILE, MmapDocstore
+from index_pointer import resolve_index_dir
+
+# Mencetak satu baris JSON: waktu load docstore, tambahan RSS, latensi ambil k dokumen. RSS dipisah
+# anon (objek Python, memori privat) dan file (halaman mmap; page cache bersama yang bisa di-reclaim).
+LOAD_SCRIPT = """
+import json, random, time
+from retriever import _load_vectorstore
+
+def rss_mb():
+    rss = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("RssAnon:", "RssFile:")):
+                rss[line.split(":")[0][3:].lower()] = int(line.split()[1]) / 1024
+    return rss
+
+def delta(after, before):
+    return {key: after[key] - before[key] for key in before}
+
+before = rss_mb()
+start = time.perf_counter()
+vectorstore = _load_vectorstore(%r, None)
+load_ms = (time.perf_counter() - start) * 1000
+loaded = delta(rss_mb(), before)
+
+rng = random.Random(1)
+total = len(vectorstore.index_to_docstore_id)
+lookups = []
+for _ in range(%d):
+    start = time.perf_counter()
+    docs = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[rng.randrange(total)]) for _ in range(%d)]
+    lookups.append((time.perf_counter() - start) * 1000)
+after = delta(rss_mb(), before)
+print(json.dumps({"load_ms": load_ms, "rss_anon_load_mb": loaded["anon"], "rss_file_load_mb": loaded["file"],
+                  "rss_anon_after_lookups_mb": after["anon"], "rss_file_after_lookups_mb": after["file"],
+                  "first_lookup_ms": lookups[0], "lookup_ms": sorted(lookups)[len(lookups) // 2]}))
+"""
+
+
+def build_formats(csv_path: str, work_dir: str):
+    """Index mmap hasil create_index.py + salinan dengan index.pkl (format lama save_local LangChain)"""
+    mmap_dir = os.path.join(work_dir, "mmap")
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_faiss_index(incremental=False, csv_path=csv_path, index_dir=mmap_dir,
+                           embeddings=FakeEmbeddings(latency=0.0), requests_per_second=1000.0)
+    mmap_dir = resolve_index_dir(mmap_dir)
+    pickle_dir = os.path.join(work_dir, "pickle")
+    os.makedirs(pickle_dir)
+    shutil.copy(os.path.join(mmap_dir, "index.faiss"), pickle_dir)
+    store = MmapDocstore(mmap_dir)
+    ids = {row: store.id_at(row) for row in range(len(store))}
+    docstore = InMemoryDocstore({doc_id: store.document(row) for row, doc_id in ids.items()})
+    with open(os.path.join(pickle_dir, PICKLE_FILE), "wb") as f:
+        pickle.dump((docstore, ids), f)
+    sizes = {
+        "pickle_bytes": os.path.getsize(os.path.join(pickle_dir, PICKLE_FILE)),
+        "mmap_bytes": sum(os.path.getsize(os.path.join(mmap_dir, name)) for name in os.listdir(mmap_dir)
+                          if name.startswith("docstore_")),
+    }
+    return {"pickle": pickle_dir, "mmap": mmap_dir}, len(store), sizes
+
+
+def run_child(index_dir: str, lookups: int, k: int) -> dict:
+    result = subprocess.run([sys.executable, "-c", LOAD_SCRIPT % (index_dir, lookups, k)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"❌ Proses benchmark gagal:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark docstore pickle vs memory-mapped")
+    parser.add_argument("--csv", default=CSV_PATH, help="Sumber FAQ yang direplikasi")
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10, 100], help="Ukuran korpus (kelipatan FAQ)")
+    parser.add_argument("--runs", type=int, default=3, help="Proses baru per format")
+    parser.add_argument("--lookups", type=int, default=200, help="Jumlah pengambilan k dokumen")
+    parser.add_argument("-k", type=int, default=3, help="Dokumen per pengambilan (hasil pencarian)")
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    report = {"params": {k: v for k, v in vars(args).items() if k != "output"}, "scales": {}}
+    work_dir = tempfile.mkdtemp(prefix="kindora-docstore-")
+    try:
+        for scale in args.scales:
+            scale_dir = os.path.join(work_dir, f"x{scale}")
+            os.makedirs(scale_dir)
+            corpus_csv = os.path.join(scale_dir, "faq.csv")
+            write_corpus(args.csv, corpus_csv, scale)
+            dirs, documents, sizes = build_formats(corpus_csv, scale_dir)
+            result = report["scales"][f"x{scale}"] = {"documents": documents, **sizes}
+            for name, index_dir in dirs.items():
+                samples = [run_child(index_dir, args.lookups, args.k) for _ in range(args.runs)]
+                result[name] = {metric: round(float(np.median([s[metric] for s in samples])), 3)
+                                for metric in samples[0]}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Hasil disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
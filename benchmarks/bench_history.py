@@ -0,0 +1,95 @@
+# benchmarks/bench_history.py
+# Throughput append ChatHistoryStore (latensi di thread pemanggil vs waktu sampai tersimpan),
+# pemuatan N giliran terakhir dengan banyak user, compaction, dan perbandingan dengan dump JSON lama.
+#
+#   python -m benchmarks.bench_history
+#   python -m benchmarks.bench_history --users 1000 --turns 50
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from tools.save_history import ChatHistoryStore
+
+
+def legacy_dump_seconds(turns: int, directory: str) -> float:
+    """Perilaku lama: tiap simpan menulis ulang seluruh riwayat ke file JSON baru"""
+    messages, start = [], time.perf_counter()
+    for i in range(turns):
+        messages.append({"role": "user" if i % 2 == 0 else "assistant", "content": f"pesan {i} " * 20})
+        with open(os.path.join(directory, f"chat_history_{i}.json"), "w") as f:
+            json.dump(messages, f, indent=2)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ChatHistoryStore")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=50, help="Giliran per user")
+    parser.add_argument("--legacy-turns", type=int, default=300, help="Giliran untuk simulasi dump JSON lama")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="kindora-history-")
+    try:
+        store = ChatHistoryStore(os.path.join(work_dir, "history.sqlite"))
+        total = args.users * args.turns
+        base_ts = time.time() - 90 * 86400
+        append_latencies = []
+        start = time.perf_counter()
+        for i in range(total):
+            user = f"user{i % args.users}"
+            t0 = time.perf_counter()
+            # Setengah user punya sesi lama (kandidat compaction)
+            ts = base_ts + i if i % args.users < args.users // 2 else None
+            store.append(user, f"{user}-s{i // (args.users * 10)}", "user" if i % 2 == 0 else "assistant",
+                         f"pesan nomor {i} tentang rasa cemas", ts=ts)
+            append_latencies.append(time.perf_counter() - t0)
+        enqueue_seconds = time.perf_counter() - start
+        store.flush(timeout=120)
+        durable_seconds = time.perf_counter() - start
+
+        load_latencies = []
+        for u in range(0, args.users, max(1, args.users // 50)):
+            t0 = time.perf_counter()
+            store.load_last_turns(f"user{u}", 10)
+            load_latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        compacted = store.compact(older_than_days=30)
+        compact_seconds = time.perf_counter() - t0
+        reload_after_compact = len(store.load_last_turns("user0", 10))
+        store.close()
+
+        legacy_dir = os.path.join(work_dir, "legacy")
+        os.makedirs(legacy_dir)
+        legacy_seconds = legacy_dump_seconds(args.legacy_turns, legacy_dir)
+        legacy_bytes = sum(os.path.getsize(os.path.join(legacy_dir, name)) for name in os.listdir(legacy_dir))
+
+        append_ms = np.asarray(append_latencies) * 1000
+        load_ms = np.asarray(load_latencies) * 1000
+        report = {
+            "appends": total,
+            "append_p50_ms": round(float(np.percentile(append_ms, 50)), 4),
+            "append_p99_ms": round(float(np.percentile(append_ms, 99)), 4),
+            "enqueue_per_sec": round(total / enqueue_seconds, 1),
+            "durable_per_sec": round(total / durable_seconds, 1),
+            "load_last_10_p50_ms": round(float(np.percentile(load_ms, 50)), 3),
+            "load_last_10_p99_ms": round(float(np.percentile(load_ms, 99)), 3),
+            "compacted_sessions": compacted,
+            "compact_seconds": round(compact_seconds, 3),
+            "reload_after_compact": reload_after_compact,
+            "legacy": {"turns": args.legacy_turns, "seconds": round(legacy_seconds, 3),
+                       "files": args.legacy_turns, "bytes": legacy_bytes},
+        }
+        print(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
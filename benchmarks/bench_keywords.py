@@ -0,0 +1,99 @@
+# benchmarks/bench_keywords.py
+# Benchmark pass keyword MentalHealthDocumentProcessor pada dokumen sintetis besar:
+# cara lama (satu scan per keyword) vs KeywordMatcher (satu scan untuk semua keyword).
+#
+#   python -m benchmarks.bench_keywords --pages 200 --words-per-page 600
+
+import argparse
+import random
+import re
+import time
+
+from mental_health_processor import DEFAULT_MENTAL_HEALTH_KEYWORDS, MentalHealthDocumentProcessor
+
+FILLER = (
+    "pasien keluarga kondisi tidur makan kerja sekolah teman perasaan pikiran "
+    "the patient reported feeling tired during the week and talked with family"
+).split()
+
+
+def synthetic_pages(pages: int, words_per_page: int, keyword_rate: float, seed: int = 42):
+    rng = random.Random(seed)
+    result = []
+    for _ in range(pages):
+        words = []
+        for i in range(words_per_page):
+            words.append(rng.choice(DEFAULT_MENTAL_HEALTH_KEYWORDS) if rng.random() < keyword_rate else rng.choice(FILLER))
+            if i % 15 == 14:
+                words[-1] += "."
+            if i % 90 == 89:
+                words[-1] += "\n"
+        result.append(" ".join(words))
+    return result
+
+
+def legacy_keyword_pass(pages, keywords):
+    """Salinan logika lama: setiap fungsi memindai ulang teks sekali per keyword"""
+    def is_relevant(text):
+        text_lower = text.lower()
+        return any(keyword in text_lower for keyword in keywords)
+
+    def summarize(page_text):
+        sentences = re.split(r'(?<=[.!?])\s+', page_text)
+        relevant = [s for s in sentences if any(k.lower() in s.lower() for k in keywords)]
+        return " ".join(relevant[:3]) + "..." if relevant else ""
+
+    def highlight(text):
+        for keyword in keywords:
+            text = re.compile(re.escape(keyword), re.IGNORECASE).sub(f"**{keyword.upper()}**", text)
+        return text
+
+    def summary(text):
+        return [p for p in text.split('\n') if p.strip() and is_relevant(p)][:3]
+
+    full_text = ""
+    page_summaries = {}
+    for i, page_text in enumerate(pages):
+        full_text += page_text + "\n"
+        if is_relevant(page_text):
+            page_summaries[i + 1] = summarize(page_text)
+    return highlight(full_text), summary(full_text), page_summaries
+
+
+def single_pass_keyword_pass(pages, processor):
+    parts, hits, offset, page_summaries = [], [], 0, {}
+    for i, page_text in enumerate(pages):
+        parts.append(page_text + "\n")
+        page_hits = processor.matcher.scan(page_text)
+        if page_hits:
+            page_summaries[i + 1] = processor._summarize_page(page_text, page_hits)
+            hits.extend((s + offset, e + offset, k) for s, e, k in page_hits)
+        offset += len(page_text) + 1
+    full_text = "".join(parts)
+    return processor._highlight_keywords(full_text, hits), processor._generate_summary(full_text, hits), page_summaries
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark keyword pass pada dokumen sintetis")
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 200, 1000])
+    parser.add_argument("--words-per-page", type=int, default=600)
+    parser.add_argument("--keyword-rate", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    processor = MentalHealthDocumentProcessor()
+    print(f"{'halaman':>8} {'lama (ms)':>12} {'single-pass (ms)':>17} {'speedup':>8}")
+    for page_count in args.pages:
+        pages = synthetic_pages(page_count, args.words_per_page, args.keyword_rate)
+        legacy = best_of(lambda: legacy_keyword_pass(pages, processor.mental_health_keywords), args.repeat)
+        single = best_of(lambda: single_pass_keyword_pass(pages, processor), args.repeat)
+        print(f"{page_count:>8} {legacy * 1000:>12.1f} {single * 1000:>17.1f} {legacy / single:>7.1f}x")
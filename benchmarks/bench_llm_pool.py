@@ -0,0 +1,64 @@
+# benchmarks/bench_llm_pool.py
+# Biaya setup per pesan: cara lama (ChatGoogleGenerativeAI + 5 Tool baru tiap pesan) dibandingkan
+# pool client (Tool yang tidak dipakai agent tidak dibuat lagi). Tidak memanggil jaringan (API key dummy).
+#
+#   python -m benchmarks.bench_llm_pool --messages 200
+
+import argparse
+import json
+import time
+
+import numpy as np
+from langchain_core.tools import Tool
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from llm_pool import LLMClientPool
+
+DUMMY_KEY = "AIza" + "x" * 35
+
+
+def legacy_setup(retriever):
+    tools = [Tool(name=f"tool_{i}", func=lambda q, i=i: f"{i}:{q}:{retriever}", description="-") for i in range(5)]
+    llm = ChatGoogleGenerativeAI(model="gemini-1.5-flash", google_api_key=DUMMY_KEY, temperature=0.2,
+                                 convert_system_message_to_human=True)
+    return llm, tools
+
+
+def pooled_setup(pool: LLMClientPool):
+    return pool.get(DUMMY_KEY, "gemini-1.5-flash", temperature=0.2)
+
+
+class _Retriever:
+    pass
+
+
+def measure(fn, n: int) -> dict:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    values = np.asarray(samples)
+    return {"p50_ms": round(float(np.percentile(values, 50)), 4),
+            "p99_ms": round(float(np.percentile(values, 99)), 4),
+            "total_ms": round(float(values.sum()), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark setup client LLM per pesan")
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+
+    retriever = _Retriever()
+    pool = LLMClientPool()
+    report = {
+        "messages": args.messages,
+        "per_message_construction": measure(lambda: legacy_setup(retriever), args.messages),
+        "pooled": measure(lambda: pooled_setup(pool), args.messages),
+        "pool": pool.stats(),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
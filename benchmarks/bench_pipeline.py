@@ -0,0 +1,397 @@
+# benchmarks/bench_pipeline.py
+# Benchmark end-to-end pipeline chat secara offline: build index, retrieval, ekstraksi PDF,
+# run_agent dengan beberapa sesi paralel, dan recall@k FAQ. Cohere/Gemini/Google diganti fake
+# (benchmarks/fakes.py) dengan latensi yang bisa diatur, jadi tidak butuh API key atau jaringan.
+#
+#   python -m benchmarks.bench_pipeline --quick                        # smoke test cepat
+#   python -m benchmarks.bench_pipeline --scales 1 10 --sessions 1 8 --output pipeline.json
+#   python -m benchmarks.bench_pipeline --workloads chat --cache-hit 0 0.5 0.9
+#   python -m benchmarks.bench_pipeline --workloads context --scales 1 10 --context-tokens 600 900
+#   python -m benchmarks.bench_pipeline --workloads faq --scales 1
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import main as chat_app
+from benchmarks.fakes import (FakeChatModel, FakeEmbeddings, FakeSearchBackend, FakeUpload,
+                              TimingCallbackHandler, make_pdf)
+from context_packer import DEFAULT_CANDIDATES, pack_context
+from create_index import CSV_PATH, create_faiss_index
+from mental_health_processor import DEFAULT_MENTAL_HEALTH_KEYWORDS, extract_mental_health_document
+from retriever import SEARCH_MODES, FaissRetriever
+from search_service import SearchService, set_search_service
+from semantic_cache import get_semantic_cache
+from token_utils import count_tokens
+
+WORKLOADS = ("build", "retrieval", "recall", "context", "faq", "extraction", "chat")
+
+
+def percentiles(samples, scale: float = 1000.0) -> dict:
+    """p50/p95/p99/mean dalam milidetik"""
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples, dtype=np.float64) * scale
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def write_corpus(csv_path: str, out_path: str, scale: int) -> pd.DataFrame:
+    """FAQ asli direplikasi `scale` kali (ID dan teks tiap salinan dibuat unik)"""
+    df = pd.read_csv(csv_path).fillna("")
+    copies = []
+    for n in range(scale):
+        copy = df.copy()
+        if n:
+            copy["Question_ID"] = copy["Question_ID"].astype(str) + f"_{n}"
+            copy["Answers"] = copy["Answers"] + f" (varian {n})"
+        copies.append(copy)
+    corpus = pd.concat(copies, ignore_index=True)
+    corpus.to_csv(out_path, index=False)
+    return corpus
+
+
+def query_stream(questions, n_queries: int, hit_ratio: float, seed: int = 3):
+    """Urutan query dengan perkiraan rasio pengulangan (cache hit) tertentu"""
+    rng = random.Random(seed)
+    unique = list(questions)
+    rng.shuffle(unique)
+    seen, fresh = [], iter(unique * (n_queries // max(len(unique), 1) + 1))
+    for i in range(n_queries):
+        if seen and rng.random() < hit_ratio:
+            yield rng.choice(seen)
+        else:
+            query = next(fresh)
+            # Salinan kedua dst. dibuat beda sedikit supaya benar-benar miss
+            query = query if i < len(unique) else f"{query} ({i})"
+            seen.append(query)
+            yield query
+
+
+def make_retriever(index_dir: str, work_dir: str, embeddings, mode: str = None) -> FaissRetriever:
+    cache_dir = tempfile.mkdtemp(prefix="cache-", dir=work_dir)
+    return FaissRetriever(index_path=index_dir, cache_dir=cache_dir, embeddings=embeddings,
+                          search_mode=mode, reload_interval=0)
+
+
+def bench_build(corpus_csv: str, index_dir: str, args) -> dict:
+    embeddings = FakeEmbeddings(latency=args.embed_latency, per_text_latency=args.embed_per_text)
+    shutil.rmtree(index_dir, ignore_errors=True)
+    start = time.perf_counter()
+    build = create_faiss_index(incremental=False, csv_path=corpus_csv, index_dir=index_dir,
+                               embeddings=embeddings, index_type=args.index_type, requests_per_second=1000.0)
+    seconds = time.perf_counter() - start
+
+    # Build kedua tanpa perubahan: semua chunk harus dipakai ulang
+    rebuild_start = time.perf_counter()
+    create_faiss_index(incremental=True, csv_path=corpus_csv, index_dir=index_dir,
+                       embeddings=embeddings, index_type=args.index_type, requests_per_second=1000.0)
+    rebuild_seconds = time.perf_counter() - rebuild_start
+
+    # Jumlah chunk dari hasil build (bukan total teks yang di-embed, yang juga memuat pertanyaan FAQ)
+    chunks = build["chunks"]
+    return {
+        "seconds": round(seconds, 3),
+        "chunks": chunks,
+        "chunks_per_sec": round(chunks / seconds, 2) if seconds else 0.0,
+        "faq_questions_embedded": build["faq_embedded"],
+        "embed_call": percentiles(embeddings.calls.drain()),
+        "incremental_rebuild_seconds": round(rebuild_seconds, 3),
+    }
+
+
+def bench_retrieval(index_dir: str, work_dir: str, questions, args) -> dict:
+    results = {}
+    for hit_ratio in args.cache_hit:
+        embeddings = FakeEmbeddings(latency=args.embed_latency)
+        retriever = make_retriever(index_dir, work_dir, embeddings)
+        latencies = []
+        for query in query_stream(questions, args.queries, hit_ratio):
+            start = time.perf_counter()
+            retriever.search(query, k=3)
+            latencies.append(time.perf_counter() - start)
+        total = sum(latencies)
+        results[f"hit_{hit_ratio}"] = {
+            "search": percentiles(latencies),
+            "queries_per_sec": round(len(latencies) / total, 2) if total else 0.0,
+            "embed_call": percentiles(embeddings.calls.drain()),
+            "cache": retriever.cache_stats(),
+        }
+    return results
+
+
+def bench_recall(index_dir: str, work_dir: str, corpus: pd.DataFrame, ks=(1, 3, 5)) -> dict:
+    """Pertanyaan di kolom Questions harus menemukan baris (row_id) asalnya"""
+    originals = corpus.drop_duplicates("Questions")
+    results = {}
+    for mode in SEARCH_MODES:
+        retriever = make_retriever(index_dir, work_dir, FakeEmbeddings(latency=0.0), mode=mode)
+        hits = {k: 0 for k in ks}
+        for _, row in originals.iterrows():
+            found = [doc.metadata.get("row_id") for doc in retriever.search(row["Questions"], k=max(ks))]
+            for k in ks:
+                hits[k] += str(row["Question_ID"]) in found[:k]
+        results[mode] = {f"recall@{k}": round(hits[k] / len(originals), 4) for k in ks}
+    return results
+
+
+def bench_context(index_dir: str, work_dir: str, corpus: pd.DataFrame, args) -> dict:
+    """Token prompt dan recall: gabungan top-3 apa adanya vs context packing (dedupe + MMR + budget)"""
+    originals = corpus.drop_duplicates("Questions")
+    retriever = make_retriever(index_dir, work_dir, FakeEmbeddings(latency=0.0))
+    samples = []
+    for _, row in originals.iterrows():
+        vector = retriever.embed_query(row["Questions"])
+        candidates, vectors = retriever.search_with_vectors(vector, k=DEFAULT_CANDIDATES, query=row["Questions"])
+        samples.append((str(row["Question_ID"]), candidates, vectors))
+
+    def summarize(selections):
+        tokens = [count_tokens("\n".join(doc.page_content for doc in docs)) for docs in selections]
+        # Salinan FAQ (ID "<asli>_<n>") dihitung sebagai baris yang sama: isinya memang duplikat
+        found = [qid in {str(doc.metadata.get("row_id")).split("_")[0] for doc in docs}
+                 for (qid, _, _), docs in zip(samples, selections)]
+        return {"avg_prompt_tokens": round(float(np.mean(tokens)), 1), "max_prompt_tokens": int(np.max(tokens)),
+                "avg_chunks": round(float(np.mean([len(docs) for docs in selections])), 2),
+                "recall": round(sum(found) / len(found), 4)}
+
+    results = {"top3_join": summarize([candidates[:3] for _, candidates, _ in samples])}
+    for budget in args.context_tokens:
+        start = time.perf_counter()
+        packed = [pack_context(candidates, vectors, token_budget=budget) for _, candidates, vectors in samples]
+        elapsed = time.perf_counter() - start
+        result = summarize([p.documents for p in packed])
+        # Token yang benar-benar dikirim (overlap antar chunk sudah dibuang)
+        result["avg_prompt_tokens"] = round(float(np.mean([p.tokens for p in packed])), 1)
+        result["max_prompt_tokens"] = int(np.max([p.tokens for p in packed]))
+        result["avg_duplicates_dropped"] = round(float(np.mean([p.duplicates for p in packed])), 2)
+        result["pack_ms"] = round(elapsed / len(packed) * 1000, 3)
+        results[f"packed_{budget}"] = result
+    return results
+
+
+def typo(text: str, rng: random.Random) -> str:
+    """Tukar dua huruf bersebelahan di satu kata (salah ketik)"""
+    words = text.split()
+    long_words = [i for i, word in enumerate(words) if len(word) > 4]
+    if not long_words:
+        return text
+    i = rng.choice(long_words)
+    j = rng.randrange(1, len(words[i]) - 2)
+    word = words[i]
+    words[i] = word[:j] + word[j + 1] + word[j] + word[j + 2:]
+    return " ".join(words)
+
+
+OFF_TOPIC = ["Berapa harga tiket kereta ke Bandung?", "Resep nasi goreng yang enak",
+             "Siapa pemenang piala dunia 2018?", "Bagaimana cara mengganti oli motor?",
+             "Apa ibu kota Australia?", "Cara membuat akun email baru"]
+
+
+def bench_faq(index_dir: str, work_dir: str, corpus: pd.DataFrame, args) -> dict:
+    """Jalur cepat FAQ: hit rate dan ketepatan per varian query, plus latensi run_agent vs jalur LLM"""
+    rng = random.Random(11)
+    originals = corpus.drop_duplicates("Questions")
+    variants = {
+        "exact": [(q, str(qid)) for q, qid in zip(originals["Questions"], originals["Question_ID"])],
+        "case_punct": [(q.upper().rstrip("?") + " ??", str(qid))
+                       for q, qid in zip(originals["Questions"], originals["Question_ID"])],
+        "typo": [(typo(q, rng), str(qid)) for q, qid in zip(originals["Questions"], originals["Question_ID"])],
+        "off_topic": [(q, None) for q in OFF_TOPIC],
+    }
+    retriever = make_retriever(index_dir, work_dir, FakeEmbeddings(latency=0.0))
+    llm = FakeChatModel(first_token_latency=args.llm_ttft, token_latency=args.llm_token_latency,
+                        answer_tokens=args.answer_tokens)
+    fake_search = FakeSearchBackend(latency=args.search_latency)
+    original_service = set_search_service(SearchService([fake_search]))
+    results = {}
+    try:
+        for name, queries in variants.items():
+            matches = [retriever.match_faq(query) for query, _ in queries]
+            hits = [m for m in matches if m is not None]
+            correct = sum(m is not None and m.row_id.split("_")[0] == qid for m, (_, qid) in zip(matches, queries))
+            sample = queries[:args.turns * 4]
+            timings = {}
+            for enabled in (True, False):
+                # Retriever baru (cache embedding kosong) per jalur supaya perbandingannya adil
+                session = make_retriever(index_dir, work_dir, FakeEmbeddings(latency=args.embed_latency))
+                session.faq_enabled = enabled
+                get_semantic_cache().invalidate()
+                samples = []
+                for query, _ in sample:
+                    start = time.perf_counter()
+                    chat_app.run_agent(query, session, stream=False, llm=llm)
+                    samples.append(time.perf_counter() - start)
+                timings["fast_path" if enabled else "llm_path"] = percentiles(samples)
+            results[name] = {"queries": len(queries), "hit_rate": round(len(hits) / len(queries), 4),
+                             "precision": round(correct / len(hits), 4) if hits else None,
+                             "methods": dict(Counter(m.method for m in hits)), **timings}
+    finally:
+        set_search_service(original_service)
+    return results
+
+
+def bench_extraction(args) -> dict:
+    rng = random.Random(5)
+    filler = ("Catatan harian tentang pekerjaan, keluarga, dan kegiatan sehari-hari. " * 4).split()
+    keywords = list(DEFAULT_MENTAL_HEALTH_KEYWORDS)
+    results = {}
+    for page_count in args.pages:
+        pages = []
+        for n in range(page_count):
+            words = [rng.choice(filler) for _ in range(220)]
+            for _ in range(3):
+                words.insert(rng.randrange(len(words)), rng.choice(keywords))
+            pages.append(f"Halaman {n} ({time.time_ns()}). " + " ".join(words))
+        upload = FakeUpload(make_pdf(pages))
+
+        start = time.perf_counter()
+        result = extract_mental_health_document(upload)
+        seconds = time.perf_counter() - start
+        cached_start = time.perf_counter()
+        extract_mental_health_document(upload)
+        cached_seconds = time.perf_counter() - cached_start
+
+        results[f"pages_{page_count}"] = {
+            "status": result.get("status"),
+            "seconds": round(seconds, 3),
+            "pages_per_sec": round(page_count / seconds, 2) if seconds else 0.0,
+            "cached_ms": round(cached_seconds * 1000, 3),
+        }
+    return results
+
+
+def bench_chat(index_dir: str, work_dir: str, questions, args) -> dict:
+    results = {}
+    fake_search = FakeSearchBackend(latency=args.search_latency)
+    original_service = set_search_service(SearchService([fake_search]))
+    try:
+        for hit_ratio in args.cache_hit:
+            for sessions in args.sessions:
+                get_semantic_cache().invalidate()
+                embeddings = FakeEmbeddings(latency=args.embed_latency)
+                retriever = make_retriever(index_dir, work_dir, embeddings)
+                # Query benchmark diambil dari FAQ; jalur cepat dimatikan supaya yang diukur jalur LLM
+                retriever.faq_enabled = False
+                llm = FakeChatModel(first_token_latency=args.llm_ttft, token_latency=args.llm_token_latency,
+                                    answer_tokens=args.answer_tokens)
+
+                def session(session_id: int):
+                    records = []
+                    for query in query_stream(questions, args.turns, hit_ratio, seed=session_id):
+                        handler = TimingCallbackHandler()
+                        start = time.perf_counter()
+                        chat_app.run_agent(query, retriever, callback_handler=handler, llm=llm)
+                        records.append((time.perf_counter() - start, handler))
+                    return records
+
+                wall_start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=sessions) as pool:
+                    records = [r for batch in pool.map(session, range(sessions)) for r in batch]
+                wall = time.perf_counter() - wall_start
+
+                totals = [seconds for seconds, _ in records]
+                generated = [h for _, h in records if h.generation_seconds is not None]
+                results[f"hit_{hit_ratio}_sessions_{sessions}"] = {
+                    "turns": len(records),
+                    "turns_per_sec": round(len(records) / wall, 2) if wall else 0.0,
+                    "end_to_end": percentiles(totals),
+                    "ttft": percentiles([h.ttft for h in generated if h.ttft is not None]),
+                    "generation": percentiles([h.generation_seconds for h in generated]),
+                    "pre_llm": percentiles([s - h.generation_seconds for s, h in records
+                                            if h.generation_seconds is not None]),
+                    "llm_calls": len(generated),
+                    "answer_cache_hits": len(records) - len(generated),
+                    "embed_call": percentiles(embeddings.calls.drain()),
+                    "search_fallbacks": len(fake_search.calls.drain()),
+                }
+    finally:
+        set_search_service(original_service)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline pipeline chat (fake Cohere/Gemini/Google)")
+    parser.add_argument("--csv", default=CSV_PATH, help="Sumber FAQ yang direplikasi")
+    parser.add_argument("--workloads", nargs="+", choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument("--scales", nargs="+", type=int, default=[1, 10], help="Ukuran korpus (kelipatan FAQ)")
+    parser.add_argument("--index-type", default="flat", help="Tipe index FAISS (lihat ann_index.INDEX_TYPES)")
+    parser.add_argument("--queries", type=int, default=200, help="Query per workload retrieval")
+    parser.add_argument("--cache-hit", nargs="+", type=float, default=[0.0, 0.5], help="Rasio query berulang")
+    parser.add_argument("--context-tokens", nargs="+", type=int, default=[600, 900], help="Budget token konteks")
+    parser.add_argument("--pages", nargs="+", type=int, default=[10, 50, 200], help="Jumlah halaman PDF")
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 4, 16], help="Sesi chat paralel")
+    parser.add_argument("--turns", type=int, default=10, help="Pertanyaan per sesi")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="Latensi per panggilan embed (detik)")
+    parser.add_argument("--embed-per-text", type=float, default=0.0005, help="Latensi tambahan per teks embed")
+    parser.add_argument("--llm-ttft", type=float, default=0.3, help="Latensi token pertama LLM (detik)")
+    parser.add_argument("--llm-token-latency", type=float, default=0.01, help="Latensi per token LLM (detik)")
+    parser.add_argument("--answer-tokens", type=int, default=80)
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Latensi fake Google Search (detik)")
+    parser.add_argument("--quick", action="store_true", help="Parameter kecil untuk smoke test")
+    parser.add_argument("--keep", action="store_true", help="Jangan hapus folder kerja sementara")
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.scales, args.queries, args.pages = [1], 40, [5, 20]
+        args.sessions, args.turns, args.cache_hit = [1, 4], 3, [0.0, 0.5]
+        args.embed_latency, args.llm_ttft, args.llm_token_latency = 0.01, 0.02, 0.0
+        args.search_latency = 0.01
+
+    work_dir = tempfile.mkdtemp(prefix="kindora-bench-")
+    report = {"params": {k: v for k, v in vars(args).items() if k not in ("output", "keep")}, "scales": {}}
+    try:
+        if "extraction" in args.workloads:
+            report["extraction"] = bench_extraction(args)
+
+        for scale in args.scales:
+            corpus_csv = os.path.join(work_dir, f"faq_x{scale}.csv")
+            index_dir = os.path.join(work_dir, f"index_x{scale}")
+            corpus = write_corpus(args.csv, corpus_csv, scale)
+            questions = corpus.drop_duplicates("Questions")["Questions"].tolist()
+            result = report["scales"][f"x{scale}"] = {"rows": len(corpus)}
+
+            needs_index = set(args.workloads) - {"extraction"}
+            if "build" in args.workloads:
+                result["build"] = bench_build(corpus_csv, index_dir, args)
+            elif needs_index:
+                create_faiss_index(incremental=False, csv_path=corpus_csv, index_dir=index_dir,
+                                   embeddings=FakeEmbeddings(latency=0.0), index_type=args.index_type,
+                                   requests_per_second=1000.0)
+            if "retrieval" in args.workloads:
+                result["retrieval"] = bench_retrieval(index_dir, work_dir, questions, args)
+            if "recall" in args.workloads:
+                result["recall"] = bench_recall(index_dir, work_dir, corpus)
+            if "context" in args.workloads:
+                result["context"] = bench_context(index_dir, work_dir, corpus, args)
+            if "faq" in args.workloads:
+                result["faq"] = bench_faq(index_dir, work_dir, corpus, args)
+            if "chat" in args.workloads:
+                result["chat"] = bench_chat(index_dir, work_dir, questions, args)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Hasil disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_search.py
+# Uji layanan pencarian web dengan backend stub lokal: deadline, fan-out (yang cepat menang),
+# backend gagal/kosong, cache TTL, dan dedupe query identik dari banyak sesi sekaligus.
+#
+#   python -m benchmarks.bench_search
+#   python -m benchmarks.bench_search --slow 3 --deadline 0.5 --sessions 32
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import FakeSearchBackend
+from search_service import SearchService
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round((time.perf_counter() - start) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SearchService dengan backend stub")
+    parser.add_argument("--fast", type=float, default=0.1, help="Latensi backend cepat (detik)")
+    parser.add_argument("--slow", type=float, default=2.0, help="Latensi backend lambat (detik)")
+    parser.add_argument("--deadline", type=float, default=0.5)
+    parser.add_argument("--sessions", type=int, default=16, help="Sesi paralel dengan query identik")
+    args = parser.parse_args()
+
+    report = {}
+
+    # 1. Backend lambat saja: harus kembali kosong tepat di deadline, bukan menunggu backend
+    slow = FakeSearchBackend(latency=args.slow, name="slow")
+    service = SearchService([slow], deadline=args.deadline)
+    results, ms = timed(service.search, "kecemasan berlebihan")
+    report["deadline"] = {"results": len(results), "latency_ms": ms, "deadline_ms": args.deadline * 1000}
+
+    # 2. Fan-out: backend gagal + kosong + lambat + cepat -> hasil backend cepat
+    fast = FakeSearchBackend(latency=args.fast, name="fast")
+    backends = [FakeSearchBackend(latency=0.01, name="broken", fail=True),
+                FakeSearchBackend(latency=0.01, name="empty", empty=True),
+                FakeSearchBackend(latency=args.slow, name="slow"), fast]
+    service = SearchService(backends, deadline=args.deadline)
+    results, ms = timed(service.search, "cara mengatasi stres kerja")
+    report["fan_out"] = {"results": len(results), "latency_ms": ms}
+
+    # 3. Cache: query sama (beda huruf besar/spasi) tidak memanggil backend lagi
+    fast.calls.drain()
+    _, ms = timed(service.search, "  Cara mengatasi   STRES kerja ")
+    report["cache"] = {"latency_ms": ms, "backend_calls": len(fast.calls.drain())}
+
+    # 4. Dedupe in-flight: banyak sesi menanyakan hal yang sama bersamaan -> satu panggilan backend
+    shared = FakeSearchBackend(latency=args.fast, name="shared")
+    service = SearchService([shared], deadline=args.deadline, max_workers=args.sessions)
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        start = time.perf_counter()
+        answers = list(pool.map(lambda _: service.search("insomnia dan depresi"), range(args.sessions)))
+        wall = time.perf_counter() - start
+    report["dedupe"] = {
+        "sessions": args.sessions,
+        "backend_calls": len(shared.calls.drain()),
+        "all_answered": all(answers),
+        "wall_ms": round(wall * 1000, 2),
+    }
+    report["stats"] = service.stats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_shards.py
+# Retrieval multi-shard: korpus FAQ yang direplikasi dibagi ke beberapa shard (index terpisah) dan
+# dibandingkan dengan satu index gabungan berisi baris yang sama. Dilaporkan latensi pencarian,
+# overlap top-k hasil merge terkalibrasi terhadap top-k index gabungan, dan skenario satu shard lambat
+# (latensi disuntikkan, mensimulasikan shard besar/disk lambat) yang harus dilewati sesuai budget-nya.
+#
+#   python -m benchmarks.bench_shards
+#   python -m benchmarks.bench_shards --scale 10 --shards 2 4 8 --slow-ms 300 --budget-ms 100
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_pipeline import percentiles, write_corpus
+from benchmarks.fakes import FakeEmbeddings
+from create_index import CSV_PATH, create_faiss_index
+from retriever import FaissRetriever
+from shard_registry import ShardSpec
+
+
+def build(csv_path: str, index_dir: str, index_type: str):
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_faiss_index(incremental=False, csv_path=csv_path, index_dir=index_dir, index_type=index_type,
+                           embeddings=FakeEmbeddings(latency=0.0), requests_per_second=1000.0)
+
+
+def build_shards(corpus: pd.DataFrame, work_dir: str, count: int, index_type: str):
+    """Baris korpus dibagi round-robin ke `count` shard"""
+    specs = []
+    for n in range(count):
+        shard_dir = os.path.join(work_dir, f"shards_{count}", f"shard_{n}")
+        os.makedirs(os.path.dirname(shard_dir), exist_ok=True)
+        csv_path = shard_dir + ".csv"
+        corpus.iloc[n::count].to_csv(csv_path, index=False)
+        build(csv_path, shard_dir, index_type)
+        specs.append(ShardSpec(f"shard_{n}", shard_dir))
+    return specs
+
+
+def run_queries(retriever: FaissRetriever, queries, vectors, k: int):
+    latencies, results = [], []
+    for query, vector in zip(queries, vectors):
+        start = time.perf_counter()
+        docs, _ = retriever.search_with_vectors(vector, k=k, query=query, mode="vector")
+        latencies.append(time.perf_counter() - start)
+        results.append([doc.id for doc in docs])
+    return latencies, results
+
+
+def overlap(results, reference, k: int) -> float:
+    return round(sum(len(set(a[:k]) & set(b[:k])) for a, b in zip(results, reference)) / (k * len(results)), 4)
+
+
+def slow_down(shard, seconds: float):
+    """Suntikkan latensi ke setiap pencarian di satu shard"""
+    current = shard.current
+
+    def slow_current():
+        time.sleep(seconds)
+        return current()
+    shard.current = slow_current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval multi-shard (fan-out + merge top-k)")
+    parser.add_argument("--csv", default=CSV_PATH, help="Sumber FAQ yang direplikasi")
+    parser.add_argument("--scale", type=int, default=10, help="Ukuran korpus (kelipatan FAQ)")
+    parser.add_argument("--shards", nargs="+", type=int, default=[2, 4, 8], help="Jumlah shard")
+    parser.add_argument("--index-type", default="flat", help="Tipe index FAISS (lihat ann_index.INDEX_TYPES)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=12, help="Kandidat per query (seperti context_candidates)")
+    parser.add_argument("--slow-ms", type=float, default=300.0, help="Latensi yang disuntikkan ke satu shard")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Budget per shard di skenario lambat")
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="kindora-shards-")
+    report = {"params": {k: v for k, v in vars(args).items() if k != "output"}}
+    try:
+        corpus = write_corpus(args.csv, os.path.join(work_dir, "corpus.csv"), args.scale)
+        questions = corpus.drop_duplicates("Questions")["Questions"].tolist()
+        queries = (questions * (args.queries // len(questions) + 1))[:args.queries]
+        embeddings = FakeEmbeddings(latency=0.0)
+        vectors = embeddings.embed_documents(queries)
+        report["rows"] = len(corpus)
+
+        build(os.path.join(work_dir, "corpus.csv"), os.path.join(work_dir, "single"), args.index_type)
+        single = FaissRetriever(index_path=os.path.join(work_dir, "single"), embeddings=embeddings,
+                                cache_dir=os.path.join(work_dir, "cache"), reload_interval=None)
+        latencies, reference = run_queries(single, queries, vectors, args.k)
+        report["single"] = {"search": percentiles(latencies)}
+
+        for count in args.shards:
+            specs = build_shards(corpus, work_dir, count, args.index_type)
+            sharded = FaissRetriever(shards=specs, embeddings=embeddings, cache_dir=os.path.join(work_dir, "cache"),
+                                     reload_interval=None)
+            latencies, results = run_queries(sharded, queries, vectors, args.k)
+            result = {"search": percentiles(latencies), f"overlap@{args.k}": overlap(results, reference, args.k)}
+
+            # Satu shard lambat: budget kecil, jawaban tidak ikut menunggu shard tersebut
+            budgeted = [spec._replace(budget_ms=args.budget_ms) for spec in specs]
+            degraded = FaissRetriever(shards=budgeted, embeddings=embeddings, cache_dir=os.path.join(work_dir, "cache"),
+                                      reload_interval=None)
+            slow_down(degraded.shards[-1], args.slow_ms / 1000.0)
+            latencies, results = run_queries(degraded, queries[:max(args.queries // 10, 10)], vectors, args.k)
+            result["one_slow_shard"] = {"search": percentiles(latencies),
+                                        f"overlap@{args.k}": overlap(results, reference, args.k),
+                                        "shards": degraded.shard_stats()}
+            report[f"shards_{count}"] = result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Hasil disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/bench_startup.py
+# Cold start main.py di proses baru: waktu import, render pertama (layar sambutan lewat AppTest
+# Streamlit), dan jawaban pertama (index + LLM fake), dibandingkan dengan import eager semua
+# dependensi berat seperti sebelum lazy import. Keluar dengan kode 1 kalau render pertama melewati
+# budget KINDORA_COLD_START_BUDGET_MS, jadi bisa dipakai sebagai gerbang CI.
+#
+#   python -m benchmarks.bench_startup --runs 5
+#   KINDORA_COLD_START_BUDGET_MS=1500 python -m benchmarks.bench_startup --output startup.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from startup import DEFAULT_BUDGET_MS, WARM_MODULES
+
+# Tiap skrip mencetak satu baris JSON {fase: time.time()} di akhir; waktu dihitung dari spawn proses
+IMPORT_SCRIPT = """
+import json, time
+import main
+print(json.dumps({"import": time.time()}))
+"""
+
+EAGER_SCRIPT = """
+import importlib, json, time
+import main
+for name in %r:
+    importlib.import_module(name)
+print(json.dumps({"import": time.time()}))
+""" % (WARM_MODULES,)
+
+RENDER_SCRIPT = """
+import json, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("main.py", default_timeout=60).run()
+assert not at.exception, at.exception
+print(json.dumps({"first_render": time.time()}))
+"""
+
+ANSWER_SCRIPT = """
+import json, time
+import main
+marks = {"import": time.time()}
+main._startup.start_warmup(None)
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+from retriever import FaissRetriever
+retriever = FaissRetriever(index_path=%r, cache_dir=%r, embeddings=FakeEmbeddings(latency=0.0))
+marks["index_ready"] = time.time()
+main.run_agent("Apa itu depresi?", retriever, stream=False,
+               llm=FakeChatModel(first_token_latency=0.0, token_latency=0.0, answer_tokens=20))
+marks["first_answer"] = time.time()
+main._startup.wait_warm(30)
+marks["report"] = main._startup.report()
+print(json.dumps(marks))
+"""
+
+
+def run_child(script: str, env: dict) -> dict:
+    start = time.time()
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"❌ Proses benchmark gagal:\n{result.stderr[-2000:]}")
+    marks = json.loads(result.stdout.strip().splitlines()[-1])
+    return {phase: (value if phase == "report" else (value - start) * 1000) for phase, value in marks.items()}
+
+
+def summarize(samples) -> dict:
+    arr = np.asarray(samples)
+    return {"median_ms": round(float(np.median(arr)), 1), "min_ms": round(float(arr.min()), 1),
+            "max_ms": round(float(arr.max()), 1)}
+
+
+def import_breakdown(env: dict, top: int) -> dict:
+    """Modul top-level termahal saat `import main` (python -X importtime)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            capture_output=True, text=True, env=env)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Hanya modul yang di-import langsung oleh main (indentasi satu tingkat)
+        if name.startswith("   ") and not name.startswith("    ") and cumulative.strip().isdigit():
+            rows.append((name.strip(), int(cumulative) / 1000))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return {name: round(ms, 1) for name, ms in rows[:top]}
+
+
+def build_index(index_dir: str):
+    from benchmarks.fakes import FakeEmbeddings
+    from create_index import create_faiss_index
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_faiss_index(incremental=False, index_dir=index_dir, embeddings=FakeEmbeddings(latency=0.0),
+                           requests_per_second=1000.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start main.py")
+    parser.add_argument("--runs", type=int, default=5, help="Jumlah proses baru per fase")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.getenv("KINDORA_COLD_START_BUDGET_MS", str(DEFAULT_BUDGET_MS))),
+                        help="Budget render pertama (ms)")
+    parser.add_argument("--top", type=int, default=10, help="Jumlah modul di rincian import")
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ, KINDORA_COLD_START_BUDGET_MS=str(args.budget_ms))
+    work_dir = tempfile.mkdtemp(prefix="kindora-startup-")
+    try:
+        index_dir = os.path.join(work_dir, "index")
+        build_index(index_dir)
+        answer_script = ANSWER_SCRIPT % (index_dir, os.path.join(work_dir, "cache"))
+
+        # Satu putaran pemanasan supaya bytecode (.pyc) sudah ada, seperti di container yang sudah di-build
+        run_child(IMPORT_SCRIPT, env)
+        samples = {"lazy_import": [], "eager_import": [], "first_render": [], "index_ready": [], "first_answer": []}
+        report = None
+        for _ in range(args.runs):
+            samples["lazy_import"].append(run_child(IMPORT_SCRIPT, env)["import"])
+            samples["eager_import"].append(run_child(EAGER_SCRIPT, env)["import"])
+            samples["first_render"].append(run_child(RENDER_SCRIPT, env)["first_render"])
+            answer = run_child(answer_script, env)
+            samples["index_ready"].append(answer["index_ready"])
+            samples["first_answer"].append(answer["first_answer"])
+            report = answer["report"]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {phase: summarize(values) for phase, values in samples.items()}
+    results["import_breakdown_ms"] = import_breakdown(env, args.top)
+    results["warm_imports_ms"] = report["imports_ms"] if report else {}
+    first_render = results["first_render"]["median_ms"]
+    results["budget_ms"] = args.budget_ms
+    results["within_budget"] = first_render <= args.budget_ms
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"💾 Hasil disimpan ke {args.output}")
+    if not results["within_budget"]:
+        print(f"❌ Render pertama {first_render:.0f}ms melebihi budget {args.budget_ms:.0f}ms")
+        sys.exit(1)
+    print(f"✅ Render pertama {first_render:.0f}ms dalam budget {args.budget_ms:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_translate.py
+# Bandingkan TranslationService lama (satu request per teks + sleep 1.5-3 detik) dengan versi
+# rate-limited + batch + cache, memakai backend stub lokal.
+#
+#   python -m benchmarks.bench_translate
+#   python -m benchmarks.bench_translate --segments 40 --latency 0.3 --rps 2
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.fakes import FakeTranslateBackend
+from rate_limiter import TokenBucket
+from tools.translate_tools import TranslationMemory, TranslationService
+
+LEGACY_SLEEP = 1.5 * 1.5  # rata-rata random.uniform(1.5, 3.0) setelah tiap terjemahan berhasil
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, round(time.perf_counter() - start, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TranslationService dengan backend stub")
+    parser.add_argument("--segments", type=int, default=20, help="Jumlah teks (konteks + jawaban)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latensi backend per request (detik)")
+    parser.add_argument("--rps", type=float, default=5.0, help="Batas request per detik")
+    parser.add_argument("--max-chars", type=int, default=5000, help="Batas karakter per request provider")
+    args = parser.parse_args()
+
+    texts = [f"Kalimat nomor {i} tentang kesehatan mental.\nBaris kedua dari dokumen {i}." * 3
+             for i in range(args.segments)]
+    report = {"legacy_estimate_seconds": round(len(texts) * (args.latency + LEGACY_SLEEP), 3)}
+
+    backend = FakeTranslateBackend(latency=args.latency, max_chars=args.max_chars)
+    service = TranslationService(backend, TranslationMemory(":memory:"), TokenBucket(args.rps))
+
+    result, seconds = timed(service.translate_batch, texts, "en")
+    report["batch_cold"] = {"seconds": seconds, "requests": len(backend.calls.drain()),
+                            "ok": all(line.startswith("[en]") for text in result for line in text.split("\n"))}
+    _, seconds = timed(service.translate_batch, texts, "en")
+    report["batch_warm"] = {"seconds": seconds, "requests": len(backend.calls.drain())}
+
+    single = TranslationService(backend, TranslationMemory(":memory:"), TokenBucket(args.rps))
+    _, seconds = timed(lambda: [single.translate(text, "en") for text in texts])
+    report["one_by_one_rate_limited"] = {"seconds": seconds, "requests": len(backend.calls.drain()),
+                                         "rate_limit_wait_seconds": single.stats()["rate_limit_wait_seconds"]}
+
+    merging = TranslationService(FakeTranslateBackend(latency=0.0, merge_lines=True),
+                                 TranslationMemory(":memory:"), TokenBucket(1000))
+    merged = merging.translate_batch(texts[:3], "id")
+    report["line_merge_fallback_ok"] = all(line.startswith("[id]") for text in merged for line in text.split("\n"))
+
+    async def concurrent():
+        fresh = TranslationService(backend, TranslationMemory(":memory:"), TokenBucket(args.rps))
+        return await asyncio.gather(*(fresh.atranslate(text, "id") for text in texts[:8]))
+    _, seconds = timed(asyncio.run, concurrent())
+    report["async_8_texts_seconds"] = seconds
+    report["stats"] = service.stats()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
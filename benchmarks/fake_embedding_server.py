@@ -0,0 +1,153 @@
+# benchmarks/fake_embedding_server.py
+# Server embedding palsu yang meniru endpoint /v1/embed Cohere untuk uji lokal tanpa API key.
+#
+# Jalankan:
+#   python -m benchmarks.fake_embedding_server --port 8765 --latency-ms 50 --error-rate 0.05
+# Lalu arahkan client Cohere ke server ini:
+#   COHERE_BASE_URL=http://127.0.0.1:8765 COHERE_API_KEY=dummy python create_index.py --full
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+DEFAULT_DIM = 1024
+MAX_TEXTS = 96
+
+
+def fake_embedding(text: str, dim: int = DEFAULT_DIM) -> List[float]:
+    """Embedding deterministik (feature hashing kata + trigram karakter), sudah dinormalisasi.
+
+    Teks yang mirip menghasilkan vektor yang mirip, jadi recall benchmark tetap bermakna.
+    """
+    vector = [0.0] * dim
+    text = (text or "").lower()
+    features = re.findall(r"\w+", text)
+    features += [text[i:i + 3] for i in range(max(len(text) - 2, 0))]
+    for feature in features:
+        digest = hashlib.md5(feature.encode("utf-8")).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeEmbeddingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, dim: int = DEFAULT_DIM, latency_ms: float = 0.0,
+                 error_rate: float = 0.0):
+        super().__init__(address, _Handler)
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.rejected = 0
+        self.batch_sizes: List[int] = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "rejected": self.rejected,
+                "avg_batch_size": self.texts / self.requests if self.requests else 0.0,
+                "max_batch_size": max(self.batch_sizes, default=0),
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeEmbeddingServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_json(404, {"message": "not found"})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/embed"):
+            self._send_json(404, {"message": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        texts = request.get("texts") or []
+
+        if len(texts) > MAX_TEXTS:
+            self._send_json(400, {"message": f"too many texts: {len(texts)} > {MAX_TEXTS}"})
+            return
+        if random.random() < self.server.error_rate:
+            with self.server.lock:
+                self.server.rejected += 1
+            self._send_json(429, {"message": "rate limit (fake)"})
+            return
+
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000.0)
+        vectors = [fake_embedding(text, self.server.dim) for text in texts]
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.texts += len(texts)
+            self.server.batch_sizes.append(len(texts))
+
+        payload = {
+            "id": str(uuid.uuid4()),
+            "texts": texts,
+            "meta": {"api_version": {"version": "1"}, "billed_units": {"input_tokens": len(texts)}},
+        }
+        if request.get("embedding_types"):
+            payload["response_type"] = "embeddings_by_type"
+            payload["embeddings"] = {"float": vectors}
+        else:
+            payload["response_type"] = "embeddings_floats"
+            payload["embeddings"] = vectors
+        self._send_json(200, payload)
+
+
+def start_server(port: int = 0, **kwargs) -> FakeEmbeddingServer:
+    """Jalankan server di thread background (port=0 = pilih port bebas)"""
+    server = FakeEmbeddingServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server embedding palsu (kompatibel Cohere /v1/embed)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeEmbeddingServer(("127.0.0.1", args.port), dim=args.dim,
+                                 latency_ms=args.latency_ms, error_rate=args.error_rate)
+    print(f"✅ Fake embedding server berjalan di {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(server.stats())
@@ -0,0 +1,239 @@
+# benchmarks/fakes.py
+# Pengganti lokal yang deterministik untuk Cohere, Gemini, dan Google Search,
+# supaya pipeline chat bisa diukur tanpa API key dan tanpa jaringan.
+
+import hashlib
+import re
+import threading
+import time
+import zlib
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from benchmarks.fake_embedding_server import DEFAULT_DIM, fake_embedding
+
+
+class LatencyRecorder:
+    """Kumpulan durasi (detik) yang aman dipakai banyak thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: List[float] = []
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def drain(self) -> List[float]:
+        with self._lock:
+            samples, self.samples = self.samples, []
+        return samples
+
+
+class FakeEmbeddings(Embeddings):
+    """Embedding feature-hashing dengan latensi per panggilan yang bisa diatur"""
+
+    def __init__(self, dim: int = DEFAULT_DIM, latency: float = 0.05, per_text_latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.calls = LatencyRecorder()
+        self.texts_embedded = 0
+        self._lock = threading.Lock()
+
+    def embed(self, texts: List[str], input_type: Optional[str] = None) -> List[List[float]]:
+        start = time.perf_counter()
+        time.sleep(self.latency + self.per_text_latency * len(texts))
+        vectors = [fake_embedding(text, self.dim) for text in texts]
+        with self._lock:
+            self.texts_embedded += len(texts)
+        self.calls.add(time.perf_counter() - start)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts, input_type="search_document")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed([text], input_type="search_query")[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model palsu: latensi token pertama + latensi per token, jawaban deterministik dari prompt"""
+
+    first_token_latency: float = 0.3
+    token_latency: float = 0.01
+    answer_tokens: int = 80
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt = "".join(str(message.content) for message in messages)
+        words = prompt.split() or ["ok"]
+        seed = zlib.crc32(prompt.encode("utf-8"))
+        return [words[(seed + i * 7919) % len(words)] + " " for i in range(self.answer_tokens)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        for token in self._tokens(messages):
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager is not None:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class TimingCallbackHandler(BaseCallbackHandler):
+    """Catat waktu mulai, token pertama, dan selesai generate (pengganti GeminiCallbackHandler tanpa UI)"""
+
+    def __init__(self):
+        self.start_time = None
+        self.first_token_time = None
+        self.end_time = None
+        self.token_count = 0
+        self.streamed = False
+        self.response = ""
+
+    def on_chat_model_start(self, serialized, messages, **kwargs: Any) -> None:
+        self.start_time = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, **kwargs: Any) -> None:
+        self.start_time = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+        self.streamed = True
+        self.token_count += 1
+        self.response += token
+
+    def on_llm_end(self, response, **kwargs: Any) -> None:
+        self.end_time = time.perf_counter()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        if self.start_time is None or self.first_token_time is None:
+            return None
+        return self.first_token_time - self.start_time
+
+    @property
+    def generation_seconds(self) -> Optional[float]:
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+
+class FakeSearchBackend:
+    """Backend pencarian stub: URL deterministik dengan latensi dan kegagalan yang bisa diatur"""
+
+    def __init__(self, latency: float = 0.3, name: str = "fake", fail: bool = False, empty: bool = False):
+        self.latency = latency
+        self.name = name
+        self.fail = fail
+        self.empty = empty
+        self.calls = LatencyRecorder()
+
+    def __call__(self, query: str, num_results: int = 10, lang: str = "id", **kwargs) -> List[str]:
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        self.calls.add(time.perf_counter() - start)
+        if self.fail:
+            raise ConnectionError(f"{self.name}: backend stub gagal")
+        if self.empty:
+            return []
+        digest = hashlib.md5(f"{lang}:{query}".encode("utf-8")).hexdigest()
+        return [f"https://example.org/{lang}/{digest[:8]}/{i}" for i in range(num_results)]
+
+
+class FakeTranslateBackend:
+    """Backend terjemahan stub: tiap baris diberi prefix bahasa target, latensi per request bisa diatur"""
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.2, max_chars: int = 5000, merge_lines: bool = False):
+        self.latency = latency
+        self.max_chars = max_chars
+        self.merge_lines = merge_lines
+        self.calls = LatencyRecorder()
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        if len(text) > self.max_chars:
+            raise ValueError(f"teks {len(text)} karakter melebihi batas {self.max_chars}")
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        self.calls.add(time.perf_counter() - start)
+        # Nomor segmen "[i] " dari TranslationService dibiarkan di depan, seperti provider asli
+        lines = [re.sub(r"^(\[\d+\] )?", lambda m: f"{m.group(0)}[{target}] ", line) for line in text.split("\n")]
+        # Provider asli kadang menggabungkan baris; mode ini dipakai untuk menguji fallback
+        return " ".join(lines) if self.merge_lines else "\n".join(lines)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[str], line_width: int = 90) -> bytes:
+    """PDF teks sederhana (Helvetica, satu halaman per string) tanpa library tambahan"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_text in pages:
+        words, lines, current = page_text.encode("latin-1", "replace").decode("latin-1").split(), [], ""
+        for word in words:
+            if len(current) + len(word) + 1 > line_width:
+                lines.append(current)
+                current = word
+            else:
+                current = f"{current} {word}".strip()
+        lines.append(current)
+        commands = ["BT", "/F1 10 Tf", "12 TL", "40 800 Td"]
+        commands += [f"({_pdf_escape(line)}) Tj T*" for line in lines[:64]]
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(output)
+
+
+class FakeUpload:
+    """Objek mirip UploadedFile Streamlit (punya getvalue dan read)"""
+
+    def __init__(self, data: bytes, name: str = "dokumen.pdf"):
+        self.data = data
+        self.name = name
+
+    def getvalue(self) -> bytes:
+        return self.data
+
+    def read(self) -> bytes:
+        return self.data
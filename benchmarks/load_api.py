@@ -0,0 +1,142 @@
+# benchmarks/load_api.py
+# Load test api_server: banyak klien paralel mengirim pertanyaan FAQ lewat SSE, ukur waktu token
+# pertama, latensi total, throughput, dan jumlah penolakan 503 (backpressure).
+#
+#   python -m benchmarks.load_api --spawn-stub --clients 64 --requests 5
+#   python -m benchmarks.load_api --url http://127.0.0.1:8080 --clients 16 --no-stream
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from create_index import CSV_PATH
+
+
+def summarize(samples) -> dict:
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples) * 1000
+    return {"count": len(values), "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2),
+            "p99_ms": round(float(np.percentile(values, 99)), 2)}
+
+
+async def ask(session: aiohttp.ClientSession, url: str, message: str, session_id: str, stream: bool) -> dict:
+    start = time.perf_counter()
+    first_token = None
+    async with session.post(f"{url}/v1/chat", json={"message": message, "session_id": session_id,
+                                                    "stream": stream}) as response:
+        if response.status != 200:
+            await response.read()
+            return {"status": response.status, "total": time.perf_counter() - start}
+        if not stream:
+            await response.json()
+            return {"status": 200, "total": time.perf_counter() - start}
+        event = None
+        async for raw in response.content:
+            line = raw.decode("utf-8").rstrip("\n")
+            if line.startswith("event: "):
+                event = line[7:]
+            elif line.startswith("data: ") and event == "token" and first_token is None:
+                first_token = time.perf_counter() - start
+            elif line.startswith("data: ") and event == "error":
+                return {"status": 503, "total": time.perf_counter() - start}
+    return {"status": 200, "total": time.perf_counter() - start, "ttft": first_token}
+
+
+async def run(args, questions):
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.clients)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        async def client(client_id: int):
+            rng = random.Random(client_id)
+            results = []
+            for n in range(args.requests):
+                try:
+                    results.append(await ask(session, args.url, rng.choice(questions), f"load-{client_id}",
+                                             not args.no_stream))
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    results.append({"status": type(e).__name__, "total": args.timeout})
+            return results
+
+        start = time.perf_counter()
+        batches = await asyncio.gather(*(client(i) for i in range(args.clients)))
+        wall = time.perf_counter() - start
+        async with session.get(f"{args.url}/metrics") as response:
+            metrics = await response.text()
+
+    results = [r for batch in batches for r in batch]
+    ok = [r for r in results if r["status"] == 200]
+    statuses = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    return {
+        "clients": args.clients,
+        "requests": len(results),
+        "statuses": statuses,
+        "throughput_rps": round(len(ok) / wall, 2) if wall else 0.0,
+        "total": summarize([r["total"] for r in ok]),
+        "ttft": summarize([r["ttft"] for r in ok if r.get("ttft") is not None]),
+        "upstream_metrics": [line for line in metrics.splitlines() if line.startswith("kindora_upstream")
+                             or line.startswith("kindora_api")],
+    }
+
+
+async def wait_ready(url: str, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/healthz") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"Server {url} tidak siap")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test Kindora chat API")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5, help="Request per klien")
+    parser.add_argument("--no-stream", action="store_true")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--spawn-stub", action="store_true", help="Jalankan api_server --stub di port dari --url")
+    parser.add_argument("--server-args", default="", help="Argumen tambahan untuk api_server yang di-spawn")
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON")
+    args = parser.parse_args()
+
+    questions = pd.read_csv(CSV_PATH)["Questions"].dropna().tolist()
+    server = None
+    if args.spawn_stub:
+        port = args.url.rsplit(":", 1)[-1].strip("/")
+        env = dict(os.environ, KINDORA_HISTORY_DB=os.path.join("/tmp", f"kindora-load-{port}.sqlite"))
+        server = subprocess.Popen([sys.executable, "api_server.py", "--stub", "--port", port,
+                                   *args.server_args.split()], env=env)
+    try:
+        asyncio.run(wait_ready(args.url))
+        report = asyncio.run(run(args, questions))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# bm25_index.py
+# Index leksikal BM25 di atas docstore FAISS, disimpan sebagai bm25.json di samping index.faiss.
+# Menangkap query istilah persis (nama obat, "DSM-5", singkatan) yang sering meleset di dense retrieval.
+
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+BM25_FILE = "bm25.json"
+_TOKEN = re.compile(r"\w+(?:-\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Token huruf kecil; istilah bertanda hubung disimpan utuh dan juga per bagian (dsm-5, dsm, 5)"""
+    tokens = []
+    for token in _TOKEN.findall((text or "").lower()):
+        tokens.append(token)
+        if "-" in token:
+            tokens.extend(part for part in token.split("-") if part)
+    return tokens
+
+
+class BM25Index:
+    """Inverted index BM25 (Okapi) sederhana: term -> [(nomor_dokumen, tf)]"""
+
+    def __init__(self, doc_ids: Sequence[str], doc_lengths: Sequence[int],
+                 postings: Dict[str, List[Tuple[int, int]]], k1: float = 1.5, b: float = 0.75):
+        self.doc_ids = list(doc_ids)
+        self.doc_lengths = list(doc_lengths)
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        total = len(self.doc_ids)
+        self.idf = {
+            term: math.log(1 + (total - len(entries) + 0.5) / (len(entries) + 0.5))
+            for term, entries in postings.items()
+        }
+
+    @classmethod
+    def build(cls, doc_ids: Sequence[str], texts: Sequence[str], **kwargs) -> "BM25Index":
+        postings = defaultdict(list)
+        doc_lengths = []
+        for position, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((position, tf))
+        return cls(doc_ids, doc_lengths, dict(postings), **kwargs)
+
+    @classmethod
+    def from_docstore(cls, index_to_docstore_id: Dict[int, str], docstore) -> "BM25Index":
+        doc_ids = [index_to_docstore_id[i] for i in sorted(index_to_docstore_id)]
+        texts = [docstore.search(doc_id).page_content for doc_id in doc_ids]
+        return cls.build(doc_ids, texts)
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """(docstore_id, skor) terurut dari skor tertinggi"""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            entries = self.postings.get(term)
+            if not entries:
+                continue
+            idf = self.idf[term]
+            for position, tf in entries:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[position] / (self.avg_length or 1.0))
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.doc_ids[position], score) for position, score in best]
+
+    def save(self, index_dir: str):
+        path = os.path.join(index_dir, BM25_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "doc_ids": self.doc_ids,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f)
+
+    @classmethod
+    def load(cls, index_dir: str) -> "BM25Index":
+        with open(os.path.join(index_dir, BM25_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        postings = {term: [tuple(entry) for entry in entries] for term, entries in data["postings"].items()}
+        return cls(data["doc_ids"], data["doc_lengths"], postings, k1=data["k1"], b=data["b"])
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Gabungkan beberapa ranking dengan RRF: skor = sum(1 / (k + rank))"""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
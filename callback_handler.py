@@ -2,35 +2,55 @@
 import time
 from typing import Any, Dict, List
 import streamlit as st
-from langchain.callbacks.base import BaseCallbackHandler
+from langchain_core.callbacks.base import BaseCallbackHandler
+from token_utils import count_tokens
 
 class GeminiCallbackHandler(BaseCallbackHandler):
-    def __init__(self, max_update_rate: float = 0.3):
+    def __init__(self, max_update_rate: float = 0.3, container=None):
         self.response = ""
         self.last_update = time.time()
         self.last_token_time = time.time()
-        self.container = st.empty()
+        self.container = container if container is not None else st.empty()
         self.max_update_rate = max_update_rate
+        # Chunk stream Gemini berisi banyak token: token dihitung dengan tokenizer, chunk dihitung terpisah
         self.token_count = 0
+        self.chunk_count = 0
+        self.streamed = False
+        # Metrik streaming: waktu mulai, token pertama, dan selesai
+        self.start_time = None
+        self.first_token_time = None
+        self.end_time = None
         
     def on_llm_start(self, serialized: Dict[str, Any], 
                     prompts: List[str], **kwargs: Any) -> None:
         """Sederhanakan animasi loading"""
+        self.start_time = time.time()
         with self.container:
             st.markdown("⚠️ <i>Mempersiapkan respon...</i>", unsafe_allow_html=True)
 
+    def on_notice(self, message: str) -> None:
+        """Pemberitahuan status dari pipeline (mis. fallback pencarian), diganti jawaban saat tampil"""
+        with self.container:
+            st.info(message)
+
     def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
         """Optimasi update rate dengan dynamic delay"""
+        if not token:
+            return
+        current_time = time.time()
+        if self.first_token_time is None:
+            self.first_token_time = current_time
+        self.streamed = True
         self.response += token
-        self.token_count += 1
+        self.token_count += count_tokens(token)
+        self.chunk_count += 1
         
-        current_time = time.time()
         elapsed = current_time - self.last_update
         
         # Dynamic update rate berdasarkan panjang token
         dynamic_delay = max(
             self.max_update_rate, 
-            0.5 - min(self.token_count * 0.01, 0.4)  # Lebih cepat saat token banyak
+            0.5 - min(self.chunk_count * 0.01, 0.4)  # Lebih cepat saat token banyak
         )
         
         if elapsed >= dynamic_delay:
@@ -40,20 +60,35 @@ class GeminiCallbackHandler(BaseCallbackHandler):
 
     def on_llm_end(self, response, **kwargs: Any) -> None:
         """Handle response kosong"""
+        self.end_time = time.time()
         if not self.response.strip():
             self.response = "Hai, Saya Teman kamu"
         self._update_display(True)
         
+    def metrics(self) -> Dict[str, float]:
+        """Time-to-first-token (detik), token per detik (tokenizer), dan jumlah chunk stream"""
+        if self.start_time is None or self.first_token_time is None:
+            return {"ttft": None, "tokens_per_sec": None, "token_count": self.token_count,
+                    "chunk_count": self.chunk_count}
+        end_time = self.end_time or time.time()
+        stream_time = end_time - self.first_token_time
+        return {
+            "ttft": self.first_token_time - self.start_time,
+            "tokens_per_sec": self.token_count / stream_time if stream_time > 0 else None,
+            "token_count": self.token_count,
+            "chunk_count": self.chunk_count,
+        }
+
     def _update_display(self, final: bool):
-        """Format yang lebih bersih dengan batasan panjang"""
-        truncated = (self.response[:200] + '...') if len(self.response) > 200 else self.response
+        """Format yang lebih bersih, tampilkan respon utuh"""
+        content = self.response
         
         with self.container:
             if final:
                 st.markdown(f"""
                 <div class='assistant-response'>
                     <div class='response-header'>💡 Respon</div>
-                    <div class='response-content'>{truncated}</div>
+                    <div class='response-content'>{content}</div>
                 </div>
                 """, unsafe_allow_html=True)
             else:
@@ -61,6 +96,6 @@ class GeminiCallbackHandler(BaseCallbackHandler):
                 st.markdown(f"""
                 <div class='assistant-response'>
                     <div class='response-header'>🔄 Memproses</div>
-                    <div class='response-content'>{truncated}{cursor}</div>
+                    <div class='response-content'>{content}{cursor}</div>
                 </div>
                 """, unsafe_allow_html=True)
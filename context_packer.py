@@ -0,0 +1,148 @@
+# context_packer.py
+# Tahap antara retrieval dan prompt: dari kandidat yang lebih banyak, buang potongan yang tumpang
+# tindih (chunk_overlap di create_index) dan yang nyaris duplikat, diversifikasi dengan MMR memakai
+# vektor yang sudah ada di index (tanpa panggilan embedding), lalu isi batas token secara greedy.
+
+import os
+import re
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from token_utils import count_tokens, truncate_to_tokens
+
+DEFAULT_CONTEXT_TOKENS = 900
+DEFAULT_CANDIDATES = 12
+DEFAULT_MMR_LAMBDA = 0.7
+DUPLICATE_COSINE = 0.95
+DUPLICATE_SHINGLES = 0.8
+MIN_OVERLAP_CHARS = 30
+MAX_OVERLAP_CHARS = 400
+MIN_CHUNK_TOKENS = 24
+SEPARATOR = "\n"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class PackedContext(NamedTuple):
+    documents: List[Document]
+    text: str
+    tokens: int
+    candidates: int
+    duplicates: int
+
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return frozenset([" ".join(words)]) if words else frozenset()
+    return frozenset(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _overlap_length(left: str, right: str) -> int:
+    """Panjang akhiran left yang sama dengan awalan right (0 kalau di bawah MIN_OVERLAP_CHARS)"""
+    if len(left) < MIN_OVERLAP_CHARS or len(right) < MIN_OVERLAP_CHARS:
+        return 0
+    tail, anchor = left[-MAX_OVERLAP_CHARS:], right[:MIN_OVERLAP_CHARS]
+    # Posisi paling kiri tempat awalan right muncul di ekor left = overlap terpanjang
+    position = tail.find(anchor)
+    while position != -1:
+        if right.startswith(tail[position:]):
+            return len(tail) - position
+        position = tail.find(anchor, position + 1)
+    return 0
+
+
+def strip_overlap(text: str, selected: List[str]) -> str:
+    """Buang bagian text yang sudah ada di awal/akhir potongan terpilih (overlap antar chunk berdampingan)"""
+    for other in selected:
+        head = _overlap_length(other, text)
+        if head:
+            text = text[head:]
+        tail = _overlap_length(text, other)
+        if tail:
+            text = text[:-tail]
+    return text.strip()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def pack_context(docs: List[Document], vectors: Optional[np.ndarray] = None,
+                 token_budget: int = DEFAULT_CONTEXT_TOKENS, mmr_lambda: float = DEFAULT_MMR_LAMBDA,
+                 max_chunk_tokens: Optional[int] = None) -> PackedContext:
+    """Pilih potongan dari kandidat (urut relevansi dari retriever) yang muat dalam token_budget.
+
+    Relevansi diambil dari urutan retriever (sudah termasuk fusi hybrid); vektor hanya dipakai untuk
+    kemiripan antar kandidat. Tanpa vektor (jalur leksikal), kemiripan memakai shingle kata.
+    Satu potongan maksimal max_chunk_tokens (default setengah budget) supaya chunk panjang tidak
+    menghabiskan seluruh budget sendirian.
+    """
+    if not docs:
+        return PackedContext([], "", 0, 0, 0)
+
+    n = len(docs)
+    max_chunk_tokens = max_chunk_tokens or max(MIN_CHUNK_TOKENS, token_budget // 2)
+    relevance = 1.0 - np.arange(n, dtype=np.float32) / n
+    if vectors is not None and len(vectors) == n:
+        unit = _normalize(np.asarray(vectors, dtype=np.float32))
+        similarity, duplicate_threshold = unit @ unit.T, DUPLICATE_COSINE
+    else:
+        shingles = [_shingles(doc.page_content) for doc in docs]
+        similarity = np.array([[_jaccard(a, b) for b in shingles] for a in shingles], dtype=np.float32)
+        duplicate_threshold = DUPLICATE_SHINGLES
+
+    remaining = list(range(n))
+    chosen: List[int] = []
+    selected_texts: List[str] = []
+    selected_docs: List[Document] = []
+    used = duplicates = 0
+    while remaining and token_budget - used >= MIN_CHUNK_TOKENS:
+        if chosen:
+            redundancy = similarity[np.ix_(remaining, chosen)].max(axis=1)
+            scores = mmr_lambda * relevance[remaining] - (1.0 - mmr_lambda) * redundancy
+            best = remaining[int(np.argmax(scores))]
+        else:
+            best = remaining[0]
+        remaining.remove(best)
+
+        if chosen and similarity[best, chosen].max() >= duplicate_threshold:
+            duplicates += 1
+            continue
+
+        text = strip_overlap(docs[best].page_content, selected_texts)
+        if not text:
+            duplicates += 1
+            continue
+        tokens = count_tokens(text)
+        if tokens > max_chunk_tokens:
+            text = truncate_to_tokens(text, max_chunk_tokens)
+            tokens = count_tokens(text)
+        # Budget dihitung dari teks gabungan: separator antar potongan ikut terhitung
+        packed_tokens = count_tokens(SEPARATOR.join(selected_texts + [text]))
+        if packed_tokens > token_budget:
+            # Terlalu panjang untuk sisa budget; kandidat yang lebih pendek masih bisa masuk
+            continue
+        chosen.append(best)
+        selected_texts.append(text)
+        selected_docs.append(docs[best])
+        used = packed_tokens
+
+    return PackedContext(selected_docs, SEPARATOR.join(selected_texts), used, n, duplicates)
+
+
+def context_budget() -> int:
+    return int(os.getenv("KINDORA_CONTEXT_TOKENS", str(DEFAULT_CONTEXT_TOKENS)))
+
+
+def context_candidates() -> int:
+    return int(os.getenv("KINDORA_CONTEXT_CANDIDATES", str(DEFAULT_CANDIDATES)))
@@ -0,0 +1,197 @@
+# conversation_memory.py
+# Memori percakapan dengan batas token: giliran terbaru disimpan dalam sliding window (dihitung
+# dengan tiktoken), giliran yang keluar dari window dilipat ke ringkasan yang diperbarui di thread
+# latar. Prompt hanya menerima ringkasan + window, jadi ukurannya tetap walau sesi berjalan lama.
+# Giliran yang sudah masuk ringkasan dibuang; untuk tampilan hanya display_turns giliran terakhir disimpan.
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from token_utils import count_tokens, truncate_to_tokens
+
+DEFAULT_WINDOW_TOKENS = 1200
+DEFAULT_SUMMARY_TOKENS = 400
+DEFAULT_DISPLAY_TURNS = 200
+ROLE_LABELS = {"user": "Pengguna", "assistant": "Asisten"}
+
+# Ringkasan semua sesi dikerjakan di pool kecil yang sama, tidak pernah di jalur request
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+
+
+class Turn(NamedTuple):
+    role: str
+    content: str
+    tokens: int
+    ts: float
+
+
+def format_turns(turns: List[Turn]) -> str:
+    return "\n".join(f"{ROLE_LABELS.get(turn.role, turn.role)}: {turn.content}" for turn in turns)
+
+
+def extractive_summarizer(summary: str, turns: List[Turn], max_tokens: int = DEFAULT_SUMMARY_TOKENS) -> str:
+    """Ringkasan tanpa LLM: kalimat pertama tiap giliran, yang terbaru dipertahankan kalau melebihi batas"""
+    points = [summary] if summary else []
+    for turn in turns:
+        first_sentence = turn.content.strip().split("\n")[0].split(". ")[0][:200]
+        points.append(f"{ROLE_LABELS.get(turn.role, turn.role)}: {first_sentence}")
+    text = "\n".join(points)
+    while count_tokens(text) > max_tokens and len(points) > 1:
+        points.pop(0)
+        text = "\n".join(points)
+    return truncate_to_tokens(text, max_tokens)
+
+
+def make_llm_summarizer(llm, max_tokens: int = DEFAULT_SUMMARY_TOKENS) -> Callable[[str, List[Turn]], str]:
+    """Ringkasan inkremental lewat LLM; kalau gagal jatuh ke ringkasan ekstraktif"""
+    def summarize(summary: str, turns: List[Turn]) -> str:
+        prompt = f"""
+        Perbarui ringkasan percakapan berikut dengan giliran baru. Tulis dalam bahasa Indonesia,
+        maksimal {max_tokens} token, pertahankan fakta penting tentang pengguna dan topik yang dibahas.
+        --- RINGKASAN SEBELUMNYA ---
+        {summary or "(belum ada)"}
+        --- GILIRAN BARU ---
+        {format_turns(turns)}
+        --- RINGKASAN BARU ---
+        """
+        try:
+            return truncate_to_tokens(str(llm.invoke(prompt).content).strip(), max_tokens)
+        except Exception as e:
+            print(f"⚠️ Ringkasan LLM gagal, pakai ringkasan ekstraktif: {str(e)}")
+            return extractive_summarizer(summary, turns, max_tokens)
+    return summarize
+
+
+class ConversationMemory:
+    """Window token terbaru + ringkasan giliran lama (untuk prompt) + log giliran terakhir (untuk tampilan)"""
+
+    def __init__(self, window_tokens: int = DEFAULT_WINDOW_TOKENS, summary_tokens: int = DEFAULT_SUMMARY_TOKENS,
+                 summarizer: Optional[Callable[[str, List[Turn]], str]] = None,
+                 display_turns: int = DEFAULT_DISPLAY_TURNS):
+        self.window_tokens = window_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or (lambda summary, turns: extractive_summarizer(summary, turns, summary_tokens))
+        self._lock = threading.Lock()
+        # Giliran yang belum masuk ringkasan: window = self._turns[self._window_start:], sebelumnya antre diringkas
+        self._turns: List[Turn] = []
+        self._log: deque = deque(maxlen=display_turns)
+        self._window_start = 0
+        self._window_used = 0
+        self._summarized = 0
+        self._has_user_turn = False
+        self._summary = ""
+        self._summarizing = False
+        self._generation = 0
+
+    def add(self, role: str, content: str) -> Turn:
+        turn = Turn(role, content, count_tokens(content), time.time())
+        with self._lock:
+            self._turns.append(turn)
+            self._log.append(turn)
+            self._has_user_turn = self._has_user_turn or role == "user"
+            self._window_used += turn.tokens
+            # Giliran terbaru selalu masuk window walau sendirian melebihi batas
+            while self._window_used > self.window_tokens and self._window_start < len(self._turns) - 1:
+                self._window_used -= self._turns[self._window_start].tokens
+                self._window_start += 1
+            needs_summary = self._window_start > 0 and not self._summarizing
+            if needs_summary:
+                self._summarizing = True
+        if needs_summary:
+            _summary_executor.submit(self._summarize_pending)
+        return turn
+
+    def _summarize_pending(self):
+        while True:
+            with self._lock:
+                end = self._window_start
+                if end == 0:
+                    self._summarizing = False
+                    return
+                generation, summary, folded = self._generation, self._summary, self._turns[:end]
+            try:
+                new_summary = self.summarizer(summary, folded)
+            except Exception as e:
+                print(f"❌ Gagal meringkas percakapan: {str(e)}")
+                new_summary = extractive_summarizer(summary, folded, self.summary_tokens)
+            with self._lock:
+                if generation != self._generation:
+                    # Riwayat dihapus saat ringkasan sedang dibuat
+                    continue
+                self._summary = truncate_to_tokens(new_summary, self.summary_tokens)
+                # Giliran yang sudah diringkas dibuang; window bisa sudah maju lagi selama ringkasan dibuat
+                del self._turns[:end]
+                self._window_start -= end
+                self._summarized += end
+
+    @property
+    def summary(self) -> str:
+        with self._lock:
+            return self._summary
+
+    def window(self) -> List[Turn]:
+        with self._lock:
+            return self._turns[self._window_start:]
+
+    def context(self) -> str:
+        """Konteks percakapan untuk prompt: ringkasan + window (maks summary_tokens + window_tokens).
+
+        Kosong selama user belum bicara: sapaan asisten saja bukan riwayat pribadi, jadi jawaban
+        pertanyaan pertama tetap boleh diambil dari/disimpan ke cache jawaban bersama.
+        """
+        with self._lock:
+            if not self._has_user_turn:
+                return ""
+            summary, window = self._summary, self._turns[self._window_start:]
+        parts = []
+        if summary:
+            parts.append(f"Ringkasan percakapan sebelumnya:\n{summary}")
+        if window:
+            parts.append(format_turns(window))
+        return "\n\n".join(parts)
+
+    def page(self, page: int, page_size: int = 10) -> List[Turn]:
+        """Satu halaman riwayat tampilan (maks display_turns giliran), halaman 0 = giliran terbaru"""
+        with self._lock:
+            turns = list(self._log)
+        end = len(turns) - page * page_size
+        return turns[max(0, end - page_size):max(0, end)]
+
+    def last(self, n: int) -> List[Turn]:
+        with self._lock:
+            return list(self._log)[-n:] if n > 0 else []
+
+    def page_count(self, page_size: int = 10) -> int:
+        return max(1, -(-len(self) // page_size))
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Format lama ({role, content}) untuk save_chat_history"""
+        with self._lock:
+            return [{"role": turn.role, "content": turn.content} for turn in self._log]
+
+    def clear(self):
+        with self._lock:
+            self._turns = []
+            self._log.clear()
+            self._window_start = self._window_used = self._summarized = 0
+            self._has_user_turn = False
+            self._summary = ""
+            self._generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "turns": len(self._log),
+                "pending_turns": len(self._turns),
+                "window_turns": len(self._turns) - self._window_start,
+                "window_tokens": self._window_used,
+                "summarized_turns": self._summarized,
+                "summary_tokens": count_tokens(self._summary),
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._log)
@@ -1,61 +1,282 @@
 # ✅ create_index.py (VERSI FINAL, TANPA ERROR)
 # Membuat FAISS index dari CSV dengan Cohere + LangChain + User-Agent aman
+# Mode incremental: hanya chunk baru/berubah yang di-embed ulang, build bisa dilanjutkan
 
 import os
+import json
 import shutil
+import hashlib
+import argparse
+import faiss
+import numpy as np
 import pandas as pd
-import cohere
 from dotenv import load_dotenv
 from langchain_cohere import CohereEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.schema import Document
+from ann_index import INDEX_TYPES, build_ann_index, load_index_config, save_index_config
+from bm25_index import BM25Index
+from doc_store import write_from_vectorstore
+from embedding_cache import DiskEmbeddingStore
+from embedding_coalescer import query_batch_embedder
+from embedding_pipeline import COHERE_MAX_BATCH, embed_batches, iter_batches
+from faq_index import FaqIndex
+from index_pointer import new_version_dir, publish_version, resolve_index_dir
+from rate_limiter import TokenBucket
+from retriever import EMBEDDING_MODEL, _load_vectorstore, create_cohere_client
 
-def create_faiss_index():
+CSV_PATH = "data/Mental_Health_FAQ.csv"
+INDEX_DIR = "data/faiss_index"
+MANIFEST_FILE = "build_manifest.json"
+EMBED_BATCH_SIZE = COHERE_MAX_BATCH
+EMBED_WORKERS = 4
+EMBED_REQUESTS_PER_SECOND = 8.0
+# Tipe index yang menyimpan vektor asli (reconstruct tanpa kuantisasi); IVF-PQ/IVF-SQ8 hanya menyimpan kode lossy
+LOSSLESS_INDEX_TYPES = ("flat", "hnsw", "ivf")
+
+def content_hash(text: str, model: str = EMBEDDING_MODEL) -> str:
+    """Hash isi chunk + nama model (model berubah = semua chunk di-embed ulang)"""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+def load_chunks(csv_path: str):
+    """Baca CSV dan pecah tiap baris jadi chunk dengan ID stabil: <Question_ID>-<nomor chunk>"""
+    df = pd.read_csv(csv_path).fillna("")
+    df["combined"] = df.astype(str).agg(" ".join, axis=1)
+
+    splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    for position, row in df.iterrows():
+        row_id = str(row["Question_ID"]) if "Question_ID" in df.columns else str(position)
+        for n, chunk in enumerate(splitter.split_documents([Document(page_content=row["combined"])])):
+            chunk.metadata = {"row_id": row_id, "chunk": n}
+            yield f"{row_id}-{n}", chunk
+
+def build_faq_index(csv_path: str, embeddings, previous=None, batch_size: int = EMBED_BATCH_SIZE,
+                    counts: dict = None):
+    """Index pertanyaan FAQ (exact/fuzzy/vektor pertanyaan) untuk jalur cepat tanpa LLM"""
+    df = pd.read_csv(csv_path).fillna("")
+    if not {"Questions", "Answers"} <= set(df.columns):
+        print("⚠️ Kolom Questions/Answers tidak ada, index FAQ dilewati")
+        return None
+    df = df[df["Questions"].astype(str).str.strip() != ""]
+    row_ids = [str(row_id) for row_id in (df["Question_ID"] if "Question_ID" in df.columns else df.index)]
+
+    # Pertanyaan di-embed sebagai query supaya sebanding dengan embedding pertanyaan user
+    embed_query_batch = query_batch_embedder(embeddings)
+    def embed(texts):
+        vectors = []
+        for batch in iter_batches(texts, batch_size):
+            vectors.extend(embed_query_batch(batch))
+        if counts is not None:
+            counts["faq_embedded"] = counts.get("faq_embedded", 0) + len(texts)
+        return vectors
+
+    return FaqIndex.build(row_ids, df["Questions"].astype(str).tolist(), df["Answers"].astype(str).tolist(),
+                          embed=embed, previous=previous)
+
+def load_existing_vectors(index_dir: str, raw_vectors: DiskEmbeddingStore, model: str = EMBEDDING_MODEL):
+    """Vektor chunk index lama yang belum ada di penyimpanan vektor mentah, dipetakan berdasarkan hash isi chunk.
+
+    Sumber utama vektor yang dipakai ulang adalah `raw_vectors` (hasil embed asli, diisi setiap build).
+    Reconstruct dari index lama hanya cadangan untuk index yang dibangun sebelum penyimpanan itu ada, dan
+    hanya untuk tipe index lossless; vektor terkuantisasi tidak pernah dimasukkan ulang sebagai embedding.
+    """
+    index_dir = resolve_index_dir(index_dir)
+    index_file = os.path.join(index_dir, "index.faiss")
+    if not os.path.exists(index_file):
+        return {}, {}
+
+    manifest = {}
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("model") != model:
+            print("⚠️ Model embedding berbeda dengan index lama, semua chunk di-embed ulang")
+            return {}, {}
+
+    chunks = manifest.get("chunks", {})
+    missing = [chunk_hash for chunk_hash in set(chunks.values()) if chunk_hash not in raw_vectors]
+    if chunks and not missing:
+        return {}, chunks
+    index_type = load_index_config(index_dir).get("type", "flat")
+    if index_type not in LOSSLESS_INDEX_TYPES:
+        print(f"⚠️ Index lama ({index_type}) hanya menyimpan vektor terkuantisasi, "
+              "chunk tanpa vektor mentah di-embed ulang")
+        return {}, chunks
+
+    vectors = {}
+    try:
+        vectorstore = _load_vectorstore(index_dir, None, mmap=False)
+        for position, doc_id in vectorstore.index_to_docstore_id.items():
+            doc = vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                chunk_hash = content_hash(doc.page_content, model)
+                if chunk_hash not in raw_vectors:
+                    vectors[chunk_hash] = vectorstore.index.reconstruct(int(position))
+    except Exception as e:
+        # Mis. index tanpa direct map: chunk yang vektornya tidak ada di-embed ulang
+        print(f"⚠️ Vektor index lama tidak bisa dibaca, chunk tanpa vektor mentah di-embed ulang: {str(e)}")
+        return {}, chunks
+    return vectors, chunks
+
+def create_faiss_index(incremental: bool = True, batch_size: int = EMBED_BATCH_SIZE,
+                       workers: int = EMBED_WORKERS,
+                       requests_per_second: float = EMBED_REQUESTS_PER_SECOND,
+                       index_type: str = "flat", csv_path: str = CSV_PATH, index_dir: str = INDEX_DIR,
+                       embeddings=None, **index_params):
     load_dotenv()
 
     # ✅ Set user agent via ENV (bukan di parameter)
     os.environ["LANGCHAIN_USER_AGENT"] = "mental-health-chatbot"
 
-    # Path ke file dan index
-    csv_path = "data/Mental_Health_FAQ.csv"
-    index_dir = "data/faiss_index"
+    # Vektor mentah hasil embed disimpan permanen di samping index: sumber vektor untuk build
+    # incremental berikutnya sekaligus checkpoint kalau build terputus
+    vectors_dir = index_dir + ".vectors"
 
     # Validasi file CSV
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"❌ File CSV tidak ditemukan: {csv_path}")
 
-    # Hapus index lama jika ada
-    if os.path.exists(index_dir):
-        shutil.rmtree(index_dir)
-    os.makedirs(index_dir, exist_ok=True)
-
     # Ambil API Key
     cohere_api_key = os.getenv("COHERE_API_KEY")
-    if not cohere_api_key:
+    if not cohere_api_key and embeddings is None:
         raise ValueError("❌ COHERE_API_KEY tidak ditemukan di file .env")
 
-    # Baca dan gabungkan data
-    df = pd.read_csv(csv_path).fillna("")
-    df["combined"] = df.astype(str).agg(" ".join, axis=1)
-    docs = [Document(page_content=text) for text in df["combined"].tolist()]
-
-    # Split teks jadi chunks
-    splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
+    # Vektor yang bisa dipakai ulang: vektor mentah build sebelumnya (termasuk build yang terputus),
+    # ditambah reconstruct dari index lama lossless untuk chunk yang belum punya vektor mentah
+    if not incremental and os.path.exists(vectors_dir):
+        shutil.rmtree(vectors_dir)
+    raw_vectors = DiskEmbeddingStore(vectors_dir)
+    if incremental:
+        old_vectors, old_chunks = load_existing_vectors(index_dir, raw_vectors)
+    else:
+        old_vectors, old_chunks = {}, {}
 
     # Embeddings & vectorstore
-    cohere_client = cohere.Client(api_key=cohere_api_key)
-    embeddings = CohereEmbeddings(
-        client=cohere_client,
-        model="embed-multilingual-v3.0",  # ✅ WAJIB
-        async_client=None
+    if embeddings is None:
+        cohere_client = create_cohere_client(cohere_api_key)
+        embeddings = CohereEmbeddings(
+            client=cohere_client,
+            model=EMBEDDING_MODEL,  # ✅ WAJIB
+            async_client=None,
+            base_url=os.getenv("COHERE_BASE_URL")
+        )
+
+    hashes = {}
+    counts = {"reused": 0, "embedded": 0, "faq_embedded": 0}
+    vectorstore = None
+
+    def add_to_index(chunk_id, doc, vector):
+        # Vektor langsung masuk ke index begitu tersedia, tidak dikumpulkan dulu
+        nonlocal vectorstore
+        vector = np.asarray(vector, dtype=np.float32)
+        if vectorstore is None:
+            vectorstore = FAISS(
+                embedding_function=embeddings,
+                index=faiss.IndexFlatL2(vector.shape[0]),
+                docstore=InMemoryDocstore(),
+                index_to_docstore_id={}
+            )
+        vectorstore.add_embeddings([(doc.page_content, vector.tolist())], metadatas=[doc.metadata], ids=[chunk_id])
+
+    def pending_chunks():
+        # Chunk yang tidak berubah langsung dipakai ulang; sisanya dialirkan ke pipeline embedding
+        for chunk_id, doc in load_chunks(csv_path):
+            chunk_hash = hashes[chunk_id] = content_hash(doc.page_content)
+            vector = raw_vectors.get(chunk_hash)
+            if vector is None:
+                vector = old_vectors.get(chunk_hash)
+                if vector is not None:
+                    raw_vectors.put(chunk_hash, vector)
+            if vector is not None:
+                add_to_index(chunk_id, doc, vector)
+                counts["reused"] += 1
+                continue
+            yield chunk_id, doc
+
+    # Embed hanya chunk baru/berubah: beberapa batch paralel + rate limit, checkpoint per batch
+    results = embed_batches(
+        iter_batches(pending_chunks(), batch_size),
+        embeddings.embed_documents,
+        text_of=lambda item: item[1].page_content,
+        max_workers=workers,
+        rate_limiter=TokenBucket(requests_per_second, capacity=workers)
     )
+    for batch, vectors in results:
+        for (chunk_id, doc), vector in zip(batch, vectors):
+            raw_vectors.put(hashes[chunk_id], np.asarray(vector, dtype=np.float32))
+            add_to_index(chunk_id, doc, vector)
+        counts["embedded"] += len(batch)
+        print(f"⏳ {counts['embedded']} chunk di-embed")
 
-    vectorstore = FAISS.from_documents(chunks, embeddings)
-    vectorstore.save_local(index_dir)
+    if vectorstore is None:
+        raise ValueError(f"❌ Tidak ada data untuk di-index di: {csv_path}")
+
+    # Ganti index flat hasil streaming dengan tipe ANN yang dipilih (posisi vektor tetap sama)
+    flat_index = vectorstore.index
+    vectorstore.index, index_config = build_ann_index(
+        flat_index.reconstruct_n(0, flat_index.ntotal), index_type, **index_params
+    )
 
+    # Tulis index baru ke folder versi baru, lalu publikasikan secara atomik (lihat index_pointer.py)
+    tmp_dir = new_version_dir(index_dir)
+    faiss.write_index(vectorstore.index, os.path.join(tmp_dir, "index.faiss"))
+    # Docstore memory-mapped (bukan index.pkl): retriever tidak perlu unpickle semua Document saat load
+    write_from_vectorstore(tmp_dir, vectorstore.index_to_docstore_id, vectorstore.docstore)
+    save_index_config(tmp_dir, index_config)
+    # Index leksikal BM25 disimpan di samping index.faiss untuk pencarian hybrid
+    BM25Index.from_docstore(vectorstore.index_to_docstore_id, vectorstore.docstore).save(tmp_dir)
+    # Index pertanyaan FAQ; vektor pertanyaan lama dipakai ulang kalau model embedding sama
+    previous_dir = resolve_index_dir(index_dir)
+    previous_faq = FaqIndex.load(previous_dir) if old_chunks and FaqIndex.exists(previous_dir) else None
+    faq = build_faq_index(csv_path, embeddings, previous=previous_faq, batch_size=batch_size, counts=counts)
+    if faq is not None:
+        faq.save(tmp_dir)
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({"model": EMBEDDING_MODEL, "chunks": hashes}, f)
+
+    publish_version(index_dir, tmp_dir)
+    # Vektor mentah chunk yang sudah tidak ada di CSV dibuang
+    raw_vectors.compact(keep=hashes.values())
+
+    removed = [chunk_id for chunk_id in old_chunks if chunk_id not in hashes]
+    print(f"📊 {len(hashes)} chunk: {counts['reused']} dipakai ulang, "
+          f"{counts['embedded']} di-embed, {len(removed)} dihapus")
     print(f"✅ FAISS index berhasil disimpan ke folder: {index_dir}")
+    return {"chunks": len(hashes), **counts, "removed": len(removed)}
 
 if __name__ == "__main__":
-    create_faiss_index()
+    parser = argparse.ArgumentParser(description="Buat FAISS index dari Mental_Health_FAQ.csv")
+    parser.add_argument("--full", action="store_true", help="Build ulang penuh tanpa memakai vektor lama")
+    parser.add_argument("--csv", default=CSV_PATH, help="Sumber data CSV (mis. korpus untuk shard lain)")
+    parser.add_argument("--index-dir", default=INDEX_DIR, help="Folder output index (satu folder per shard)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Teks per panggilan embed (maks 96)")
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS, help="Jumlah batch yang berjalan paralel")
+    parser.add_argument("--rps", type=float, default=EMBED_REQUESTS_PER_SECOND, help="Batas request embed per detik")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat", help="Tipe index FAISS")
+    parser.add_argument("--nlist", type=int, help="Jumlah cluster IVF (default otomatis)")
+    parser.add_argument("--nprobe", type=int, help="Default nprobe untuk index IVF")
+    parser.add_argument("--hnsw-m", type=int, help="Jumlah tetangga per node HNSW")
+    parser.add_argument("--ef-construction", type=int, help="efConstruction HNSW")
+    parser.add_argument("--ef-search", type=int, help="Default efSearch HNSW")
+    parser.add_argument("--pq-m", type=int, help="Jumlah sub-quantizer IVF-PQ")
+    parser.add_argument("--pq-bits", type=int, help="Bit per kode IVF-PQ")
+    args = parser.parse_args()
+    create_faiss_index(
+        incremental=not args.full,
+        csv_path=args.csv,
+        index_dir=args.index_dir,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        requests_per_second=args.rps,
+        index_type=args.index_type,
+        nlist=args.nlist,
+        nprobe=args.nprobe,
+        hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction,
+        ef_search=args.ef_search,
+        pq_m=args.pq_m,
+        pq_bits=args.pq_bits
+    )
@@ -0,0 +1,179 @@
+# doc_store.py
+# Docstore on-disk yang di-memory-map, pengganti index.pkl: blob teks UTF-8, blob metadata JSON, dan
+# blob id docstore, masing-masing dengan array offset (docstore_offsets.npy). Baris ke-i = posisi ke-i
+# di index.faiss, jadi peta posisi FAISS -> id docstore cukup dibaca dari kolom id. Saat load tidak ada
+# unpickle dan tidak ada objek Document yang dibuat; Document baru di-decode untuk k hasil pencarian.
+#
+#   python doc_store.py data/faiss_index                   # konversi index lama (index.pkl) ke format ini
+#   python doc_store.py data/faiss_index --remove-pickle   # sekalian hapus index.pkl
+
+import argparse
+import json
+import mmap
+import os
+import pickle
+import threading
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+TEXT_FILE = "docstore_text.bin"
+META_FILE = "docstore_meta.bin"
+IDS_FILE = "docstore_ids.bin"
+OFFSETS_FILE = "docstore_offsets.npy"
+PICKLE_FILE = "index.pkl"
+# Baris di docstore_offsets.npy: offset byte kolom teks, metadata, dan id (masing-masing n + 1)
+TEXT, META, IDS = 0, 1, 2
+
+
+def _map_file(path: str):
+    """mmap read-only; file kosong (docstore kosong) tidak bisa di-mmap, pakai bytes kosong"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mmap, "MADV_RANDOM"):
+        # Akses acak per dokumen: tanpa readahead, hanya halaman dokumen hasil pencarian yang masuk RSS
+        mapped.madvise(mmap.MADV_RANDOM)
+    return mapped
+
+
+def write_docstore(index_dir: str, documents: Iterable[Tuple[str, Document]]):
+    """Tulis (id, Document) berurutan sesuai posisi di index FAISS"""
+    offsets = [[0], [0], [0]]
+    paths = [os.path.join(index_dir, name) for name in (TEXT_FILE, META_FILE, IDS_FILE)]
+    files = [open(path, "wb") for path in paths]
+    try:
+        for doc_id, doc in documents:
+            columns = (doc.page_content, json.dumps(doc.metadata or {}, ensure_ascii=False), doc_id)
+            for column, (f, value) in enumerate(zip(files, columns)):
+                data = value.encode("utf-8")
+                f.write(data)
+                offsets[column].append(offsets[column][-1] + len(data))
+    finally:
+        for f in files:
+            f.close()
+    np.save(os.path.join(index_dir, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+
+
+def write_from_vectorstore(index_dir: str, index_to_docstore_id: Dict[int, str], docstore):
+    """Docstore FAISS (LangChain) -> format mmap; posisi tanpa dokumen disimpan sebagai teks kosong"""
+    def rows():
+        for position in range(len(index_to_docstore_id)):
+            doc_id = index_to_docstore_id[position]
+            doc = docstore.search(doc_id)
+            yield doc_id, doc if isinstance(doc, Document) else Document(page_content="")
+    write_docstore(index_dir, rows())
+
+
+def docstore_exists(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, OFFSETS_FILE))
+
+
+class MmapDocstore(Docstore):
+    """Docstore read-only di atas file mmap; kompatibel dengan docstore LangChain (search by id)"""
+
+    def __init__(self, index_dir: str):
+        self.offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")
+        self._blobs = [_map_file(os.path.join(index_dir, name)) for name in (TEXT_FILE, META_FILE, IDS_FILE)]
+        self._rows: Optional[Dict[str, int]] = None
+        self._rows_lock = threading.Lock()
+        # Mapping lazy untuk FAISS(index_to_docstore_id=...) dan IndexState.positions
+        self.ids = PositionIds(self)
+        self.positions = RowsById(self)
+
+    def __len__(self):
+        return self.offsets.shape[1] - 1
+
+    def _column(self, column: int, row: int) -> str:
+        start, end = self.offsets[column, row], self.offsets[column, row + 1]
+        return self._blobs[column][start:end].decode("utf-8")
+
+    def id_at(self, row: int) -> str:
+        return self._column(IDS, row)
+
+    def document(self, row: int) -> Document:
+        return Document(id=self.id_at(row), page_content=self._column(TEXT, row),
+                        metadata=json.loads(self._column(META, row)))
+
+    def row_of(self, doc_id: str) -> Optional[int]:
+        """Baris untuk id docstore; peta id -> baris baru dibangun saat pertama kali dibutuhkan"""
+        if self._rows is None:
+            with self._rows_lock:
+                if self._rows is None:
+                    ids = self._blobs[IDS][:].decode("utf-8")
+                    bounds = self.offsets[IDS].tolist()
+                    if ids.isascii():
+                        self._rows = {ids[bounds[i]:bounds[i + 1]]: i for i in range(len(self))}
+                    else:
+                        self._rows = {self.id_at(i): i for i in range(len(self))}
+        return self._rows.get(doc_id)
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self.row_of(search)
+        if row is None:
+            # Sama dengan InMemoryDocstore: string pesan kalau id tidak ada
+            return f"ID {search} not found."
+        return self.document(row)
+
+
+class PositionIds(Mapping):
+    """Posisi FAISS -> id docstore, dibaca langsung dari kolom id"""
+
+    def __init__(self, store: MmapDocstore):
+        self.store = store
+
+    def __getitem__(self, position: int) -> str:
+        if not 0 <= position < len(self.store):
+            raise KeyError(position)
+        return self.store.id_at(position)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self.store)))
+
+    def __len__(self):
+        return len(self.store)
+
+
+class RowsById(Mapping):
+    """Id docstore -> posisi FAISS (lazy, lewat MmapDocstore.row_of)"""
+
+    def __init__(self, store: MmapDocstore):
+        self.store = store
+
+    def __getitem__(self, doc_id: str) -> int:
+        row = self.store.row_of(doc_id)
+        if row is None:
+            raise KeyError(doc_id)
+        return row
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.store.id_at(row) for row in range(len(self.store)))
+
+    def __len__(self):
+        return len(self.store)
+
+
+def convert_index(index_dir: str, remove_pickle: bool = False) -> int:
+    """Konversi index.pkl (docstore LangChain hasil pickle) ke format mmap; kembalikan jumlah dokumen"""
+    from index_pointer import resolve_index_dir
+    index_dir = resolve_index_dir(index_dir)
+    pickle_path = os.path.join(index_dir, PICKLE_FILE)
+    with open(pickle_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    write_from_vectorstore(index_dir, index_to_docstore_id, docstore)
+    if remove_pickle:
+        os.remove(pickle_path)
+    return len(index_to_docstore_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Konversi index.pkl ke docstore memory-mapped")
+    parser.add_argument("index_dir", nargs="?", default="data/faiss_index", help="Folder index FAISS")
+    parser.add_argument("--remove-pickle", action="store_true", help="Hapus index.pkl setelah konversi")
+    args = parser.parse_args()
+    count = convert_index(args.index_dir, remove_pickle=args.remove_pickle)
+    print(f"✅ {count} dokumen dikonversi ke docstore mmap di: {args.index_dir}")
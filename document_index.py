@@ -0,0 +1,90 @@
+# document_index.py
+# Index vektor sementara per dokumen yang di-upload: dokumen di-chunk dan di-embed sekali,
+# setiap pertanyaan hanya mengirim chunk paling relevan dalam batas token. Kalau embedding query
+# tidak tersedia (layanan embedding gagal/lambat), chunk dipilih lewat BM25 atas chunk yang sama.
+
+import hashlib
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from bm25_index import BM25Index
+from embedding_pipeline import embed_batches, iter_batches
+from token_utils import count_tokens, truncate_to_tokens
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+DEFAULT_TOP_K = 6
+DEFAULT_TOKEN_BUDGET = 1500
+
+
+class DocumentIndex:
+    """Index FAISS in-memory untuk satu dokumen, memakai embeddings yang sama dengan FaissRetriever"""
+
+    def __init__(self, text: str, embeddings, chunk_size: int = CHUNK_SIZE,
+                 chunk_overlap: int = CHUNK_OVERLAP, batch_size: int = 48, workers: int = 2):
+        if not text or not text.strip():
+            raise ValueError("❌ Dokumen kosong, tidak ada yang bisa di-index")
+
+        self.content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.chunks = [chunk for chunk in splitter.split_text(text) if chunk.strip()]
+        self.vectorstore = None
+        self.bm25 = BM25Index.build([str(position) for position in range(len(self.chunks))], self.chunks)
+
+        items = list(enumerate(self.chunks))
+        for batch, vectors in embed_batches(iter_batches(items, batch_size), embeddings.embed_documents,
+                                            text_of=lambda item: item[1], max_workers=workers):
+            vectors = np.asarray(vectors, dtype=np.float32)
+            if self.vectorstore is None:
+                self.vectorstore = FAISS(
+                    embedding_function=embeddings,
+                    index=faiss.IndexFlatL2(vectors.shape[1]),
+                    docstore=InMemoryDocstore(),
+                    index_to_docstore_id={}
+                )
+            self.vectorstore.add_embeddings(
+                [(chunk, vector.tolist()) for (_, chunk), vector in zip(batch, vectors)],
+                metadatas=[{"position": position} for position, _ in batch]
+            )
+
+    def _ranked(self, question: str, vector, k: int) -> List[Tuple[int, str]]:
+        """(posisi, chunk) terurut relevansi: vektor kalau ada, selain itu BM25, terakhir awal dokumen"""
+        if vector is not None:
+            docs = self.vectorstore.similarity_search_by_vector(list(vector), k=k)
+            return [(doc.metadata.get("position", 0), doc.page_content) for doc in docs]
+        ranked = [(int(position), self.chunks[int(position)]) for position, _ in self.bm25.search(question, k=k)]
+        return ranked or list(enumerate(self.chunks[:k]))
+
+    def top_chunks(self, question: str, k: int = DEFAULT_TOP_K,
+                   token_budget: int = DEFAULT_TOKEN_BUDGET, vector=None) -> List[str]:
+        """Chunk paling relevan (maks k) yang muat dalam token_budget, diurutkan sesuai posisi di dokumen.
+
+        `vector` = embedding pertanyaan (FaissRetriever.embed_query, dengan batas waktu); None = peringkat BM25.
+        """
+        selected, used = [], 0
+        for position, chunk in self._ranked(question, vector, k):
+            tokens = count_tokens(chunk)
+            if used + tokens > token_budget:
+                if not selected:
+                    # Chunk pertama tetap dipakai, dipotong supaya muat
+                    selected.append((position, truncate_to_tokens(chunk, token_budget)))
+                continue
+            selected.append((position, chunk))
+            used += tokens
+        return [chunk for _, chunk in sorted(selected)]
+
+    def context_for(self, question: str, k: int = DEFAULT_TOP_K,
+                    token_budget: int = DEFAULT_TOKEN_BUDGET, vector=None) -> str:
+        return "\n...\n".join(self.top_chunks(question, k=k, token_budget=token_budget, vector=vector))
+
+
+def build_document_index(text: str, embeddings, existing: Optional[DocumentIndex] = None) -> DocumentIndex:
+    """Pakai ulang index kalau isi dokumen sama; kalau berbeda, buat index baru"""
+    if existing is not None and existing.content_hash == hashlib.sha256(text.encode("utf-8")).hexdigest():
+        return existing
+    return DocumentIndex(text, embeddings)
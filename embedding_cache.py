@@ -0,0 +1,436 @@
+# embedding_cache.py
+# Cache embedding query dua tingkat: LRU di memori (size + TTL) dan penyimpanan disk
+# (array float32 memory-mapped + index key, aman dipakai bersama beberapa proses) supaya query yang
+# sama tidak memanggil Cohere lagi.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Batas tier disk cache query: entri terlama dibuang lewat compaction (50k x 1024 dim ~ 200 MB)
+DEFAULT_DISK_MAX_ENTRIES = 50000
+DEFAULT_DISK_TTL = 30 * 24 * 3600.0
+
+
+def normalize_query(text: str) -> str:
+    """Normalisasi query: unicode NFKC, huruf kecil, spasi dirapikan"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def make_cache_key(text: str, model: str) -> str:
+    """Key cache = hash dari nama model + query yang sudah dinormalisasi"""
+    raw = f"{model}\x00{normalize_query(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Lock eksklusif antar proses (flock di Linux/macOS, msvcrt di Windows)"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class DiskEmbeddingStore:
+    """Penyimpanan embedding di disk yang aman dipakai beberapa proses sekaligus (Streamlit, api_server, build).
+
+    Data per generasi: vectors-<gen>.f32 (append-only, dibaca lewat memmap) + keys-<gen>.jsonl (key -> baris);
+    meta.json menunjuk generasi aktif. Penulisan memegang file lock eksklusif dan nomor baris diambil dari
+    panjang file vektor di bawah lock, jadi dua proses tidak pernah memakai baris yang sama. Key yang ditulis
+    proses lain terbaca saat cache miss. Compaction (otomatis lewat max_entries, atau compact()) menulis
+    generasi baru berisi entri terbaru saja lalu mengganti meta.json secara atomik.
+    """
+
+    META_FILE = "meta.json"
+    LOCK_FILE = ".lock"
+
+    def __init__(self, path: str, max_entries: Optional[int] = None, max_age: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._rows: Dict[str, tuple] = {}
+        self._dim: Optional[int] = None
+        self._generation: Optional[int] = None
+        self._keys_offset = 0
+        self._vectors = None
+
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            self._refresh()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _vectors_file(self, generation: int) -> str:
+        return self._file(f"vectors-{generation}.f32")
+
+    def _keys_file(self, generation: int) -> str:
+        return self._file(f"keys-{generation}.jsonl")
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(self._file(self.META_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, generation: int):
+        tmp = self._file(self.META_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": self._dim, "generation": generation}, f)
+        os.replace(tmp, self._file(self.META_FILE))
+
+    def _refresh(self, locked: bool = False):
+        """Baca key baru dari keys-<gen>.jsonl (tulisan proses lain); generasi berubah = muat ulang penuh.
+
+        Dipanggil dengan self._lock; `locked` = file lock juga dipegang (boleh memperbaiki sisa tulisan terputus).
+        """
+        meta = self._read_meta()
+        if meta is None:
+            return
+        if "generation" not in meta:
+            # Format lama (vectors.f32 berkapasitas tetap + keys.jsonl): dipindah ke generasi 1 di bawah
+            # file lock; meta dibaca ulang di sana kalau proses lain sudah lebih dulu memindahkannya
+            if locked:
+                self._migrate_legacy(meta)
+            else:
+                with _file_lock(self._file(self.LOCK_FILE)):
+                    self._refresh(locked=True)
+            return
+        if meta["generation"] != self._generation:
+            self._dim = int(meta["dim"])
+            self._generation = meta["generation"]
+            self._rows = {}
+            self._keys_offset = 0
+            self._vectors = None
+
+        keys_path = self._keys_file(self._generation)
+        if not os.path.exists(keys_path):
+            return
+        with open(keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            self._rows[item["key"]] = (item["row"], item.get("ts", 0.0))
+        self._keys_offset += end
+        if locked and end < len(data):
+            # Baris terakhir terpotong (proses mati saat menulis): buang supaya append berikutnya tetap rapi
+            with open(keys_path, "r+b") as f:
+                f.truncate(self._keys_offset)
+
+    def _migrate_legacy(self, meta: dict):
+        rows: Dict[str, tuple] = {}
+        keys_path = self._file("keys.jsonl")
+        if os.path.exists(keys_path):
+            with open(keys_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if item["row"] < int(meta["capacity"]):
+                        rows[item["key"]] = (item["row"], item.get("ts", 0.0))
+        self._dim = int(meta["dim"])
+        vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r",
+                            shape=(int(meta["capacity"]), self._dim)) if rows else None
+        self._write_generation(1, [(key, vectors[row], ts) for key, (row, ts) in rows.items()])
+        del vectors
+        for name in ("vectors.f32", "keys.jsonl"):
+            try:
+                os.remove(self._file(name))
+            except OSError:
+                pass
+
+    def _write_generation(self, generation: int, entries: List[tuple]):
+        """Tulis generasi baru dari (key, vektor, ts), aktifkan lewat meta.json, lalu pakai di proses ini"""
+        with open(self._vectors_file(generation), "wb") as f:
+            for _, vector, _ in entries:
+                f.write(np.asarray(vector, dtype=np.float32).tobytes())
+        with open(self._keys_file(generation), "w", encoding="utf-8") as f:
+            for row, (key, _, ts) in enumerate(entries):
+                f.write(json.dumps({"key": key, "row": row, "ts": ts}) + "\n")
+        self._write_meta(generation)
+        self._generation = generation
+        self._rows = {key: (row, ts) for row, (key, _, ts) in enumerate(entries)}
+        self._keys_offset = os.path.getsize(self._keys_file(generation))
+        self._vectors = None
+
+    def _vector(self, row: int) -> np.ndarray:
+        if self._vectors is None or row >= self._vectors.shape[0]:
+            # File vektor bertambah (append proses ini/proses lain): map ulang sepanjang file
+            rows = os.path.getsize(self._vectors_file(self._generation)) // (self._dim * 4)
+            self._vectors = np.memmap(self._vectors_file(self._generation), dtype=np.float32, mode="r",
+                                      shape=(rows, self._dim))
+        return np.array(self._vectors[row], dtype=np.float32)
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[np.ndarray]:
+        max_age = max_age if max_age is not None else self.max_age
+        with self._lock:
+            entry = self._rows.get(key)
+            if entry is None:
+                self._refresh()
+                entry = self._rows.get(key)
+            if entry is None:
+                return None
+            row, ts = entry
+            if max_age is not None and time.time() - ts > max_age:
+                return None
+            return self._vector(row)
+
+    def put(self, key: str, vector: np.ndarray):
+        """Simpan vektor untuk key baru; key yang sudah ada (di proses mana pun) dilewati"""
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock, _file_lock(self._file(self.LOCK_FILE)):
+            self._refresh(locked=True)
+            if key in self._rows:
+                return
+            if self._dim is None:
+                self._dim = vector.shape[0]
+                self._write_generation(1, [])
+            elif vector.shape[0] != self._dim:
+                raise ValueError(f"❌ Dimensi embedding berubah: {self._dim} -> {vector.shape[0]}")
+
+            vectors_path = self._vectors_file(self._generation)
+            row_bytes = self._dim * 4
+            size = os.path.getsize(vectors_path)
+            with open(vectors_path, "r+b") as f:
+                if size % row_bytes:
+                    # Sisa vektor yang terpotong dari proses yang mati saat menulis
+                    f.truncate(size - size % row_bytes)
+                row = size // row_bytes
+                f.seek(row * row_bytes)
+                f.write(vector.tobytes())
+
+            # Key ditulis setelah vektor tersimpan supaya index tidak menunjuk ke data kosong
+            ts = time.time()
+            line = (json.dumps({"key": key, "row": row, "ts": ts}) + "\n").encode("utf-8")
+            with open(self._keys_file(self._generation), "ab") as f:
+                f.write(line)
+            self._keys_offset += len(line)
+            self._rows[key] = (row, ts)
+
+            if self.max_entries is not None and len(self._rows) > self.max_entries:
+                # Sisakan ~90% kapasitas supaya compaction tidak terjadi di setiap put berikutnya
+                self._compact(limit=max(1, self.max_entries * 9 // 10))
+
+    def compact(self, keep: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> int:
+        """Tulis ulang store tanpa entri kedaluwarsa (max_age), di luar `keep`, atau di luar `limit` terbaru.
+
+        Mengembalikan jumlah entri yang dibuang.
+        """
+        with self._lock, _file_lock(self._file(self.LOCK_FILE)):
+            self._refresh(locked=True)
+            return self._compact(keep=keep, limit=limit)
+
+    def _compact(self, keep: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> int:
+        now = time.time()
+        keep = set(keep) if keep is not None else None
+        entries = [(key, row, ts) for key, (row, ts) in self._rows.items()
+                   if (keep is None or key in keep) and (self.max_age is None or now - ts <= self.max_age)]
+        entries.sort(key=lambda entry: entry[2], reverse=True)
+        if limit is not None:
+            entries = entries[:limit]
+        removed = len(self._rows) - len(entries)
+        if removed == 0 or self._generation is None:
+            return 0
+
+        old_generation = self._generation
+        self._write_generation(old_generation + 1, [(key, self._vector(row), ts) for key, row, ts in entries])
+        for path in (self._vectors_file(old_generation), self._keys_file(old_generation)):
+            try:
+                os.remove(path)
+            except OSError:
+                # Windows: file masih dibuka proses lain, dibiarkan
+                pass
+        return removed
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key not in self._rows:
+                self._refresh()
+            return key in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+
+class QueryEmbeddingCache:
+    """Cache embedding query: LRU di memori (maxsize + TTL) di depan DiskEmbeddingStore"""
+
+    def __init__(self, cache_dir: Optional[str] = None, maxsize: int = 2048,
+                 ttl: Optional[float] = 3600.0, disk_ttl: Optional[float] = DEFAULT_DISK_TTL,
+                 disk_max_entries: Optional[int] = DEFAULT_DISK_MAX_ENTRIES):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = DiskEmbeddingStore(cache_dir, max_entries=disk_max_entries, max_age=disk_ttl) if cache_dir else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.embed_calls = 0
+        self.embed_seconds = 0.0
+        self.lookup_seconds = 0.0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        start = time.perf_counter()
+        try:
+            now = time.time()
+            with self._lock:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    vector, ts = entry
+                    if self.ttl is None or now - ts <= self.ttl:
+                        self._memory.move_to_end(key)
+                        self.memory_hits += 1
+                        return vector
+                    del self._memory[key]
+
+            if self.disk is not None:
+                vector = self.disk.get(key, max_age=self.disk_ttl)
+                if vector is not None:
+                    self._remember(key, vector)
+                    with self._lock:
+                        self.disk_hits += 1
+                    return vector
+
+            with self._lock:
+                self.misses += 1
+            return None
+        finally:
+            with self._lock:
+                self.lookup_seconds += time.perf_counter() - start
+
+    def put(self, key: str, vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        self._remember(key, vector)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, vector)
+            except Exception as e:
+                print(f"❌ Gagal menyimpan embedding ke disk: {str(e)}")
+        return vector
+
+    def record_embed(self, seconds: float):
+        with self._lock:
+            self.embed_calls += 1
+            self.embed_seconds += seconds
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._memory[key] = (vector, time.time())
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Counter hit/miss dan latensi (detik) untuk monitoring"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_size": len(self._memory),
+                "disk_size": len(self.disk) if self.disk is not None else 0,
+                "embed_calls": self.embed_calls,
+                "avg_embed_latency": self.embed_seconds / self.embed_calls if self.embed_calls else 0.0,
+                "avg_lookup_latency": self.lookup_seconds / lookups if lookups else 0.0,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrapper Embeddings LangChain: embed_query lewat cache, embed_documents langsung ke model.
+
+    Kalau coalescer diberikan, cache miss dikirim lewat EmbeddingCoalescer (batch bersama antar sesi).
+    """
+
+    def __init__(self, base: Embeddings, cache: QueryEmbeddingCache, model_name: str, coalescer=None):
+        self.base = base
+        self.cache = cache
+        self.model_name = model_name
+        self.coalescer = coalescer
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.coalescer is not None:
+            return self.submit_query(text).result()
+        key = make_cache_key(text, self.model_name)
+        vector = self.cache.get(key)
+        if vector is None:
+            start = time.perf_counter()
+            vector = self.base.embed_query(text)
+            self.cache.record_embed(time.perf_counter() - start)
+            vector = self.cache.put(key, vector)
+        return vector.tolist()
+
+    def submit_query(self, text: str) -> Future:
+        """Future vektor query: langsung selesai kalau ada di cache, selain itu antre di coalescer"""
+        key = make_cache_key(text, self.model_name)
+        vector = self.cache.get(key)
+        if vector is not None:
+            future = Future()
+            future.set_result(vector.tolist())
+            return future
+
+        start = time.perf_counter()
+        # Cache diisi sekali per key, walau beberapa sesi menunggu teks yang sama
+        pending = self.coalescer.submit(text, key=key, on_result=lambda vector: self.cache.put(key, vector))
+        future = Future()
+
+        def _done(done: Future):
+            try:
+                vector = done.result()
+            except Exception as e:
+                future.set_exception(e)
+                return
+            self.cache.record_embed(time.perf_counter() - start)
+            future.set_result(np.asarray(vector, dtype=np.float32).tolist())
+
+        pending.add_done_callback(_done)
+        return future
+
+    def cached_query(self, text: str) -> Optional[List[float]]:
+        """Vektor dari cache saja, tanpa memanggil model; None kalau belum ada"""
+        vector = self.cache.get(make_cache_key(text, self.model_name))
+        return None if vector is None else vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
@@ -0,0 +1,177 @@
+# embedding_coalescer.py
+# Micro-batching embedding query: request yang datang bersamaan dari banyak sesi dikumpulkan dalam
+# jendela pendek (beberapa ms) atau sampai max_batch, dikirim sebagai satu panggilan embed batch,
+# lalu vektornya dibagikan ke tiap pemanggil. Teks identik yang sedang antre/diproses hanya dikirim
+# sekali. Saat semua slot batch sibuk, antrean terus terkumpul sehingga batch berikutnya lebih besar.
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH = 96
+DEFAULT_MAX_IN_FLIGHT = 4
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 96)
+DELAY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+def query_batch_embedder(embeddings) -> Callable[[List[str]], List[List[float]]]:
+    """Fungsi embed batch untuk query: pakai input_type search_query kalau model mendukung (Cohere)"""
+    embed = getattr(embeddings, "embed", None)
+    if callable(embed):
+        return lambda texts: embed(texts, input_type="search_query")
+    return embeddings.embed_documents
+
+
+class EmbeddingCoalescer:
+    """Antrean embedding query bersama: satu thread pengumpul + maks max_in_flight batch paralel"""
+
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]], window_ms: float = DEFAULT_WINDOW_MS,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        self.embed_batch = embed_batch
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._cond = threading.Condition()
+        self._queue: deque = deque()
+        # key -> Future untuk teks yang sedang antre atau sedang di-embed (dedupe in-flight)
+        self._pending: Dict[str, Future] = {}
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embed-batch")
+
+        self.requests = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.texts = 0
+        self.errors = 0
+        self.max_batch_seen = 0
+        self.delay_seconds = 0.0
+        self.max_delay = 0.0
+        self.batch_buckets = [0] * len(BATCH_SIZE_BUCKETS)
+        self.delay_buckets = [0] * len(DELAY_BUCKETS)
+        threading.Thread(target=self._dispatch_loop, name="embed-coalescer", daemon=True).start()
+
+    def submit(self, text: str, key: Optional[str] = None,
+               on_result: Optional[Callable[[List[float]], None]] = None) -> Future:
+        """Future berisi vektor teks; key (mis. key cache ternormalisasi) menentukan dedupe.
+
+        on_result dipanggil sekali per key (oleh request yang benar-benar dikirim), mis. untuk mengisi cache.
+        """
+        key = key or text
+        with self._cond:
+            self.requests += 1
+            future = self._pending.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            future = self._pending[key] = Future()
+            if on_result is not None:
+                # Callback pertama: berjalan sebelum callback pemanggil lain yang ikut menunggu key ini
+                future.add_done_callback(lambda done: done.exception() is None and on_result(done.result()))
+            self._queue.append((key, text, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def embed(self, text: str, key: Optional[str] = None, timeout: Optional[float] = None) -> List[float]:
+        return self.submit(text, key).result(timeout=timeout)
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+            # Tunggu slot batch dulu: selama semua batch sibuk, antrean bertambah dan batch jadi lebih besar
+            self._slots.acquire()
+            with self._cond:
+                deadline = self._queue[0][3] + self.window
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        start = time.perf_counter()
+        try:
+            try:
+                vectors = self.embed_batch([text for _, text, _, _ in batch])
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Jumlah vektor {len(vectors)} != jumlah teks {len(batch)}")
+                error = None
+            except Exception as e:
+                vectors, error = None, e
+            self._record(batch, start, error is not None)
+            with self._cond:
+                for key, _, _, _ in batch:
+                    self._pending.pop(key, None)
+            for i, (_, _, future, _) in enumerate(batch):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(vectors[i])
+        finally:
+            self._slots.release()
+
+    def _record(self, batch, start: float, failed: bool):
+        size = len(batch)
+        with self._cond:
+            self.batches += 1
+            self.texts += size
+            self.errors += failed
+            self.max_batch_seen = max(self.max_batch_seen, size)
+            for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+                if size <= bound:
+                    self.batch_buckets[i] += 1
+                    break
+            for _, _, _, submitted in batch:
+                # Delay tambahan = waktu menunggu di antrean sebelum batch dikirim
+                delay = start - submitted
+                self.delay_seconds += delay
+                self.max_delay = max(self.max_delay, delay)
+                for i, bound in enumerate(DELAY_BUCKETS):
+                    if delay <= bound:
+                        self.delay_buckets[i] += 1
+                        break
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "requests": self.requests,
+                "deduplicated": self.deduplicated,
+                "batches": self.batches,
+                "texts": self.texts,
+                "errors": self.errors,
+                "queued": len(self._queue),
+                "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size": self.max_batch_seen,
+                "avg_queue_delay_ms": round(self.delay_seconds / self.texts * 1000, 3) if self.texts else 0.0,
+                "max_queue_delay_ms": round(self.max_delay * 1000, 3),
+            }
+
+    def prometheus_lines(self) -> List[str]:
+        with self._cond:
+            lines = ["# TYPE kindora_embed_coalescer_requests_total counter",
+                     f'kindora_embed_coalescer_requests_total{{result="queued"}} {self.requests - self.deduplicated}',
+                     f'kindora_embed_coalescer_requests_total{{result="deduplicated"}} {self.deduplicated}',
+                     "# TYPE kindora_embed_batch_size histogram"]
+            cumulative = 0
+            for bound, count in zip(BATCH_SIZE_BUCKETS, self.batch_buckets):
+                cumulative += count
+                lines.append(f'kindora_embed_batch_size_bucket{{le="{bound}"}} {cumulative}')
+            lines += [f'kindora_embed_batch_size_bucket{{le="+Inf"}} {self.batches}',
+                      f"kindora_embed_batch_size_sum {self.texts}",
+                      f"kindora_embed_batch_size_count {self.batches}",
+                      "# TYPE kindora_embed_queue_delay_seconds histogram"]
+            cumulative = 0
+            for bound, count in zip(DELAY_BUCKETS, self.delay_buckets):
+                cumulative += count
+                lines.append(f'kindora_embed_queue_delay_seconds_bucket{{le="{bound}"}} {cumulative}')
+            lines += [f'kindora_embed_queue_delay_seconds_bucket{{le="+Inf"}} {self.texts}',
+                      f"kindora_embed_queue_delay_seconds_sum {self.delay_seconds:.6f}",
+                      f"kindora_embed_queue_delay_seconds_count {self.texts}",
+                      "# TYPE kindora_embed_batch_errors_total counter",
+                      f"kindora_embed_batch_errors_total {self.errors}"]
+        return lines
@@ -0,0 +1,80 @@
+# embedding_pipeline.py
+# Pipeline embedding massal untuk build index: batch (maks 96 teks per panggilan Cohere),
+# beberapa batch paralel, token bucket untuk rate limit, dan retry dengan backoff.
+
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from rate_limiter import TokenBucket
+
+COHERE_MAX_BATCH = 96
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Potong iterable jadi list berukuran batch_size tanpa memuat semuanya ke memori"""
+    if not 0 < batch_size <= COHERE_MAX_BATCH:
+        raise ValueError(f"❌ batch_size harus 1..{COHERE_MAX_BATCH}")
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _embed_with_retry(embed_fn: Callable[[List[str]], List[List[float]]], texts: List[str],
+                      rate_limiter: Optional[TokenBucket], max_retries: int, base_delay: float):
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            vectors = embed_fn(texts)
+            if len(vectors) != len(texts):
+                raise RuntimeError(f"Jumlah vektor {len(vectors)} != jumlah teks {len(texts)}")
+            return vectors
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+            print(f"⚠️ Embedding gagal (percobaan {attempt + 1}): {str(e)}, coba lagi {delay:.1f}s")
+            time.sleep(delay)
+
+
+def embed_batches(batches: Iterable[Sequence[Tuple[str, object]]],
+                  embed_fn: Callable[[List[str]], List[List[float]]],
+                  text_of: Callable[[object], str] = str,
+                  max_workers: int = 4,
+                  rate_limiter: Optional[TokenBucket] = None,
+                  max_retries: int = 5,
+                  base_delay: float = 1.0) -> Iterator[Tuple[Sequence, List[List[float]]]]:
+    """Embed batch secara paralel; hasil di-yield begitu selesai (urutan tidak dijamin).
+
+    Batch diambil dari iterator di thread pemanggil dan paling banyak 2x max_workers
+    batch yang sedang berjalan, jadi korpus besar tidak pernah dimuat sekaligus.
+    """
+    batches = iter(batches)
+    max_in_flight = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embed") as pool:
+        in_flight = {}
+
+        def submit_next() -> bool:
+            batch = next(batches, None)
+            if batch is None:
+                return False
+            texts = [text_of(item) for item in batch]
+            future = pool.submit(_embed_with_retry, embed_fn, texts, rate_limiter, max_retries, base_delay)
+            in_flight[future] = batch
+            return True
+
+        while len(in_flight) < max_in_flight and submit_next():
+            pass
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                yield batch, future.result()
+                submit_next()
@@ -0,0 +1,171 @@
+# faq_index.py
+# Index pertanyaan FAQ (kolom Questions/Answers di CSV) yang dibangun bersama index FAISS: cocok
+# persis (setelah normalisasi), cocok fuzzy (trigram karakter), dan index vektor khusus pertanyaan.
+# Kalau skor di atas ambang, jawaban kurasi langsung dipakai tanpa retrieval dan tanpa Gemini.
+
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import faiss
+import numpy as np
+
+from embedding_cache import normalize_query
+
+FAQ_FILE = "faq.json"
+FAQ_VECTORS_FILE = "faq_questions.faiss"
+DEFAULT_FUZZY_THRESHOLD = 0.85
+DEFAULT_VECTOR_THRESHOLD = 0.9
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_question(text: str) -> str:
+    """Normalisasi query + tanda baca dibuang ("Apa itu depresi?" == "apa itu depresi")"""
+    return re.sub(r"\s+", " ", _PUNCTUATION.sub(" ", normalize_query(text))).strip()
+
+
+def trigrams(text: str) -> Counter:
+    padded = f"  {text} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class FaqMatch(NamedTuple):
+    row_id: str
+    question: str
+    answer: str
+    score: float
+    method: str
+
+
+class FaqIndex:
+    """Pertanyaan FAQ: map teks ternormalisasi, posting trigram, dan IndexFlatIP vektor pertanyaan"""
+
+    def __init__(self, row_ids: Sequence[str], questions: Sequence[str], answers: Sequence[str],
+                 vectors: Optional[np.ndarray] = None):
+        self.row_ids = list(row_ids)
+        self.questions = list(questions)
+        self.answers = list(answers)
+        self.normalized = [normalize_question(question) for question in self.questions]
+        self.exact: Dict[str, int] = {}
+        for position, text in enumerate(self.normalized):
+            self.exact.setdefault(text, position)
+
+        self.grams = [trigrams(text) for text in self.normalized]
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        for position, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings[gram].append(position)
+
+        self.index = None
+        if vectors is not None and len(vectors):
+            vectors = np.asarray(vectors, dtype=np.float32)
+            faiss.normalize_L2(vectors)
+            self.index = faiss.IndexFlatIP(vectors.shape[1])
+            self.index.add(vectors)
+
+    @classmethod
+    def build(cls, row_ids: Sequence[str], questions: Sequence[str], answers: Sequence[str],
+              embed: Optional[Callable[[List[str]], List[List[float]]]] = None,
+              previous: Optional["FaqIndex"] = None) -> "FaqIndex":
+        """Bangun index; vektor pertanyaan yang tidak berubah diambil dari index sebelumnya"""
+        vectors = None
+        if embed is not None:
+            known = previous.vectors_by_question() if previous is not None else {}
+            missing = [question for question in dict.fromkeys(questions) if question not in known]
+            if missing:
+                known.update(zip(missing, np.asarray(embed(missing), dtype=np.float32)))
+            vectors = np.stack([known[question] for question in questions]) if questions else None
+        return cls(row_ids, questions, answers, vectors)
+
+    def vectors_by_question(self) -> Dict[str, np.ndarray]:
+        if self.index is None:
+            return {}
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        return dict(zip(self.questions, vectors))
+
+    # ---- pencocokan ----
+
+    def match_exact(self, query: str) -> Optional[FaqMatch]:
+        position = self.exact.get(normalize_question(query))
+        return None if position is None else self._match(position, 1.0, "exact")
+
+    def match_fuzzy(self, query: str, candidates: int = 20) -> Optional[FaqMatch]:
+        """Pertanyaan dengan koefisien Dice trigram karakter tertinggi"""
+        grams = trigrams(normalize_question(query))
+        if not grams:
+            return None
+        # Kandidat = pertanyaan dengan trigram bersama terbanyak (lewat posting list), lalu skor persis
+        shared = Counter()
+        for gram in grams:
+            for position in self.postings.get(gram, ()):
+                shared[position] += 1
+        if not shared:
+            return None
+        total = sum(grams.values())
+        best, best_score = None, 0.0
+        for position, _ in shared.most_common(candidates):
+            other = self.grams[position]
+            score = 2.0 * sum((grams & other).values()) / (total + sum(other.values()))
+            if score > best_score:
+                best, best_score = position, score
+        return self._match(best, best_score, "fuzzy")
+
+    def match_vector(self, vector) -> Optional[FaqMatch]:
+        if self.index is None or vector is None:
+            return None
+        query = np.asarray(vector, dtype=np.float32).reshape(1, -1).copy()
+        if query.shape[1] != self.index.d:
+            return None
+        faiss.normalize_L2(query)
+        scores, positions = self.index.search(query, 1)
+        if positions[0][0] == -1:
+            return None
+        return self._match(int(positions[0][0]), float(scores[0][0]), "vector")
+
+    def match(self, query: Optional[str] = None, vector=None, fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+              vector_threshold: float = DEFAULT_VECTOR_THRESHOLD) -> Optional[FaqMatch]:
+        """Exact -> fuzzy (tanpa embedding) -> vektor (kalau vektor query diberikan); None di bawah ambang"""
+        match = self.match_exact(query) if query else None
+        if match is None and query:
+            match = self.match_fuzzy(query)
+            if match is not None and match.score < fuzzy_threshold:
+                match = None
+        if match is None and vector is not None:
+            match = self.match_vector(vector)
+            if match is not None and match.score < vector_threshold:
+                match = None
+        return match
+
+    def _match(self, position: int, score: float, method: str) -> FaqMatch:
+        return FaqMatch(self.row_ids[position], self.questions[position], self.answers[position],
+                        round(score, 4), method)
+
+    # ---- simpan/muat ----
+
+    def save(self, index_dir: str):
+        with open(os.path.join(index_dir, FAQ_FILE), "w", encoding="utf-8") as f:
+            json.dump({"row_ids": self.row_ids, "questions": self.questions, "answers": self.answers},
+                      f, ensure_ascii=False)
+        if self.index is not None:
+            faiss.write_index(self.index, os.path.join(index_dir, FAQ_VECTORS_FILE))
+
+    @classmethod
+    def load(cls, index_dir: str) -> "FaqIndex":
+        with open(os.path.join(index_dir, FAQ_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        faq = cls(data["row_ids"], data["questions"], data["answers"])
+        vectors_path = os.path.join(index_dir, FAQ_VECTORS_FILE)
+        if os.path.exists(vectors_path):
+            # Vektor sudah dinormalisasi saat build
+            faq.index = faiss.read_index(vectors_path)
+        return faq
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return os.path.exists(os.path.join(index_dir, FAQ_FILE))
+
+    def __len__(self):
+        return len(self.questions)
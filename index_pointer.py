@@ -0,0 +1,65 @@
+# index_pointer.py
+# Publikasi index secara atomik. Tiap build ditulis ke folder versi baru di dalam folder index
+# (<index_dir>/v<waktu>), lalu file penunjuk <index_dir>/CURRENT ditimpa dengan os.replace (atomik,
+# juga di Windows). Pembaca me-resolve penunjuk sekali per load, jadi tidak pernah melihat folder yang
+# hilang, setengah jadi, atau campuran file dua versi. Folder tanpa CURRENT (format lama, index bawaan
+# repo) dibaca langsung seperti sebelumnya; setelah versi pertama dipublikasikan, file lama di root folder
+# dibiarkan apa adanya (bisa jadi dilacak git) dan CURRENT selalu didahulukan.
+#
+#   data/faiss_index/CURRENT            -> "v1760700000000000000"
+#   data/faiss_index/v1760700000000000000/index.faiss, docstore_*, bm25.json, ...
+
+import os
+import shutil
+import time
+from typing import Optional
+
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v"
+
+
+def current_version(index_dir: str) -> Optional[str]:
+    """Nama folder versi yang sedang dipublikasikan; None untuk folder index format lama"""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_index_dir(index_dir: str) -> str:
+    """Folder berisi file index yang aktif (folder versi, atau folder itu sendiri untuk format lama)"""
+    version = current_version(index_dir)
+    return os.path.join(index_dir, version) if version else index_dir
+
+
+def new_version_dir(index_dir: str) -> str:
+    """Folder kosong untuk build baru; belum terlihat pembaca sampai publish_version"""
+    os.makedirs(index_dir, exist_ok=True)
+    path = os.path.join(index_dir, f"{VERSION_PREFIX}{time.time_ns()}")
+    os.makedirs(path)
+    return path
+
+
+def publish_version(index_dir: str, version_dir: str):
+    """Jadikan version_dir versi aktif lewat satu os.replace, lalu bersihkan versi yang tidak dipakai.
+
+    Versi sebelumnya dipertahankan satu generasi: pembaca yang me-resolve penunjuk tepat sebelum swap
+    masih bisa menyelesaikan load-nya. Index yang sudah dimuat tetap aman walau foldernya dihapus
+    (file mmap tetap valid sampai di-unmap).
+    """
+    previous = current_version(index_dir)
+    name = os.path.basename(os.path.normpath(version_dir))
+    tmp = os.path.join(index_dir, CURRENT_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(index_dir, CURRENT_FILE))
+
+    for entry in os.listdir(index_dir):
+        path = os.path.join(index_dir, entry)
+        if entry in (name, previous) or not entry.startswith(VERSION_PREFIX) or not os.path.isdir(path):
+            continue
+        # Versi lama atau sisa build yang terputus; file index format lama di root folder tidak disentuh
+        shutil.rmtree(path, ignore_errors=True)
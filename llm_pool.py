@@ -0,0 +1,139 @@
+# llm_pool.py
+# Client LLM dipakai ulang antar pesan: satu ChatGoogleGenerativeAI per (API key, model, temperature),
+# jadi channel gRPC/HTTP ke Gemini tidak dibangun ulang tiap pesan; jalur per pesan hanya memasang
+# callback/target output.
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from tracing import get_tracer
+
+DEFAULT_MAXSIZE = 32
+
+
+def _default_factory(api_key: str, model: str, temperature: float):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=api_key,
+        temperature=temperature,
+        convert_system_message_to_human=True
+    )
+
+
+class LLMClientPool:
+    """Pool client LLM (LRU) dengan keep-alive opsional untuk client yang lama menganggur"""
+
+    def __init__(self, factory: Optional[Callable] = None, maxsize: int = DEFAULT_MAXSIZE,
+                 keepalive_interval: float = 0.0, warm: Optional[Callable] = None):
+        self.factory = factory or _default_factory
+        self.maxsize = maxsize
+        self.keepalive_interval = keepalive_interval
+        self.warm = warm or (lambda llm: llm.get_num_tokens("ping"))
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[tuple, list]" = OrderedDict()
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+        self.keepalive_pings = 0
+        self.setup_seconds = 0.0
+        if keepalive_interval > 0:
+            threading.Thread(target=self._keepalive_loop, name="llm-keepalive", daemon=True).start()
+
+    @staticmethod
+    def _key(api_key: str, model: str, temperature: float) -> tuple:
+        # API key tidak disimpan mentah sebagai key dict
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest(), model, float(temperature)
+
+    def get(self, api_key: str, model: str, temperature: float = 0.2):
+        key = self._key(api_key, model, temperature)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                entry[1] = time.monotonic()
+                self._clients.move_to_end(key)
+                self.reused += 1
+                return entry[0]
+
+        start = time.perf_counter()
+        llm = self.factory(api_key, model, temperature)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                # Thread lain sudah membuat client yang sama lebih dulu
+                self.reused += 1
+                return entry[0]
+            self._clients[key] = [llm, time.monotonic()]
+            self.created += 1
+            self.setup_seconds += elapsed
+            # Client yang dikeluarkan tidak ditutup paksa: mungkin masih dipakai stream yang berjalan
+            while len(self._clients) > self.maxsize:
+                self._clients.popitem(last=False)
+                self.evicted += 1
+        return llm
+
+    def _keepalive_loop(self):
+        while True:
+            time.sleep(self.keepalive_interval)
+            now = time.monotonic()
+            with self._lock:
+                idle = [entry for entry in self._clients.values() if now - entry[1] >= self.keepalive_interval]
+            for entry in idle:
+                try:
+                    self.warm(entry[0])
+                    entry[1] = time.monotonic()
+                    with self._lock:
+                        self.keepalive_pings += 1
+                except Exception as e:
+                    print(f"⚠️ Keep-alive client LLM gagal: {str(e)}")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.created + self.reused
+            return {
+                "clients": len(self._clients),
+                "created": self.created,
+                "reused": self.reused,
+                "reuse_rate": self.reused / lookups if lookups else 0.0,
+                "evicted": self.evicted,
+                "keepalive_pings": self.keepalive_pings,
+                "avg_setup_ms": round(self.setup_seconds / self.created * 1000, 3) if self.created else 0.0,
+                # Perkiraan waktu setup yang dihemat: tiap reuse = satu konstruksi client yang tidak terjadi
+                "saved_setup_ms": round(self.setup_seconds / self.created * self.reused * 1000, 1)
+                if self.created else 0.0,
+            }
+
+    def prometheus_lines(self) -> List[str]:
+        stats = self.stats()
+        return [
+            "# TYPE kindora_llm_clients gauge",
+            f"kindora_llm_clients {stats['clients']}",
+            "# TYPE kindora_llm_client_lookups_total counter",
+            f'kindora_llm_client_lookups_total{{result="created"}} {stats["created"]}',
+            f'kindora_llm_client_lookups_total{{result="reused"}} {stats["reused"]}',
+            "# TYPE kindora_llm_client_setup_seconds_total counter",
+            f"kindora_llm_client_setup_seconds_total {self.setup_seconds:.6f}",
+        ]
+
+
+_shared_pool: Optional[LLMClientPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_pool() -> LLMClientPool:
+    """Pool client LLM dipakai bersama semua sesi; metriknya ikut diekspor tracer"""
+    global _shared_pool
+    if _shared_pool is None:
+        with _shared_lock:
+            if _shared_pool is None:
+                _shared_pool = LLMClientPool(
+                    keepalive_interval=float(os.getenv("KINDORA_LLM_KEEPALIVE", "0"))
+                )
+                get_tracer().register_metrics(_shared_pool.prometheus_lines)
+    return _shared_pool
@@ -1,31 +1,32 @@
 # File utama aplikasi Chatbot Kesehatan Mental AI
 
+# Timer startup dibuat paling awal supaya waktu import main.py ikut tercatat
+from startup import get_startup_timer
+_startup = get_startup_timer()
+
 import os
 from dotenv import load_dotenv
 import streamlit as st
-import datetime
-# Import library LangChain dan lainnya
-from langchain_core.tools import Tool
-from langchain.memory import ConversationBufferMemory
-from langchain_google_genai import ChatGoogleGenerativeAI
-from google.api_core.exceptions import GoogleAPICallError
-from googlesearch import search
-from typing import Optional
-from langchain_cohere import CohereEmbeddings
-
-# Import komponen lokal
-from retriever import FaissRetriever
-from mental_health_processor import extract_mental_health_document
-from callback_handler import GeminiCallbackHandler
+import uuid
+from typing import TYPE_CHECKING, Optional
+
+# Import komponen lokal. Dependensi berat (Cohere, Gemini, FAISS, parser PDF, penerjemah) di-import
+# saat pertama dipakai dan dipanaskan di thread latar oleh startup.py, bukan di sini.
+from tracing import get_tracer, traced
+from conversation_memory import ConversationMemory, make_llm_summarizer
+from llm_pool import get_llm_pool
 
 # Import semua fungsi dari tools
-from tools.date_tools import show_current_date
-from tools.cooping_tools import get_coping_tips
-from tools.pscyologist_tools import get_professional_help
-from tools.save_history import save_chat_history
-from tools.translate_tools import TranslationService
+from tools.save_history import client_key, get_history_store, new_resume_code
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from callback_handler import GeminiCallbackHandler
+    from document_index import DocumentIndex
+    from retriever import FaissRetriever
 
 load_dotenv()
+_startup.mark("imports")
 
 def load_css():
     with open("style.css") as f:
@@ -38,10 +39,18 @@ def load_css():
         st.markdown(f"<style>{css_content}</style>", unsafe_allow_html=True)
         st.markdown("<div class='bg-animation'></div>", unsafe_allow_html=True)
 
+GEMINI_MODEL = "gemini-1.5-flash"
+INDEX_PATH = "data/faiss_index"
+CHAT_DISPLAY_WINDOW = 20
+SIDEBAR_PAGE_SIZE = 10
+RELOAD_TURNS = 10
+
+@traced("google_fallback")
 def get_google_search_results(query: str) -> str:
+    from search_service import get_search_service
     try:
-        num_results = 10
-        results = list(search(query, num_results=num_results, lang="id"))
+        # Deadline, cache, dan dedupe query ditangani layanan pencarian bersama
+        results = get_search_service().search(query, num_results=10, lang="id")
         if not results:
             return f"Maaf, saya tidak dapat menemukan hasil yang relevan di Google untuk '{query}'."
 
@@ -53,59 +62,155 @@ def get_google_search_results(query: str) -> str:
     except Exception as e:
         return f"Kesalahan saat pencarian Google: {str(e)}"
 
-def run_agent(user_input: str, retriever: FaissRetriever, pdf_content: Optional[str] = None) -> str:
-    system_prompt = ""
-    if pdf_content:
-        system_prompt = f"""
-        PERHATIAN: Pengguna mengunggah dokumen. Jawab HANYA berdasarkan:
-        --- DOKUMEN ---
-        {pdf_content}
-        --- AKHIR DOKUMEN ---
-        """
+def _notify(callbacks: list, message: str):
+    """Pemberitahuan status diteruskan ke handler (Streamlit/SSE); pipeline sendiri tidak menyentuh UI"""
+    for handler in callbacks:
+        on_notice = getattr(handler, "on_notice", None)
+        if on_notice is not None:
+            on_notice(message)
+
+def _generate(llm: "ChatGoogleGenerativeAI", prompt: str, stream: bool = True, callbacks: Optional[list] = None,
+              model_name: str = GEMINI_MODEL) -> str:
+    """Panggil Gemini; mode stream mengirim token ke callback handler satu per satu"""
+    tracer = get_tracer()
+    config = {"callbacks": callbacks} if callbacks else None
+    with tracer.span("generate", stream=stream):
+        if not stream:
+            answer = str(llm.invoke(prompt, config=config).content)
+        else:
+            answer = "".join(str(chunk.content) for chunk in llm.stream(prompt, config=config))
+        tracer.record_tokens(model_name, prompt, answer)
+    return answer
 
-    tools = [
-        Tool(name='cari_info_kesehatan_mental', func=lambda q: get_professional_help(q, retriever), description="Jawab spesifik dari database."),
-        Tool(name='beri_rekomendasi_kesehatan_mental', func=lambda q: get_coping_tips(), description="Rekomendasi coping."),
-        Tool(name='pencarian_internet_google', func=search, description="Cari info baru."),
-        Tool(name='terjemah_bahasa', func=TranslationService, description="Terjemahkan."),
-        Tool(name='dapatkan_tanggal_sekarang', func=show_current_date, description="Tanggal saat ini.")
-    ]
-
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-flash",
-        google_api_key=st.session_state.gemini_api_key,
-        temperature=0.2,
-        callbacks=[GeminiCallbackHandler()],
-        convert_system_message_to_human=True
-    )
-
-    if pdf_content:
+def _history_block(history: Optional[str]) -> str:
+    """Konteks percakapan (ringkasan + giliran terbaru, sudah dibatasi token) untuk prompt"""
+    if not history:
+        return ""
+    return f"--- PERCAKAPAN SEBELUMNYA ---\n{history}\n--- AKHIR PERCAKAPAN ---"
+
+def _faq_answer(match) -> str:
+    """Jawaban kurasi FAQ; opsional diterjemahkan (KINDORA_FAQ_TRANSLATE=id) lewat cache terjemahan"""
+    get_tracer().set_attributes(faq_row=match.row_id, faq_method=match.method, faq_score=match.score)
+    target = os.getenv("KINDORA_FAQ_TRANSLATE", "")
+    if not target:
+        return match.answer
+    from tools.translate_tools import get_translation_service
+    try:
+        return get_translation_service().translate(match.answer, target)
+    except Exception as e:
+        print(f"⚠️ Terjemahan jawaban FAQ gagal, pakai teks asli: {str(e)}")
+        return match.answer
+
+def run_agent(user_input: str, retriever: "FaissRetriever", pdf_content: Optional[str] = None,
+              callback_handler: Optional["GeminiCallbackHandler"] = None, stream: bool = True,
+              pdf_index: Optional["DocumentIndex"] = None, llm=None, history: Optional[str] = None) -> str:
+    with get_tracer().span("run_agent", pdf=bool(pdf_content or pdf_index is not None)):
+        answer = _run_agent(user_input, retriever, pdf_content, callback_handler, stream, pdf_index, llm, history)
+    _startup.mark("first_answer")
+    return answer
+
+def _run_agent(user_input: str, retriever: "FaissRetriever", pdf_content: Optional[str],
+               callback_handler: Optional["GeminiCallbackHandler"], stream: bool,
+               pdf_index: Optional["DocumentIndex"], llm, history: Optional[str]) -> str:
+    from callback_handler import GeminiCallbackHandler
+    from context_packer import context_budget, context_candidates, pack_context
+    from semantic_cache import documents_key, get_semantic_cache
+
+    tracer = get_tracer()
+    # Client LLM dibuat sekali lalu dipakai ulang; per pesan hanya callback yang dipasang
+    # Model bisa disuntikkan (mis. fake model untuk benchmark)
+    model_name = GEMINI_MODEL if llm is None else getattr(llm, "model", None) or llm._llm_type
+    if llm is None:
+        llm = get_llm_pool().get(st.session_state.gemini_api_key, GEMINI_MODEL, temperature=0.2)
+    callbacks = [callback_handler or GeminiCallbackHandler()]
+
+    if pdf_content or pdf_index is not None:
+        # Hanya chunk dokumen yang relevan (dalam batas token) yang masuk ke prompt
+        with tracer.span("document_context") as span:
+            if pdf_index is None:
+                from document_index import build_document_index
+                pdf_index = build_document_index(pdf_content, retriever.embeddings)
+            # Embedding lewat retriever (cache + batas waktu); gagal/lambat -> chunk dipilih lewat BM25
+            query_vector = retriever.embed_query(user_input)
+            span.set(degraded=query_vector is None)
+            document_context = pdf_index.context_for(user_input, vector=query_vector)
         prompt = f"""
-        Kamu adalah asisten kesehatan mental. Jawab berdasarkan dokumen berikut:
+        Kamu adalah asisten kesehatan mental. Jawab HANYA berdasarkan kutipan dokumen berikut:
         --- DOKUMEN ---
-        {pdf_content}
+        {document_context}
         --- AKHIR DOKUMEN ---
+        {_history_block(history)}
         Pertanyaan: {user_input}
         """
-        return str(llm.invoke(prompt).content)
+        return _generate(llm, prompt, stream, callbacks, model_name)
 
-    retriever_result = retriever.search(user_input, k=3)
-    context = "\n".join([doc.page_content for doc in retriever_result]) if retriever_result else ""
+    # Jalur cepat FAQ: pertanyaan yang (hampir) sama dengan FAQ dijawab langsung tanpa embedding/Gemini
+    with tracer.span("faq_match") as span:
+        faq_match = retriever.match_faq(user_input)
+        span.set(hit=faq_match is not None)
+    if faq_match is not None:
+        return _faq_answer(faq_match)
+
+    # Embedding query sekali, dipakai untuk retrieval dan cache jawaban semantik
+    with tracer.span("embed_query") as span:
+        query_vector = retriever.embed_query(user_input)
+        span.set(degraded=query_vector is None)
+    if query_vector is not None:
+        with tracer.span("faq_match") as span:
+            faq_match = retriever.match_faq(vector=query_vector)
+            span.set(hit=faq_match is not None)
+        if faq_match is not None:
+            return _faq_answer(faq_match)
+    with tracer.span("retrieval") as span:
+        if query_vector is not None:
+            candidates, vectors = retriever.search_with_vectors(query_vector, k=context_candidates(), query=user_input)
+        else:
+            # Layanan embedding gagal/lambat: jalur cepat leksikal (BM25)
+            candidates, vectors = retriever.lexical_search(user_input, k=context_candidates()), None
+        span.set(documents=len(candidates or []))
+    with tracer.span("context_packing") as span:
+        # Kandidat tanpa overlap/duplikat, diversifikasi MMR, dalam batas token prompt
+        packed = pack_context(candidates or [], vectors, token_budget=context_budget())
+        span.set(documents=len(packed.documents), tokens=packed.tokens, duplicates=packed.duplicates)
+    retriever_result = packed.documents
+    context = packed.text
 
     if context.strip():
+        answer_cache = get_semantic_cache()
+        docs_key = documents_key(retriever_result)
+        # Cache jawaban dipakai bersama semua user di proses ini, sedangkan jawaban dengan riwayat percakapan
+        # bersifat pribadi: hanya jawaban tanpa riwayat yang boleh diambil/disimpan di cache
+        cacheable = query_vector is not None and not history
+        if cacheable:
+            with tracer.span("answer_cache") as span:
+                cached_answer = answer_cache.lookup(query_vector, docs_key, retriever.version)
+                span.set(hit=bool(cached_answer))
+            if cached_answer:
+                return cached_answer
+
         prompt = f"""
         Kamu adalah asisten kesehatan mental. Jawab berdasarkan database berikut:
         --- DATABASE ---
         {context}
         --- AKHIR DATABASE ---
+        {_history_block(history)}
         Pertanyaan: {user_input}
         """
-        return str(llm.invoke(prompt).content)
+        answer = _generate(llm, prompt, stream, callbacks, model_name)
+        if cacheable:
+            answer_cache.store(user_input, query_vector, docs_key, answer, retriever.version)
+        return answer
 
-    st.info("🔍 Tidak ada jawaban di database. Mencoba dari internet...")
+    _notify(callbacks, "🔍 Tidak ada jawaban di database. Mencoba dari internet...")
     return get_google_search_results(user_input)
 
 def main():
+    # Index + modul berat dipanaskan di latar selama layar sambutan/chat dirender
+    _startup.start_warmup(INDEX_PATH)
+    _render()
+    _startup.mark("first_render")
+
+def _render():
     st.set_page_config(page_title="Kindora Mental Health", page_icon="🧠", layout="centered")
     load_css()
 
@@ -118,11 +223,14 @@ def main():
         """, unsafe_allow_html=True)
 
         name = st.text_input("Nama Kamu 💫")
+        resume_code = st.text_input("Kode Riwayat (opsional) 🔑", type="password",
+                                    help="Isi kode dari sesi sebelumnya untuk melanjutkan percakapan")
 
         if st.button("Mulai Chat 💖"):
             if name.strip() and api_key.strip():
                 st.session_state.user_name = name.strip()
                 st.session_state.gemini_api_key = api_key.strip()
+                st.session_state.resume_code = resume_code.strip() or None
                 st.rerun()
             else:
                 st.warning("Nama dan API Key wajib diisi.")
@@ -135,55 +243,123 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
-    if "messages" not in st.session_state:
-        st.session_state.messages = [{"role": "assistant", "content": "Halo! Cerita apa hari ini?"}]
+    if "memory" not in st.session_state:
+        # Riwayat lama diringkas Gemini di thread latar; prompt hanya memuat ringkasan + window terbaru
+        summarizer_llm = get_llm_pool().get(st.session_state.gemini_api_key, GEMINI_MODEL, temperature=0.0)
+        st.session_state.memory = ConversationMemory(summarizer=make_llm_summarizer(summarizer_llm))
+        st.session_state.session_id = uuid.uuid4().hex
+        # Riwayat disimpan per kode riwayat (bukan per nama); giliran lama hanya dimuat kalau user memasukkan kodenya
+        resume_code = st.session_state.get("resume_code")
+        turns = get_history_store().load_last_turns(client_key(resume_code), RELOAD_TURNS) if resume_code else []
+        if resume_code and not turns:
+            st.warning("Kode riwayat tidak ditemukan, memulai percakapan baru.")
+        if not turns:
+            resume_code = new_resume_code()
+        st.session_state.resume_code = resume_code
+        st.session_state.history_key = client_key(resume_code)
+        for turn in turns:
+            st.session_state.memory.add(turn["role"], turn["content"])
+        st.session_state.memory.add("assistant", "Halo! Cerita apa hari ini?")
+    memory = st.session_state.memory
+    history_store = get_history_store()
     if "pdf_content" not in st.session_state:
         st.session_state.pdf_content = None
+    if "pdf_index" not in st.session_state:
+        st.session_state.pdf_index = None
     if "retriever" not in st.session_state:
-        st.session_state.retriever = FaissRetriever(index_path="data/faiss_index")
+        # ✅ Retriever dipakai bersama semua sesi (satu index mmap per proses)
+        from retriever import get_shared_retriever
+        st.session_state.retriever = get_shared_retriever(INDEX_PATH)
 
     with st.sidebar:
         st.header(f"📜 Riwayat {st.session_state.user_name}")
-        if st.session_state.messages:
-            for msg in st.session_state.messages:
-                if msg["role"] != "system":
-                    label = "👤 Kamu" if msg["role"] == "user" else "🤖 AI"
-                    isi = msg["content"][:40] + "..." if len(msg["content"]) > 40 else msg["content"]
+        with st.expander("🔑 Kode riwayat"):
+            st.code(st.session_state.resume_code, language=None)
+            st.caption("Simpan kode ini (jangan dibagikan) untuk melanjutkan percakapan di kunjungan berikutnya.")
+        if len(memory):
+            # Hanya satu halaman riwayat yang dirender per rerun
+            page_count = memory.page_count(SIDEBAR_PAGE_SIZE)
+            page = 0
+            if page_count > 1:
+                page = st.number_input("Halaman (1 = terbaru)", min_value=1, max_value=page_count, value=1) - 1
+            for turn in memory.page(page, SIDEBAR_PAGE_SIZE):
+                if turn.role != "system":
+                    label = "👤 Kamu" if turn.role == "user" else "🤖 AI"
+                    isi = turn.content[:40] + "..." if len(turn.content) > 40 else turn.content
                     st.write(f"{label}: {isi}")
         else:
             st.info("Belum ada percakapan.")
 
         if st.button("🗑️ Hapus Riwayat", use_container_width=True):
-            st.session_state.messages = [{"role": "assistant", "content": "Riwayat dihapus. Yuk mulai lagi."}]
+            memory.clear()
+            memory.add("assistant", "Riwayat dihapus. Yuk mulai lagi.")
             st.session_state.pdf_content = None
+            st.session_state.pdf_index = None
             st.success("Riwayat berhasil dihapus.")
 
         st.divider()
         uploaded_file = st.file_uploader("📄 Upload PDF (Opsional)", type=["pdf"])
         if uploaded_file:
+            from document_index import build_document_index
+            from mental_health_processor import extract_mental_health_document
             with st.spinner("Membaca dokumen..."):
-                hasil = extract_mental_health_document(uploaded_file)
+                # Hasil di-cache per isi file, jadi rerun berikutnya tidak parse ulang
+                progress = st.empty()
+                hasil = extract_mental_health_document(
+                    uploaded_file,
+                    on_page=lambda page_number, _: progress.caption(f"📄 Halaman {page_number} selesai dibaca")
+                )
+                progress.empty()
                 if 'error' in hasil:
                     st.error(hasil['error'])
                 else:
                     st.session_state.pdf_content = hasil['full_text']
-                    st.success("Dokumen berhasil diproses!")
+                    # Chunk + embed dokumen sekali per sesi; dipakai ulang selama isinya sama
+                    try:
+                        st.session_state.pdf_index = build_document_index(
+                            hasil['full_text'], st.session_state.retriever.embeddings, st.session_state.pdf_index
+                        )
+                        st.success("Dokumen berhasil diproses!")
+                    except ValueError as e:
+                        st.session_state.pdf_content = None
+                        st.session_state.pdf_index = None
+                        st.error(str(e))
+                    except Exception as e:
+                        # Embedding timeout / error Cohere atau jaringan: kembali ke index umum
+                        print(f"❌ Gagal membangun index dokumen: {str(e)}")
+                        st.session_state.pdf_content = None
+                        st.session_state.pdf_index = None
+                        st.warning("⚠️ Dokumen tidak bisa diproses saat ini, jawaban memakai database umum.")
 
-    for msg in st.session_state.messages:
-        avatar = "🧑‍💻" if msg["role"] == "user" else "🧠"
-        with st.chat_message(msg["role"], avatar=avatar):
-            st.markdown(msg["content"])
+    # Area chat hanya menampilkan pesan terbaru; sisanya bisa dilihat per halaman di sidebar
+    hidden = len(memory) - CHAT_DISPLAY_WINDOW
+    if hidden > 0:
+        st.caption(f"🕘 {hidden} pesan sebelumnya ada di riwayat sidebar")
+    for turn in memory.last(CHAT_DISPLAY_WINDOW):
+        avatar = "🧑‍💻" if turn.role == "user" else "🧠"
+        with st.chat_message(turn.role, avatar=avatar):
+            st.markdown(turn.content)
 
     if user_input := st.chat_input("Tanyakan sesuatu..."):
-        st.session_state.messages.append({"role": "user", "content": user_input})
+        history = memory.context()
+        memory.add("user", user_input)
+        history_store.append(st.session_state.history_key, st.session_state.session_id, "user", user_input)
         with st.chat_message("user", avatar="🧑‍💻"):
             st.markdown(user_input)
 
         with st.chat_message("assistant", avatar="🧠"):
-            with st.spinner("Asisten sedang berpikir..."):
-                response = run_agent(user_input, st.session_state.retriever, st.session_state.pdf_content)
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                st.markdown(response)
+            # Token Gemini langsung ditampilkan lewat handler selama proses generate
+            from callback_handler import GeminiCallbackHandler
+            handler = GeminiCallbackHandler()
+            response = run_agent(user_input, st.session_state.retriever, st.session_state.pdf_content,
+                                 callback_handler=handler, pdf_index=st.session_state.pdf_index, history=history)
+            if handler.streamed:
+                response = handler.response
+                st.session_state.last_stream_metrics = handler.metrics()
+            else:
+                handler.container.markdown(response)
+            memory.add("assistant", response)
+            history_store.append(st.session_state.history_key, st.session_state.session_id, "assistant", response)
 
 if __name__ == "__main__":
     main()
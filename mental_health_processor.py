@@ -1,53 +1,210 @@
 # mental_health_chatbot/mental_health_processor.py
 import PyPDF2
 import pdfplumber
-from typing import Dict, Union
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_left
+import hashlib
+import multiprocessing
+import tempfile
+import threading
+import os
 import re
 import io
 
+PAGES_PER_TASK = 8
+PDF_CACHE_SIZE = 16
+
+DEFAULT_MENTAL_HEALTH_KEYWORDS = [
+    'mental health', 'depression', 'anxiety', 'stress', 
+    'psikologis', 'depresi', 'kecemasan', 'gangguan mood',
+    'terapi', 'konseling', 'skrining', 'diagnosis', 'DSM-5'
+]
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+_PARAGRAPH = re.compile(r'[^\n]+')
+
+# (start, end, keyword) untuk setiap kemunculan keyword
+KeywordHit = Tuple[int, int, str]
+
+_pool = None
+_pool_lock = threading.Lock()
+_extraction_cache: "OrderedDict[str, dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Process pool bersama untuk ekstraksi halaman PDF.
+
+    Worker dibuat dengan spawn, bukan fork: proses Streamlit/aiohttp punya banyak thread, dan fork dari
+    proses multithread bisa deadlock pada lock yang sedang dipegang thread lain.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1),
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def _open_source(source: Union[str, bytes]):
+    """Path file (worker process pool) atau bytes (ekstraksi di proses ini)"""
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+def _extract_page_range(source: Union[str, bytes], start: int, end: int) -> List[Tuple[int, str]]:
+    """Ekstrak halaman [start, end) dengan pdfplumber; fallback PyPDF2 hanya untuk halaman yang gagal"""
+    results = []
+    fallback_reader = None
+    with pdfplumber.open(_open_source(source)) as pdf:
+        for i in range(start, end):
+            try:
+                page_text = pdf.pages[i].extract_text() or ""
+            except Exception as page_error:
+                print(f"pdfplumber error di halaman {i+1}: {page_error}, trying PyPDF2...")
+                try:
+                    if fallback_reader is None:
+                        fallback_reader = PyPDF2.PdfReader(_open_source(source))
+                    page_text = fallback_reader.pages[i].extract_text() or ""
+                except Exception as e:
+                    print(f"PyPDF2 juga gagal di halaman {i+1}: {e}")
+                    page_text = ""
+            results.append((i + 1, page_text))
+    return results
+
+def iter_pdf_pages(data: bytes, pages_per_task: int = PAGES_PER_TASK) -> Iterator[Tuple[int, str]]:
+    """Generator (nomor_halaman, teks) berurutan; dokumen besar diekstrak paralel di process pool"""
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        page_count = len(pdf.pages)
+
+    if page_count <= pages_per_task * 2:
+        yield from _extract_page_range(data, 0, page_count)
+        return
+
+    # Worker menerima path file sementara, bukan bytes PDF: dokumen tidak di-pickle ulang untuk setiap range
+    fd, path = tempfile.mkstemp(prefix="kindora-pdf-", suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        pool = _get_pool()
+        futures = [
+            pool.submit(_extract_page_range, path, start, min(start + pages_per_task, page_count))
+            for start in range(0, page_count, pages_per_task)
+        ]
+        # Hasil di-yield per range sesuai urutan halaman, range berikutnya sudah berjalan di background
+        for future in futures:
+            yield from future.result()
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            # Windows: worker yang dibatalkan masih membuka file
+            pass
+
+class KeywordMatcher:
+    """Semua keyword digabung jadi satu regex alternation (keyword terpanjang dulu), cukup satu scan per teks"""
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+        self._canonical = {keyword.lower(): keyword for keyword in self.keywords}
+        ordered = sorted(self._canonical, key=len, reverse=True)
+        alternation = "|".join(re.escape(k) for k in ordered)
+        # Scan case-sensitive di teks yang sudah di-lowercase jauh lebih cepat daripada re.IGNORECASE
+        self._pattern = re.compile(alternation) if ordered else None
+        self._pattern_ignorecase = re.compile(alternation, re.IGNORECASE) if ordered else None
+
+    def _finditer(self, text: str):
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return self._pattern.finditer(lowered)
+        # Beberapa karakter unicode berubah panjang saat lowercase, offset jadi tidak cocok
+        return self._pattern_ignorecase.finditer(text)
+
+    def scan(self, text: str) -> List[KeywordHit]:
+        """Semua kemunculan keyword (tidak tumpang tindih) beserta offset-nya"""
+        if self._pattern is None or not text:
+            return []
+        return [
+            (m.start(), m.end(), self._canonical.get(m.group(0).lower(), m.group(0)))
+            for m in self._finditer(text)
+        ]
+
+    def contains(self, text: str) -> bool:
+        return self._pattern is not None and bool(text) and next(self._finditer(text), None) is not None
+
+def _spans_with_hits(spans: Iterator[Tuple[int, int]], hits: List[KeywordHit], limit: int) -> List[Tuple[int, int]]:
+    """Ambil maksimal `limit` span (kalimat/paragraf) yang memuat minimal satu keyword"""
+    starts = [hit[0] for hit in hits]
+    selected = []
+    for start, end in spans:
+        i = bisect_left(starts, start)
+        if i < len(starts) and starts[i] < end:
+            selected.append((start, end))
+            if len(selected) >= limit:
+                break
+    return selected
+
+def _sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    start = 0
+    for m in _SENTENCE_BREAK.finditer(text):
+        yield start, m.start()
+        start = m.end()
+    yield start, len(text)
+
 class MentalHealthDocumentProcessor:
     """Processor khusus untuk dokumen kesehatan mental (PDF)"""
     
-    def __init__(self):
-        self.mental_health_keywords = [
-            'mental health', 'depression', 'anxiety', 'stress', 
-            'psikologis', 'depresi', 'kecemasan', 'gangguan mood',
-            'terapi', 'konseling', 'skrining', 'diagnosis', 'DSM-5'
-        ]
+    def __init__(self, keywords: Optional[List[str]] = None):
+        self.mental_health_keywords = list(keywords) if keywords is not None else list(DEFAULT_MENTAL_HEALTH_KEYWORDS)
+        self.matcher = KeywordMatcher(self.mental_health_keywords)
+
+    def iter_pages(self, file_stream) -> Iterator[Tuple[int, str]]:
+        """Generator (nomor_halaman, teks) berurutan untuk seluruh PDF"""
+        file_stream.seek(0)
+        return iter_pdf_pages(file_stream.read())
 
-    def extract_text_from_pdf(self, file_stream) -> Dict[str, Union[str, dict]]:
-        """Ekstrak teks dari PDF dengan prioritas konten kesehatan mental"""
+    def extract_text_from_pdf(self, file_stream,
+                              on_page: Optional[Callable[[int, str], None]] = None) -> Dict[str, Union[str, dict]]:
+        """Ekstrak teks dari PDF dengan prioritas konten kesehatan mental.
+
+        `on_page` hanya untuk laporan progres; hasil (dan index dokumen) baru tersedia setelah semua halaman selesai.
+        """
         try:
-            # Coba dengan pdfplumber terlebih dahulu untuk presisi
-            with pdfplumber.open(file_stream) as pdf:
-                full_text = ""
-                mental_health_pages = {}
-                
-                for i, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-                        
-                        # Deteksi halaman relevan
-                        if self._is_mental_health_content(page_text):
-                            mental_health_pages[i+1] = self._summarize_page(page_text)
-                
-                # Jika menemukan konten spesifik kesehatan mental
-                if mental_health_pages:
-                    highlighted_content = self._highlight_keywords(full_text)
-                    return {
-                        'status': 'success',
-                        'full_text': full_text,
-                        'mental_health_pages': mental_health_pages,
-                        'highlighted_content': highlighted_content,
-                        'summary': self._generate_summary(full_text)
-                    }
-                else:
-                    return {
-                        'status': 'success',
-                        'full_text': full_text,
-                        'summary': self._generate_summary(full_text)
-                    }
+            # Coba dengan pdfplumber terlebih dahulu untuk presisi (per halaman, paralel)
+            text_parts = []
+            mental_health_pages = {}
+            hits = []
+            offset = 0
+            
+            for page_number, page_text in self.iter_pages(file_stream):
+                if on_page is not None:
+                    on_page(page_number, page_text)
+                if page_text:
+                    text_parts.append(page_text + "\n")
+                    
+                    # Satu scan keyword per halaman; hasilnya dipakai ulang untuk seluruh dokumen
+                    page_hits = self.matcher.scan(page_text)
+                    if page_hits:
+                        mental_health_pages[page_number] = self._summarize_page(page_text, page_hits)
+                        hits.extend((start + offset, end + offset, keyword) for start, end, keyword in page_hits)
+                    offset += len(page_text) + 1
+            
+            full_text = "".join(text_parts)
+            # Jika menemukan konten spesifik kesehatan mental
+            if mental_health_pages:
+                highlighted_content = self._highlight_keywords(full_text, hits)
+                return {
+                    'status': 'success',
+                    'full_text': full_text,
+                    'mental_health_pages': mental_health_pages,
+                    'highlighted_content': highlighted_content,
+                    'summary': self._generate_summary(full_text, hits)
+                }
+            else:
+                return {
+                    'status': 'success',
+                    'full_text': full_text,
+                    'summary': self._generate_summary(full_text)
+                }
 
         except Exception as pdfplumber_error:
             print(f"pdfplumber error: {pdfplumber_error}, trying PyPDF2...")
@@ -55,12 +212,11 @@ class MentalHealthDocumentProcessor:
                 # Fallback ke PyPDF2
                 file_stream.seek(0)
                 pdf_reader = PyPDF2.PdfReader(file_stream)
-                full_text = ""
-                
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
+                full_text = "".join(
+                    page_text + "\n"
+                    for page_text in (page.extract_text() for page in pdf_reader.pages)
+                    if page_text
+                )
                 
                 return {
                     'status': 'success',
@@ -76,33 +232,34 @@ class MentalHealthDocumentProcessor:
 
     def _is_mental_health_content(self, text: str) -> bool:
         """Deteksi apakah teks mengandung konten kesehatan mental"""
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in self.mental_health_keywords)
-
-    def _highlight_keywords(self, text: str) -> str:
-        """Highlight keyword kesehatan mental dalam teks"""
-        highlighted = text
-        for keyword in self.mental_health_keywords:
-            pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-            highlighted = pattern.sub(f"**{keyword.upper()}**", highlighted)
-        return highlighted
-
-    def _summarize_page(self, page_text: str) -> str:
+        return self.matcher.contains(text)
+
+    def _highlight_keywords(self, text: str, hits: Optional[List[KeywordHit]] = None) -> str:
+        """Highlight keyword kesehatan mental dalam teks (dibangun sekali dari hasil scan)"""
+        hits = self.matcher.scan(text) if hits is None else hits
+        parts, last = [], 0
+        for start, end, keyword in hits:
+            parts.append(text[last:start])
+            parts.append(f"**{keyword.upper()}**")
+            last = end
+        parts.append(text[last:])
+        return "".join(parts)
+
+    def _summarize_page(self, page_text: str, hits: Optional[List[KeywordHit]] = None) -> str:
         """Ringkas halaman yang relevan"""
-        sentences = re.split(r'(?<=[.!?])\s+', page_text)
+        hits = self.matcher.scan(page_text) if hits is None else hits
         relevant_sentences = [
-            s for s in sentences 
-            if any(keyword.lower() in s.lower() for keyword in self.mental_health_keywords)
+            page_text[start:end] for start, end in _spans_with_hits(_sentence_spans(page_text), hits, limit=3)
         ]
-        return " ".join(relevant_sentences[:3]) + "..." if relevant_sentences else ""
+        return " ".join(relevant_sentences) + "..." if relevant_sentences else ""
 
-    def _generate_summary(self, text: str) -> str:
+    def _generate_summary(self, text: str, hits: Optional[List[KeywordHit]] = None) -> str:
         """Buat ringkasan dokumen yang fokus pada aspek kesehatan mental"""
-        paragraphs = [p for p in text.split('\n') if p.strip()]
+        hits = self.matcher.scan(text) if hits is None else hits
+        paragraph_spans = (m.span() for m in _PARAGRAPH.finditer(text))
         relevant_paras = [
-            p for p in paragraphs 
-            if self._is_mental_health_content(p)
-        ][:3]
+            text[start:end] for start, end in _spans_with_hits(paragraph_spans, hits, limit=3)
+        ]
         
         if not relevant_paras:
             return "Dokumen ini tidak memiliki konten kesehatan mental yang terdeteksi."
@@ -116,8 +273,30 @@ class MentalHealthDocumentProcessor:
             "\nGunakan fitur chat untuk bertanya spesifik tentang dokumen ini."
         ])
 
+def _read_upload(uploaded_file) -> bytes:
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    uploaded_file.seek(0)
+    return uploaded_file.read()
+
 # Fungsi untuk kompatibilitas dengan Streamlit
-def extract_mental_health_document(uploaded_file):
+def extract_mental_health_document(uploaded_file, on_page: Optional[Callable[[int, str], None]] = None):
+    """Ekstrak dokumen; hasil di-cache berdasarkan hash isi file supaya rerun tidak parse ulang"""
+    data = _read_upload(uploaded_file)
+    content_hash = hashlib.sha256(data).hexdigest()
+    with _cache_lock:
+        cached = _extraction_cache.get(content_hash)
+        if cached is not None:
+            _extraction_cache.move_to_end(content_hash)
+            return cached
+
     processor = MentalHealthDocumentProcessor()
-    file_stream = io.BytesIO(uploaded_file.read())
-    return processor.extract_text_from_pdf(file_stream)
+    file_stream = io.BytesIO(data)
+    result = processor.extract_text_from_pdf(file_stream, on_page=on_page)
+    if result.get('status') == 'success':
+        result['content_hash'] = content_hash
+        with _cache_lock:
+            _extraction_cache[content_hash] = result
+            while len(_extraction_cache) > PDF_CACHE_SIZE:
+                _extraction_cache.popitem(last=False)
+    return result
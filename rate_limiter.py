@@ -0,0 +1,55 @@
+# rate_limiter.py
+# Token bucket thread-safe: hanya menunda kalau batas rate benar-benar hampir tercapai
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Token bucket sederhana: `rate` token per detik, maksimal `capacity` token tersimpan"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("❌ Rate token bucket harus > 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Ambil token tanpa menunggu; False kalau token belum cukup"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Tunggu sampai token tersedia; False kalau timeout habis"""
+        if tokens > self.capacity:
+            raise ValueError(f"❌ Permintaan {tokens} token melebihi kapasitas {self.capacity}")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+            with self._lock:
+                self.waited_seconds += wait
@@ -1,53 +1,580 @@
 # ✅ retriever.py (FINAL AMAN – fix error client/async_client)
 
 import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Mapping, NamedTuple, Optional, Sequence, Tuple
 from dotenv import load_dotenv
 import cohere
+import faiss
+import numpy as np
 from langchain_cohere import CohereEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from ann_index import load_index_config, search_parameters
+from bm25_index import BM25_FILE, BM25Index, reciprocal_rank_fusion
+from doc_store import PICKLE_FILE, MmapDocstore, docstore_exists
+from embedding_cache import DEFAULT_DISK_MAX_ENTRIES, CachedEmbeddings, QueryEmbeddingCache
+from embedding_coalescer import DEFAULT_MAX_BATCH, DEFAULT_WINDOW_MS, EmbeddingCoalescer, query_batch_embedder
+from faq_index import DEFAULT_FUZZY_THRESHOLD, DEFAULT_VECTOR_THRESHOLD, FaqIndex, FaqMatch
+from index_pointer import resolve_index_dir
+from shard_registry import ShardSpec, calibrate, load_registry, merge_ranked, merge_scored, select_shards
+from tracing import get_tracer
+
+EMBEDDING_MODEL = "embed-multilingual-v3.0"
+DEFAULT_CACHE_DIR = "data/embedding_cache"
+DEFAULT_INDEX_PATH = "data/faiss_index"
+SEARCH_MODES = ("vector", "hybrid", "lexical")
+DEFAULT_SHARD = "default"
+
+# Thread untuk embedding query dengan batas waktu; kalau lewat, pencarian turun ke mode leksikal
+_embed_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="embed-query")
+# Thread untuk fan-out pencarian multi-shard; shard yang melewati budget-nya tidak ditunggu
+_shard_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="shard-search")
+
+# Flag mmap dicoba berurutan. IO_FLAG_MMAP_IFC (faiss >= 1.8) memetakan storage vektor IndexFlat dan HNSW
+# serta inverted list IVF (Flat/PQ/SQ8) langsung dari file: zero-copy, page cache dipakai bersama antar
+# proses. IO_FLAG_MMAP lama hanya memetakan inverted list IVF; IndexFlat/HNSW tetap disalin penuh ke RAM.
+MMAP_FLAGS = tuple(flag for flag in (getattr(faiss, "IO_FLAG_MMAP_IFC", None), faiss.IO_FLAG_MMAP) if flag)
+
+def create_cohere_client(api_key: str) -> cohere.Client:
+    """Client Cohere; COHERE_BASE_URL bisa diarahkan ke server embedding lokal untuk uji"""
+    base_url = os.getenv("COHERE_BASE_URL")
+    if base_url:
+        return cohere.Client(api_key=api_key, base_url=base_url)
+    return cohere.Client(api_key=api_key)
+
+def create_cohere_embeddings(api_key: str) -> CohereEmbeddings:
+    """Embeddings Cohere dengan client eksplisit (hindari error client/async_client)"""
+    return CohereEmbeddings(
+        client=create_cohere_client(api_key),
+        model=EMBEDDING_MODEL,
+        base_url=os.getenv("COHERE_BASE_URL")
+    )
+
+def _index_version(index_path: str):
+    """Identitas file index.faiss versi aktif (inode + mtime + ukuran) untuk deteksi index baru"""
+    stat = os.stat(os.path.join(resolve_index_dir(index_path), "index.faiss"))
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def _load_vectorstore(index_path: str, embeddings, mmap: bool = True) -> FAISS:
+    """Muat index FAISS secara memory-mapped (read-only) + docstore mmap (atau index.pkl untuk index lama)"""
+    index_path = resolve_index_dir(index_path)
+    index_file = os.path.join(index_path, "index.faiss")
+    index = None
+    if mmap:
+        for flag in MMAP_FLAGS:
+            try:
+                index = faiss.read_index(index_file, flag | getattr(faiss, "IO_FLAG_READ_ONLY", 0))
+                break
+            except RuntimeError as e:
+                # Tidak semua tipe index/versi faiss mendukung flag ini, coba flag berikutnya lalu load biasa
+                print(f"⚠️ Index tidak bisa di-mmap (flag {flag:#x}): {str(e)}")
+        if index is None:
+            print("⚠️ Index dimuat penuh ke RAM")
+    if index is None:
+        index = faiss.read_index(index_file)
+
+    if docstore_exists(index_path):
+        # Tanpa unpickle: Document hanya dibuat untuk hasil pencarian
+        docstore = MmapDocstore(index_path)
+        index_to_docstore_id = docstore.ids
+    else:
+        print("⚠️ Docstore mmap belum ada, memuat index.pkl (konversi: python doc_store.py)")
+        with open(os.path.join(index_path, PICKLE_FILE), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id
+    )
+
+class IndexState(NamedTuple):
+    """Index yang sedang dipakai; di-swap sebagai satu objek supaya vector + BM25 selalu sinkron"""
+    vectorstore: FAISS
+    bm25: Optional[BM25Index]
+    version: tuple
+    config: dict
+    # doc_id -> posisi di index FAISS, untuk mengambil vektor kandidat (MMR) tanpa embedding ulang
+    positions: Mapping[str, int]
+    faq: Optional[FaqIndex]
+
+def _load_state(index_path: str, embeddings, mmap: bool = True) -> IndexState:
+    # Penunjuk versi di-resolve sekali: semua file dibaca dari folder versi yang sama walau ada publish baru
+    index_path = resolve_index_dir(index_path)
+    version = _index_version(index_path)
+    vectorstore = _load_vectorstore(index_path, embeddings, mmap=mmap)
+    try:
+        if os.path.exists(os.path.join(index_path, BM25_FILE)):
+            bm25 = BM25Index.load(index_path)
+        else:
+            # Index lama tanpa bm25.json: bangun dari docstore saat load
+            bm25 = BM25Index.from_docstore(vectorstore.index_to_docstore_id, vectorstore.docstore)
+    except Exception as e:
+        print(f"⚠️ Index BM25 tidak tersedia, hanya pencarian vektor: {str(e)}")
+        bm25 = None
+    if isinstance(vectorstore.docstore, MmapDocstore):
+        positions = vectorstore.docstore.positions
+    else:
+        positions = {doc_id: position for position, doc_id in vectorstore.index_to_docstore_id.items()}
+    faq = None
+    if FaqIndex.exists(index_path):
+        try:
+            faq = FaqIndex.load(index_path)
+        except Exception as e:
+            print(f"⚠️ Index FAQ tidak bisa dimuat, jalur cepat FAQ nonaktif: {str(e)}")
+    else:
+        print(f"⚠️ {index_path} tidak punya faq.json, jalur cepat FAQ nonaktif (jalankan create_index.py)")
+    return IndexState(vectorstore, bm25, version, load_index_config(index_path), positions, faq)
+
+def _tag_shard(doc: Document, shard: str) -> Document:
+    """Salinan dokumen dengan nama shard di metadata (dokumen di docstore tidak diubah)"""
+    return Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, "shard": shard})
+
+class IndexShard:
+    """Satu index bernama: state yang di-swap atomik, reload sendiri, budget latensi, dan statistik"""
+
+    def __init__(self, spec: ShardSpec, embeddings, mmap: bool = True, reload_interval: float = 30.0):
+        if not os.path.exists(spec.path):
+            raise FileNotFoundError(f"❌ Index FAISS tidak ditemukan di: {spec.path}")
+        self.spec = spec
+        self.name = spec.name
+        self.routes = spec.routes
+        self.index_path = spec.path
+        self.embeddings = embeddings
+        self.mmap = mmap
+        self.reload_interval = reload_interval
+        self.budget = spec.budget_ms / 1000.0
+        self.counts = {"ok": 0, "timeout": 0, "error": 0}
+        self.seconds = 0.0
+        self._stats_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._last_check = time.monotonic()
+        self._state = _load_state(spec.path, embeddings, mmap=mmap)
+
+    @property
+    def version(self):
+        return self._state.version
+
+    def current(self) -> IndexState:
+        self._maybe_reload()
+        return self._state
+
+    def reload(self, force: bool = False) -> bool:
+        """Muat ulang index kalau ada versi baru; swap atomik, pencarian lama tetap jalan"""
+        with self._swap_lock:
+            self._last_check = time.monotonic()
+            try:
+                version = _index_version(self.index_path)
+                if not force and version == self.version:
+                    return False
+                state = _load_state(self.index_path, self.embeddings, mmap=self.mmap)
+            except Exception as e:
+                print(f"❌ Gagal memuat index baru, tetap memakai index lama: {str(e)}")
+                return False
+            # Assignment referensi bersifat atomik; thread yang sedang mencari memegang state lama
+            self._state = state
+            print(f"✅ Index FAISS diperbarui dari: {self.index_path}")
+            return True
+
+    def _maybe_reload(self):
+        if self.reload_interval is None:
+            return
+        if time.monotonic() - self._last_check < self.reload_interval:
+            return
+        if self._swap_lock.locked():
+            return
+        self.reload()
+
+    def record(self, result: str, seconds: float = 0.0):
+        with self._stats_lock:
+            self.counts[result] += 1
+            self.seconds += seconds
+
+    def stats(self):
+        with self._stats_lock:
+            counts, seconds = dict(self.counts), self.seconds
+        return {**counts, "avg_ms": round(seconds / counts["ok"] * 1000, 3) if counts["ok"] else 0.0,
+                "budget_ms": self.spec.budget_ms}
 
 class FaissRetriever:
-    def __init__(self, index_path: str):
+    def __init__(self, index_path: Optional[str] = None, cache_dir: str = None,
+                 cache_size: int = 2048, cache_ttl: float = 3600.0,
+                 mmap: bool = True, reload_interval: float = 30.0,
+                 search_mode: str = None, embed_timeout: float = 3.0,
+                 degraded_cooldown: float = 30.0, embeddings: Optional[Embeddings] = None,
+                 shards: Optional[Sequence[ShardSpec]] = None):
         load_dotenv()
 
         cohere_api_key = os.getenv("COHERE_API_KEY")
-        if not cohere_api_key:
+        if not cohere_api_key and embeddings is None:
             raise ValueError("❌ COHERE_API_KEY tidak ditemukan di .env")
 
-        if not os.path.exists(index_path):
-            raise FileNotFoundError(f"❌ Index FAISS tidak ditemukan di: {index_path}")
+        if shards is None:
+            if not index_path:
+                raise ValueError("❌ index_path atau shards harus diisi")
+            shards = [ShardSpec(DEFAULT_SHARD, index_path)]
+        if len(shards) == 1 and not os.path.exists(shards[0].path):
+            raise FileNotFoundError(f"❌ Index FAISS tidak ditemukan di: {shards[0].path}")
+
+        search_mode = search_mode or os.getenv("KINDORA_SEARCH_MODE", "hybrid")
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"❌ Mode pencarian tidak dikenal: {search_mode}")
 
         # Set user agent via environment
         os.environ["LANGCHAIN_USER_AGENT"] = "mental-health-chatbot"
 
-        # ✅ Gunakan client eksplisit (hindari error client/async_client)
-        cohere_client = cohere.Client(api_key=cohere_api_key)
-        self.embeddings = CohereEmbeddings(
-            client=cohere_client,
-            model="embed-multilingual-v3.0"
+        if embeddings is not None:
+            # Embeddings lain (mis. fake untuk benchmark offline) bisa disuntikkan langsung
+            base_embeddings = embeddings
+        else:
+            base_embeddings = create_cohere_embeddings(cohere_api_key)
+
+        # ✅ Cache embedding query (memori + disk) supaya pertanyaan berulang tidak ke API lagi
+        self.query_cache = QueryEmbeddingCache(
+            cache_dir=cache_dir or os.getenv("KINDORA_EMBED_CACHE_DIR", DEFAULT_CACHE_DIR),
+            maxsize=cache_size,
+            ttl=cache_ttl,
+            disk_max_entries=int(os.getenv("KINDORA_EMBED_CACHE_DISK_MAX", str(DEFAULT_DISK_MAX_ENTRIES)))
         )
+        # Cache miss dari banyak sesi digabung jadi satu panggilan embed batch (window 0 = nonaktif)
+        window_ms = float(os.getenv("KINDORA_EMBED_BATCH_WINDOW_MS", str(DEFAULT_WINDOW_MS)))
+        self.coalescer = None
+        if window_ms > 0:
+            self.coalescer = EmbeddingCoalescer(
+                query_batch_embedder(base_embeddings), window_ms=window_ms,
+                max_batch=int(os.getenv("KINDORA_EMBED_MAX_BATCH", str(DEFAULT_MAX_BATCH)))
+            )
+            get_tracer().register_metrics(self.coalescer.prometheus_lines, name="embed_coalescer")
+        self.embeddings = CachedEmbeddings(base_embeddings, self.query_cache, EMBEDDING_MODEL, self.coalescer)
+
+        self.mmap = mmap
+        self.reload_interval = reload_interval
+        self.search_mode = search_mode
+        self.embed_timeout = embed_timeout
+        self.degraded_cooldown = degraded_cooldown
+        self.faq_enabled = os.getenv("KINDORA_FAQ_FAST_PATH", "1") != "0"
+        self.faq_fuzzy_threshold = float(os.getenv("KINDORA_FAQ_FUZZY_THRESHOLD", str(DEFAULT_FUZZY_THRESHOLD)))
+        self.faq_vector_threshold = float(os.getenv("KINDORA_FAQ_VECTOR_THRESHOLD", str(DEFAULT_VECTOR_THRESHOLD)))
+        self._degraded_until = 0.0
+
+        self.shards = self._load_shards(shards)
+        self.primary = self.shards[0]
+        self.index_path = self.primary.index_path
+        if len(self.shards) > 1:
+            get_tracer().register_metrics(self.shard_prometheus_lines, name="shards")
 
+    def _load_shards(self, specs: Sequence[ShardSpec]) -> List[IndexShard]:
+        """Muat semua shard; dengan banyak shard, shard yang gagal/berbeda dimensi dilewati"""
+        shards = []
+        for spec in specs:
+            try:
+                shard = IndexShard(spec, self.embeddings, mmap=self.mmap, reload_interval=self.reload_interval)
+            except Exception as e:
+                if len(specs) == 1:
+                    raise RuntimeError(f"Gagal memuat FAISS index: {str(e)}")
+                print(f"⚠️ Shard {spec.name} tidak bisa dimuat, dilewati: {str(e)}")
+                continue
+            # Query di-embed sekali untuk semua shard, jadi semua shard harus memakai model/dimensi yang sama
+            dim = shard.current().vectorstore.index.d
+            if shards and dim != shards[0].current().vectorstore.index.d:
+                print(f"⚠️ Dimensi vektor shard {spec.name} ({dim}) berbeda dengan {shards[0].name}, dilewati")
+                continue
+            shards.append(shard)
+        if not shards:
+            raise RuntimeError("Gagal memuat FAISS index: tidak ada shard yang bisa dimuat")
+        return shards
+
+    @property
+    def vectorstore(self) -> FAISS:
+        return self.primary.current().vectorstore
+
+    @property
+    def version(self):
+        """Versi index (multi-shard: versi semua shard, berubah kalau salah satu shard di-update)"""
+        if len(self.shards) == 1:
+            return self.primary.version
+        return tuple(shard.version for shard in self.shards)
+
+    def reload(self, force: bool = False) -> bool:
+        """Muat ulang shard yang punya versi baru; swap atomik per shard, pencarian lama tetap jalan"""
+        return any([shard.reload(force) for shard in self.shards])
+
+    def embed_query(self, query: str, timeout: Optional[float] = None):
+        """Embedding query (lewat cache); None kalau gagal atau melewati batas waktu"""
         try:
-            self.vectorstore = FAISS.load_local(
-                index_path,
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
+            if not query:
+                raise ValueError("Query tidak boleh kosong")
+            timeout = self.embed_timeout if timeout is None else timeout
+            if time.monotonic() < self._degraded_until:
+                # Layanan embedding sedang lambat: hanya pakai cache, jangan menunggu API
+                return self.embeddings.cached_query(query)
+            if self.coalescer is not None:
+                future = self.embeddings.submit_query(query)
+            else:
+                future = _embed_executor.submit(self.embeddings.embed_query, query)
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Request tetap jalan di background dan mengisi cache untuk query berikutnya
+            self._degraded_until = time.monotonic() + self.degraded_cooldown
+            print(f"⚠️ Embedding query melebihi {timeout}s, pakai pencarian leksikal")
+            return None
         except Exception as e:
-            raise RuntimeError(f"Gagal memuat FAISS index: {str(e)}")
+            print(f"❌ Error saat embedding query: {str(e)}")
+            return None
+
+    def _vector_ranking(self, state: IndexState, vector, k: int,
+                        nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        query = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        index = state.vectorstore.index
+        # Knob ANN per query (nprobe IVF / efSearch HNSW) tanpa mengubah index bersama
+        params = search_parameters(index, nprobe=nprobe, ef_search=ef_search)
+        if params is not None:
+            _, positions = index.search(query, k, params=params)
+        else:
+            _, positions = index.search(query, k)
+        return [state.vectorstore.index_to_docstore_id[int(p)] for p in positions[0] if p != -1]
 
-    def search(self, query: str, k: int = 3):
+    def _lexical_ranking(self, state: IndexState, query: str, k: int):
+        if state.bm25 is None:
+            return []
+        return [doc_id for doc_id, _ in state.bm25.search(query, k=k)]
+
+    def _documents(self, state: IndexState, doc_ids):
+        docs = []
+        for doc_id in doc_ids:
+            doc = state.vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                docs.append(doc)
+        return docs
+
+    def _vectors(self, state: IndexState, doc_ids: List[str]) -> Optional[np.ndarray]:
+        """Vektor tersimpan untuk dokumen hasil pencarian; None kalau index tidak mendukung reconstruct"""
+        try:
+            positions = np.array([state.positions[doc_id] for doc_id in doc_ids], dtype=np.int64)
+            return state.vectorstore.index.reconstruct_batch(positions)
+        except (KeyError, RuntimeError) as e:
+            print(f"⚠️ Vektor kandidat tidak tersedia, MMR memakai kemiripan teks: {str(e)}")
+            return None
+
+    def _ranked_ids(self, state: IndexState, vector, k: int, query: Optional[str], mode: Optional[str],
+                    nprobe: Optional[int], ef_search: Optional[int]):
+        mode = mode or self.search_mode
+        if mode == "hybrid" and query and state.bm25 is not None:
+            # Reciprocal rank fusion dari ranking vektor dan leksikal
+            candidates = max(k * 4, 20)
+            fused = reciprocal_rank_fusion([
+                self._vector_ranking(state, vector, candidates, nprobe, ef_search),
+                self._lexical_ranking(state, query, candidates)
+            ])
+            return [doc_id for doc_id, _ in fused[:k]]
+        return self._vector_ranking(state, vector, k, nprobe, ef_search)
+
+    def search_by_vector(self, vector, k: int = 3, query: Optional[str] = None, mode: Optional[str] = None,
+                         nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                         shards: Optional[Sequence[str]] = None):
+        """Pencarian dengan vektor yang sudah ada; mode hybrid ikut memakai BM25 kalau query diberikan"""
+        if len(self.shards) > 1:
+            return self.search_with_vectors(vector, k=k, query=query, mode=mode, nprobe=nprobe,
+                                            ef_search=ef_search, shards=shards)[0]
+        try:
+            state = self.primary.current()
+            return self._documents(state, self._ranked_ids(state, vector, k, query, mode, nprobe, ef_search))
+        except Exception as e:
+            print(f"❌ Error saat mencari: {str(e)}")
+            return []
+
+    def search_with_vectors(self, vector, k: int = 12, query: Optional[str] = None, mode: Optional[str] = None,
+                            nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                            shards: Optional[Sequence[str]] = None) -> Tuple[List[Document], Optional[np.ndarray]]:
+        """Seperti search_by_vector, plus vektor tersimpan tiap dokumen (dari state index yang sama)"""
+        try:
+            if len(self.shards) > 1:
+                return self._search_shards(vector, k, query, mode, nprobe, ef_search, shards)
+            state = self.primary.current()
+            docs = self._documents(state, self._ranked_ids(state, vector, k, query, mode, nprobe, ef_search))
+            return docs, self._vectors(state, [doc.id for doc in docs]) if docs else None
+        except Exception as e:
+            print(f"❌ Error saat mencari: {str(e)}")
+            return [], None
+
+    def lexical_search(self, query: str, k: int = 3, shards: Optional[Sequence[str]] = None):
+        """Jalur cepat BM25 saja, tanpa panggilan embedding"""
         try:
             if not query:
                 raise ValueError("Query tidak boleh kosong")
-            return self.vectorstore.similarity_search(query, k=k)
+            if len(self.shards) > 1:
+                selected = select_shards(self.shards, query, shards)
+                results = self._fan_out(selected, lambda shard: self._shard_lexical(shard, query, k))
+                # Skor BM25 tidak sebanding antar korpus: merge berdasarkan peringkat per shard
+                merged = merge_ranked([(shard.name, [(state, doc_id) for doc_id in ids])
+                                       for shard, (state, ids) in results],
+                                      {shard.name: shard.spec.weight for shard in selected}, k)
+                return self._materialize([(name, hit) for name, hit, _ in merged])[0]
+            state = self.primary.current()
+            return self._documents(state, self._lexical_ranking(state, query, k))
         except Exception as e:
             print(f"❌ Error saat mencari: {str(e)}")
             return []
 
+    def search(self, query: str, k: int = 3, mode: Optional[str] = None,
+               nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+               shards: Optional[Sequence[str]] = None):
+        mode = mode or self.search_mode
+        if mode == "lexical":
+            return self.lexical_search(query, k=k, shards=shards)
+        vector = self.embed_query(query)
+        if vector is None:
+            # Embedding gagal/lambat: tetap jawab dari index leksikal
+            return self.lexical_search(query, k=k, shards=shards)
+        return self.search_by_vector(vector, k=k, query=query, mode=mode, nprobe=nprobe, ef_search=ef_search,
+                                     shards=shards)
+
+    # ---- multi-shard ----
+
+    def _shard_hits(self, shard: IndexShard, vector, k: int, query: Optional[str], mode: Optional[str],
+                    nprobe: Optional[int], ef_search: Optional[int]):
+        """Id kandidat satu shard + vektor tersimpannya; Document baru dibuat untuk top-k hasil merge"""
+        state = shard.current()
+        ids = self._ranked_ids(state, vector, k, query, mode, nprobe, ef_search)
+        return state, ids, self._vectors(state, ids) if ids else None
+
+    def _shard_lexical(self, shard: IndexShard, query: str, k: int):
+        state = shard.current()
+        return state, self._lexical_ranking(state, query, k)
+
+    def _materialize(self, hits) -> Tuple[List[Document], list]:
+        """(nama_shard, (state, doc_id, ...)) -> Document bertanda shard + sisa tuple untuk dokumen yang ada"""
+        docs, extras = [], []
+        for name, (state, doc_id, *extra) in hits:
+            doc = state.vectorstore.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                docs.append(_tag_shard(doc, name))
+                extras.append(extra)
+        return docs, extras
+
+    def _fan_out(self, shards: Sequence[IndexShard], search) -> List[Tuple[IndexShard, object]]:
+        """search(shard) paralel di thread pool; shard yang melewati budget-nya dilewati, sisanya tetap dipakai"""
+        def timed(shard):
+            begin = time.perf_counter()
+            return search(shard), time.perf_counter() - begin
+
+        start = time.perf_counter()
+        futures = [(shard, _shard_executor.submit(timed, shard)) for shard in shards]
+        results = []
+        for shard, future in futures:
+            try:
+                # Deadline absolut per shard: menunggu shard lain tidak memperpanjang budget shard ini
+                result, seconds = future.result(timeout=max(0.0, start + shard.budget - time.perf_counter()))
+            except FutureTimeoutError:
+                # Pencarian tetap selesai di background; jawaban tidak menunggu shard ini
+                shard.record("timeout")
+                print(f"⚠️ Shard {shard.name} melewati budget {shard.spec.budget_ms:.0f}ms, dilewati")
+                continue
+            except Exception as e:
+                shard.record("error")
+                print(f"❌ Error saat mencari di shard {shard.name}: {str(e)}")
+                continue
+            shard.record("ok", seconds)
+            results.append((shard, result))
+        get_tracer().set_attributes(shards_searched=len(shards), shards_answered=len(results))
+        return results
+
+    def _search_shards(self, vector, k: int, query: Optional[str], mode: Optional[str], nprobe: Optional[int],
+                       ef_search: Optional[int], names: Optional[Sequence[str]]):
+        """Fan-out ke shard terpilih, lalu top-k global dari skor kosinus terkalibrasi per shard.
+
+        Kosinus dihitung ulang dari vektor tersimpan, bukan jarak FAISS, supaya sebanding antar tipe index
+        (flat/IVF/HNSW/PQ); weight dan floor per shard dari registry.
+        """
+        selected = select_shards(self.shards, query, names)
+        results = self._fan_out(selected, lambda shard: self._shard_hits(shard, vector, k, query, mode,
+                                                                         nprobe, ef_search))
+        results = [(shard, hits) for shard, hits in results if hits[1]]
+        if any(vectors is None for _, (_, _, vectors) in results):
+            # Ada shard tanpa vektor tersimpan: kosinus tidak bisa dihitung, merge berdasarkan peringkat
+            merged = merge_ranked([(shard.name, [(state, doc_id) for doc_id in ids])
+                                   for shard, (state, ids, _) in results],
+                                  {shard.name: shard.spec.weight for shard in selected}, k)
+            return self._materialize([(name, hit) for name, hit, _ in merged])[0], None
+
+        query_vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        query_vector = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+        scored = []
+        for shard, (state, ids, vectors) in results:
+            similarities = vectors @ query_vector / np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+            scores = calibrate(similarities.tolist(), shard.spec.floor, shard.spec.weight)
+            hits = [(state, doc_id, vec) for doc_id, vec in zip(ids, vectors)]
+            scored.append((shard.name, list(zip(hits, scores))))
+        docs, extras = self._materialize([(name, hit) for name, hit, _ in merge_scored(scored, k)])
+        if not docs:
+            return [], None
+        return docs, np.stack([extra[0] for extra in extras])
+
+    def match_faq(self, query: Optional[str] = None, vector=None) -> Optional[FaqMatch]:
+        """Pertanyaan FAQ yang cocok di atas ambang (exact/fuzzy dari teks, atau vektor query) di semua shard"""
+        if not self.faq_enabled:
+            return None
+        try:
+            best = None
+            for shard in self.shards:
+                faq = shard.current().faq
+                if faq is None:
+                    continue
+                match = faq.match(query, vector, fuzzy_threshold=self.faq_fuzzy_threshold,
+                                  vector_threshold=self.faq_vector_threshold)
+                if match is not None and (best is None or match.score > best.score):
+                    best = match
+            return best
+        except Exception as e:
+            print(f"❌ Error saat mencocokkan FAQ: {str(e)}")
+            return None
+
+    def cache_stats(self):
+        """Statistik hit/miss cache embedding query"""
+        return self.query_cache.stats()
+
+    def shard_stats(self):
+        """Per shard: jumlah pencarian ok/timeout/error, rata-rata latensi, dan budget"""
+        return {shard.name: shard.stats() for shard in self.shards}
+
+    def shard_prometheus_lines(self) -> List[str]:
+        lines = ["# TYPE kindora_shard_searches_total counter"]
+        for shard in self.shards:
+            stats = shard.stats()
+            lines += [f'kindora_shard_searches_total{{shard="{shard.name}",result="{result}"}} {stats[result]}'
+                      for result in ("ok", "timeout", "error")]
+        return lines
+
+_shared_retrievers = {}
+_shared_lock = threading.Lock()
+
+def get_shared_retriever(index_path: str = DEFAULT_INDEX_PATH, registry: Optional[str] = None) -> FaissRetriever:
+    """Satu retriever read-only per proses, dipakai bersama oleh semua sesi Streamlit.
+
+    Registry shard (argumen atau KINDORA_SHARDS) menggantikan index_path tunggal dengan beberapa index bernama.
+    """
+    registry = registry or os.getenv("KINDORA_SHARDS")
+    key = os.path.abspath(registry or index_path)
+    retriever = _shared_retrievers.get(key)
+    if retriever is None:
+        with _shared_lock:
+            retriever = _shared_retrievers.get(key)
+            if retriever is None:
+                shards = load_registry(registry) if registry else None
+                retriever = FaissRetriever(index_path=index_path, shards=shards)
+                _shared_retrievers[key] = retriever
+    return retriever
+
 # Contoh penggunaan
 if __name__ == '__main__':
-    retriever = FaissRetriever(index_path="data/faiss_index")
+    retriever = get_shared_retriever(DEFAULT_INDEX_PATH)
     hasil = retriever.search("apa penyebab depresi?", k=3)
     for i, doc in enumerate(hasil):
         print(f"\n--- Hasil {i+1} ---\n{doc.page_content[:200]}...")
+    print(retriever.cache_stats())
@@ -0,0 +1,188 @@
+# search_service.py
+# Fallback pencarian web yang tidak memblokir request terlalu lama: batas waktu keras, cache TTL
+# (key = query ternormalisasi + bahasa), query identik yang sedang berjalan dipakai bersama antar sesi,
+# dan fan-out paralel ke beberapa backend — hasil valid pertama yang menang.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence
+
+from embedding_cache import normalize_query
+
+DEFAULT_DEADLINE = 5.0
+DEFAULT_TTL = 3600.0
+DEFAULT_NUM_RESULTS = 10
+
+
+class GoogleSearchBackend:
+    """Backend googlesearch-python; timeout HTTP-nya disamakan dengan batas waktu layanan"""
+
+    name = "google"
+
+    def __init__(self, timeout: float = DEFAULT_DEADLINE):
+        self.timeout = timeout
+
+    def __call__(self, query: str, num_results: int = DEFAULT_NUM_RESULTS, lang: str = "id") -> List[str]:
+        from googlesearch import search
+        return list(search(query, num_results=num_results, lang=lang, timeout=self.timeout))
+
+
+def _backend_name(backend: Callable) -> str:
+    return getattr(backend, "name", None) or getattr(backend, "__name__", type(backend).__name__)
+
+
+class SearchService:
+    """Pencarian web dengan deadline, cache TTL, dedupe in-flight, dan fan-out ke beberapa backend"""
+
+    def __init__(self, backends: Sequence[Callable], deadline: float = DEFAULT_DEADLINE,
+                 ttl: float = DEFAULT_TTL, maxsize: int = 512, max_workers: int = 8):
+        if not backends:
+            raise ValueError("❌ Minimal satu backend pencarian dibutuhkan")
+        self.backends = list(backends)
+        self.deadline = deadline
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Panggilan backend yang melewati deadline tetap berjalan sampai selesai di pool ini,
+        # jadi ukuran pool juga membatasi berapa banyak request lambat yang menumpuk
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="web-search")
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._inflight: Dict[tuple, Future] = {}
+
+        self.cache_hits = 0
+        self.shared_waits = 0
+        self.timeouts = 0
+        self.backend_errors: Dict[str, int] = {}
+        self.backend_wins: Dict[str, int] = {}
+
+    def _key(self, query: str, lang: str, num_results: int) -> tuple:
+        return normalize_query(query), lang, num_results
+
+    def _cached(self, key: tuple) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            results, ts = entry
+            if self.ttl is not None and time.time() - ts > self.ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return list(results)
+
+    def _remember(self, key: tuple, results: List[str]):
+        with self._lock:
+            self._cache[key] = (tuple(results), time.time())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def _call_backend(self, backend: Callable, query: str, num_results: int, lang: str) -> List[str]:
+        try:
+            return list(backend(query, num_results=num_results, lang=lang))
+        except Exception as e:
+            name = _backend_name(backend)
+            with self._lock:
+                self.backend_errors[name] = self.backend_errors.get(name, 0) + 1
+            print(f"⚠️ Backend pencarian {name} gagal: {str(e)}")
+            return []
+
+    def _fan_out(self, query: str, num_results: int, lang: str, deadline_at: float) -> List[str]:
+        futures = {
+            self._executor.submit(self._call_backend, backend, query, num_results, lang): backend
+            for backend in self.backends
+        }
+        pending = set(futures)
+        while pending:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                results = future.result()
+                if results:
+                    name = _backend_name(futures[future])
+                    with self._lock:
+                        self.backend_wins[name] = self.backend_wins.get(name, 0) + 1
+                    return results
+        if pending:
+            with self._lock:
+                self.timeouts += 1
+        return []
+
+    def search(self, query: str, num_results: int = DEFAULT_NUM_RESULTS, lang: str = "id",
+               deadline: Optional[float] = None) -> List[str]:
+        """Daftar URL; list kosong kalau semua backend gagal atau deadline lewat"""
+        deadline_at = time.monotonic() + (self.deadline if deadline is None else deadline)
+        key = self._key(query, lang, num_results)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.shared_waits += 1
+
+        if not owner:
+            # Query yang sama sedang dicari sesi lain: tunggu hasilnya (tetap dalam deadline sendiri)
+            try:
+                return list(future.result(timeout=max(0.0, deadline_at - time.monotonic())))
+            except Exception:
+                return []
+
+        results: List[str] = []
+        try:
+            results = self._fan_out(query, num_results, lang, deadline_at)
+            if results:
+                self._remember(key, results)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_result(results)
+        return list(results)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "cache_size": len(self._cache),
+                "cache_hits": self.cache_hits,
+                "shared_waits": self.shared_waits,
+                "timeouts": self.timeouts,
+                "backend_wins": dict(self.backend_wins),
+                "backend_errors": dict(self.backend_errors),
+            }
+
+
+_shared_service: Optional[SearchService] = None
+_shared_lock = threading.Lock()
+
+
+def get_search_service() -> SearchService:
+    """Layanan pencarian dipakai bersama semua sesi dalam satu proses"""
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                deadline = float(os.getenv("KINDORA_SEARCH_DEADLINE", DEFAULT_DEADLINE))
+                _shared_service = SearchService(
+                    [GoogleSearchBackend(timeout=deadline)],
+                    deadline=deadline,
+                    ttl=float(os.getenv("KINDORA_SEARCH_TTL", DEFAULT_TTL)),
+                )
+    return _shared_service
+
+
+def set_search_service(service: Optional[SearchService]) -> Optional[SearchService]:
+    """Ganti layanan bersama (mis. backend stub untuk benchmark); mengembalikan layanan sebelumnya"""
+    global _shared_service
+    with _shared_lock:
+        previous, _shared_service = _shared_service, service
+    return previous
@@ -0,0 +1,139 @@
+# semantic_cache.py
+# Cache jawaban semantik: pertanyaan yang maknanya sama (parafrase) dan didukung dokumen
+# yang sama memakai jawaban tersimpan, tanpa memanggil Gemini lagi.
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.92
+
+
+def documents_key(docs: List) -> str:
+    """Sidik jari dokumen hasil retrieval (urutan tidak berpengaruh)"""
+    digest = hashlib.sha256()
+    for content in sorted(doc.page_content for doc in docs):
+        digest.update(content.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SemanticAnswerCache:
+    """Index FAISS kecil (inner product atas vektor ternormalisasi = cosine) berisi query yang sudah dijawab"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, maxsize: int = 512,
+                 ttl: Optional[float] = 24 * 3600.0, neighbors: int = 4):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.neighbors = neighbors
+        self.index_version = None
+        self._index = None
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _check_version(self, index_version):
+        # Index FAQ dibangun ulang -> semua jawaban lama tidak berlaku
+        if index_version != self.index_version:
+            self._clear()
+            self.index_version = index_version
+
+    def _clear(self):
+        self._index = None
+        self._entries.clear()
+
+    def _remove(self, entry_id: int):
+        self._entries.pop(entry_id, None)
+        if self._index is not None:
+            self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    def lookup(self, vector, docs_key: str, index_version=None) -> Optional[str]:
+        """Jawaban tersimpan untuk query mirip (cosine >= threshold) dengan dokumen yang sama"""
+        query = self._normalize(vector)
+        with self._lock:
+            self._check_version(index_version)
+            if self._index is None or self._index.ntotal == 0:
+                self.misses += 1
+                return None
+
+            scores, ids = self._index.search(query, min(self.neighbors, self._index.ntotal))
+            now = time.time()
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id < 0 or score < self.threshold:
+                    continue
+                entry = self._entries.get(int(entry_id))
+                if entry is None:
+                    continue
+                if self.ttl is not None and now - entry["ts"] > self.ttl:
+                    self._remove(int(entry_id))
+                    continue
+                if entry["docs_key"] != docs_key:
+                    continue
+                self._entries.move_to_end(int(entry_id))
+                self.hits += 1
+                return entry["answer"]
+
+            self.misses += 1
+            return None
+
+    def store(self, query: str, vector, docs_key: str, answer: str, index_version=None):
+        if not answer or not answer.strip():
+            return
+        normalized = self._normalize(vector)
+        with self._lock:
+            self._check_version(index_version)
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(normalized.shape[1]))
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(normalized, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {"query": query, "answer": answer, "docs_key": docs_key, "ts": time.time()}
+
+            # LRU: buang entri yang paling lama tidak dipakai
+            while len(self._entries) > self.maxsize:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticAnswerCache:
+    """Cache jawaban dipakai bersama semua sesi dalam satu proses"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                threshold = float(os.getenv("KINDORA_SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+                _shared_cache = SemanticAnswerCache(threshold=threshold)
+    return _shared_cache
@@ -0,0 +1,90 @@
+# shard_registry.py
+# Registry korpus/index bernama untuk retrieval multi-shard (FAQ, pedoman berbahasa Indonesia, sumber
+# krisis, handout klinik, ...). Tiap shard adalah folder index hasil create_index.py yang di-build,
+# diberi versi, dan di-reload sendiri-sendiri. Format JSON (path relatif terhadap file registry):
+#
+#   {"shards": [
+#     {"name": "faq", "path": "faiss_index", "budget_ms": 300},
+#     {"name": "pedoman", "path": "shards/pedoman", "weight": 0.9},
+#     {"name": "krisis", "path": "shards/krisis", "routes": ["bunuh diri", "krisis", "suicide"], "weight": 1.2}
+#   ]}
+#
+# Shard tanpa "routes" selalu dicari; shard dengan "routes" hanya kalau query memuat salah satu kata kunci.
+# Skor tiap hasil = kosinus query-dokumen (model embedding sama untuk semua shard), lalu dikalibrasi per
+# shard: (kosinus - floor) / (1 - floor) * weight. "floor" (default 0) untuk korpus yang kosinusnya
+# cenderung tinggi ke query apa pun; "weight" untuk menaikkan/menurunkan prioritas korpus.
+
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from embedding_cache import normalize_query
+
+DEFAULT_BUDGET_MS = 500.0
+# Konstanta reciprocal rank fusion untuk merge berbasis peringkat (lihat bm25_index.reciprocal_rank_fusion)
+RRF_K = 60
+
+
+class ShardSpec(NamedTuple):
+    name: str
+    path: str
+    budget_ms: float = DEFAULT_BUDGET_MS
+    weight: float = 1.0
+    routes: Tuple[str, ...] = ()
+    floor: float = 0.0
+
+
+def load_registry(path: str) -> List[ShardSpec]:
+    """Baca registry JSON; nama shard harus unik"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    default_budget = float(os.getenv("KINDORA_SHARD_BUDGET_MS", str(DEFAULT_BUDGET_MS)))
+    specs, seen = [], set()
+    for entry in data.get("shards", []):
+        name = entry["name"]
+        if name in seen:
+            raise ValueError(f"❌ Nama shard duplikat di registry: {name}")
+        seen.add(name)
+        specs.append(ShardSpec(
+            name=name,
+            path=os.path.join(base, entry["path"]),
+            budget_ms=float(entry.get("budget_ms", default_budget)),
+            weight=float(entry.get("weight", 1.0)),
+            routes=tuple(normalize_query(route) for route in entry.get("routes", ())),
+            floor=float(entry.get("floor", 0.0)),
+        ))
+    if not specs:
+        raise ValueError(f"❌ Registry shard kosong: {path}")
+    return specs
+
+
+def select_shards(specs: Sequence, query: Optional[str], names: Optional[Sequence[str]] = None) -> List:
+    """Shard yang dicari untuk query: nama eksplisit, atau semua shard umum + shard yang rutenya cocok"""
+    if names is not None:
+        wanted = set(names)
+        return [spec for spec in specs if spec.name in wanted]
+    text = normalize_query(query) if query else ""
+    return [spec for spec in specs if not spec.routes or any(route in text for route in spec.routes)]
+
+
+def calibrate(similarities, floor: float = 0.0, weight: float = 1.0):
+    """Kosinus -> skor lintas shard: dikurangi baseline kemiripan korpus (floor), diskalakan ulang, dikali bobot"""
+    return [weight * (similarity - floor) / max(1.0 - floor, 1e-6) for similarity in similarities]
+
+
+def merge_scored(results: Sequence[Tuple[str, Sequence[Tuple[object, float]]]],
+                 k: int) -> List[Tuple[str, object, float]]:
+    """Top-k global dari (nama_shard, [(item, skor_terkalibrasi)]) terurut skor tertinggi"""
+    merged = [(name, item, score) for name, hits in results for item, score in hits]
+    merged.sort(key=lambda hit: hit[2], reverse=True)
+    return merged[:k]
+
+
+def merge_ranked(results: Sequence[Tuple[str, Sequence[object]]], weights: Dict[str, float],
+                 k: int) -> List[Tuple[str, object, float]]:
+    """Top-k global berbasis peringkat (weighted RRF) saat skor antar shard tidak sebanding, mis. BM25"""
+    merged = [(name, item, weights.get(name, 1.0) / (RRF_K + rank + 1))
+              for name, items in results for rank, item in enumerate(items)]
+    merged.sort(key=lambda hit: hit[2], reverse=True)
+    return merged[:k]
@@ -0,0 +1,132 @@
+# startup.py
+# Cold start: dependensi berat (Cohere, Gemini, FAISS, parser PDF, penerjemah) tidak di-import di
+# level modul main.py, melainkan dipanaskan di thread latar selama layar sambutan dirender, bersama
+# index FAISS + docstore. Waktu import per modul, render pertama, dan jawaban pertama dicatat dan
+# dibandingkan dengan budget cold start (KINDORA_COLD_START_BUDGET_MS).
+
+import importlib
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from tracing import get_tracer
+
+DEFAULT_BUDGET_MS = 2500.0
+# Modul yang hanya dipakai setelah user mulai chat (atau di jalur jarang: PDF, terjemahan, web)
+WARM_MODULES = (
+    "langchain_google_genai",
+    "callback_handler",
+    "retriever",
+    "semantic_cache",
+    "context_packer",
+    "search_service",
+    "document_index",
+    "mental_health_processor",
+    "tools.translate_tools",
+)
+
+
+class StartupTimer:
+    """Catatan waktu startup satu proses; tiap fase dicatat sekali (yang pertama)"""
+
+    def __init__(self, budget_ms: float = DEFAULT_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases: Dict[str, float] = {}
+        self.imports: Dict[str, float] = {}
+        self.warm_error: Optional[str] = None
+        self._warm_thread: Optional[threading.Thread] = None
+
+    def mark(self, phase: str) -> bool:
+        """Catat detik sejak origin untuk fase ini; False kalau fase sudah pernah dicatat"""
+        elapsed = time.perf_counter() - self.origin
+        with self._lock:
+            if phase in self.phases:
+                return False
+            self.phases[phase] = elapsed
+        if phase == "first_render" and elapsed * 1000 > self.budget_ms:
+            print(f"⚠️ Cold start {elapsed * 1000:.0f}ms melebihi budget {self.budget_ms:.0f}ms")
+        if phase == "first_answer":
+            print(f"⏱️ Startup: {self.report()}")
+        return True
+
+    def timed_import(self, name: str):
+        """Import modul sambil mencatat durasinya (hanya kalau belum pernah di-import)"""
+        loaded = name in sys.modules
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        if not loaded:
+            with self._lock:
+                self.imports.setdefault(name, time.perf_counter() - start)
+        return module
+
+    def _warm(self, index_path: Optional[str]):
+        for name in WARM_MODULES:
+            try:
+                self.timed_import(name)
+            except Exception as e:
+                print(f"⚠️ Gagal memanaskan modul {name}: {str(e)}")
+        if index_path:
+            try:
+                # Retriever bersama: index mmap + docstore + BM25 siap sebelum pertanyaan pertama
+                self.timed_import("retriever").get_shared_retriever(index_path)
+            except Exception as e:
+                self.warm_error = str(e)
+                print(f"⚠️ Gagal memanaskan index: {str(e)}")
+        self.mark("warm")
+
+    def start_warmup(self, index_path: Optional[str] = None) -> threading.Thread:
+        """Mulai thread pemanasan sekali per proses"""
+        with self._lock:
+            if self._warm_thread is None:
+                self._warm_thread = threading.Thread(target=self._warm, args=(index_path,),
+                                                     name="startup-warm", daemon=True)
+                self._warm_thread.start()
+            return self._warm_thread
+
+    def wait_warm(self, timeout: Optional[float] = None) -> bool:
+        thread = self._warm_thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def report(self) -> Dict:
+        with self._lock:
+            phases = {phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()}
+            imports = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "phases_ms": phases,
+            "imports_ms": {name: round(seconds * 1000, 1) for name, seconds in imports},
+            "budget_ms": self.budget_ms,
+            "within_budget": phases.get("first_render", 0.0) <= self.budget_ms,
+        }
+
+    def prometheus_lines(self) -> List[str]:
+        with self._lock:
+            phases, imports = dict(self.phases), dict(self.imports)
+        lines = ["# TYPE kindora_startup_seconds gauge"]
+        lines += [f'kindora_startup_seconds{{phase="{phase}"}} {seconds:.6f}' for phase, seconds in phases.items()]
+        lines.append("# TYPE kindora_import_seconds gauge")
+        lines += [f'kindora_import_seconds{{module="{name}"}} {seconds:.6f}' for name, seconds in imports.items()]
+        lines += ["# TYPE kindora_cold_start_budget_seconds gauge",
+                  f"kindora_cold_start_budget_seconds {self.budget_ms / 1000:.3f}"]
+        return lines
+
+
+_shared_timer: Optional[StartupTimer] = None
+_shared_lock = threading.Lock()
+
+
+def get_startup_timer() -> StartupTimer:
+    """Timer startup proses; origin = saat modul ini pertama di-import (awal import main.py)"""
+    global _shared_timer
+    if _shared_timer is None:
+        with _shared_lock:
+            if _shared_timer is None:
+                _shared_timer = StartupTimer(float(os.getenv("KINDORA_COLD_START_BUDGET_MS", str(DEFAULT_BUDGET_MS))))
+                get_tracer().register_metrics(_shared_timer.prometheus_lines)
+    return _shared_timer
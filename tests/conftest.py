@@ -0,0 +1,9 @@
+# tests/conftest.py
+# Modul aplikasi ada di root repo (bukan paket); tambahkan ke sys.path supaya test bisa import langsung.
+#
+#   python -m pytest -q
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
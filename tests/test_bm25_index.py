@@ -0,0 +1,35 @@
+# tests/test_bm25_index.py
+from bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+TEXTS = [
+    "Kriteria depresi mayor menurut DSM-5 meliputi suasana hati sedih.",
+    "Insomnia adalah kesulitan tidur yang berlangsung lama.",
+    "Teknik relaksasi napas membantu mengurangi kecemasan dan stres.",
+]
+
+
+def test_tokenize_keeps_hyphenated_terms_and_parts():
+    assert tokenize("Kriteria DSM-5!") == ["kriteria", "dsm-5", "dsm", "5"]
+    assert tokenize(None) == []
+
+
+def test_search_ranks_exact_term_first():
+    index = BM25Index.build(["d0", "d1", "d2"], TEXTS)
+    hits = index.search("apa itu DSM-5", k=3)
+    assert hits[0][0] == "d0"
+    assert index.search("insomnia tidur", k=1)[0][0] == "d1"
+    assert index.search("skizofrenia") == []
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    index = BM25Index.build(["d0", "d1", "d2"], TEXTS)
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.search("kecemasan stres", k=3) == index.search("kecemasan stres", k=3)
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "a", "d"]], k=60)
+    assert {doc_id for doc_id, _ in fused[:2]} == {"a", "b"}
+    assert fused[0][1] == 1 / 61 + 1 / 62
+    assert {doc_id for doc_id, _ in fused[2:]} == {"c", "d"}
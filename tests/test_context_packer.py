@@ -0,0 +1,63 @@
+# tests/test_context_packer.py
+import numpy as np
+from langchain_core.documents import Document
+
+from context_packer import pack_context, strip_overlap
+from token_utils import count_tokens
+
+SLEEP = ("Insomnia kronis biasanya ditangani dengan terapi perilaku kognitif, jadwal tidur yang teratur, "
+         "dan membatasi kafein pada sore hari.")
+ANXIETY = ("Latihan pernapasan perlahan selama beberapa menit dapat menurunkan gejala kecemasan dan "
+           "membantu tubuh kembali tenang.")
+CRISIS = ("Jika muncul pikiran untuk menyakiti diri sendiri, segera hubungi layanan darurat atau orang "
+          "terdekat yang dapat dipercaya.")
+
+
+def test_strip_overlap_removes_shared_boundary():
+    left = "Kalimat pembuka yang cukup panjang. Bagian ini juga muncul di awal chunk berikutnya."
+    right = "Bagian ini juga muncul di awal chunk berikutnya. Lalu kalimat baru."
+    assert strip_overlap(right, [left]) == "Lalu kalimat baru."
+    assert strip_overlap(right, []) == right
+
+
+def test_near_duplicates_are_dropped_with_vectors():
+    docs = [Document(page_content=text) for text in (SLEEP, SLEEP + " ", ANXIETY)]
+    vectors = np.array([[1.0, 0.0], [0.999, 0.01], [0.0, 1.0]], dtype=np.float32)
+    packed = pack_context(docs, vectors, token_budget=500)
+    assert [doc.page_content for doc in packed.documents] == [SLEEP, ANXIETY]
+    assert packed.duplicates == 1 and packed.candidates == 3
+
+
+def test_near_duplicates_are_dropped_without_vectors():
+    docs = [Document(page_content=text) for text in (SLEEP, SLEEP.upper(), CRISIS)]
+    packed = pack_context(docs, token_budget=500)
+    assert [doc.page_content for doc in packed.documents] == [SLEEP, CRISIS]
+
+
+def test_budget_is_respected_and_shorter_candidates_fill_it():
+    long_text = " ".join([ANXIETY] * 20)
+    docs = [Document(page_content=text) for text in (SLEEP, long_text, CRISIS)]
+    budget = count_tokens(SLEEP) + count_tokens(CRISIS) + 5
+    packed = pack_context(docs, token_budget=budget, max_chunk_tokens=budget)
+    assert packed.tokens <= budget
+    assert [doc.page_content for doc in packed.documents] == [SLEEP, CRISIS]
+
+
+def test_packed_text_with_separators_fits_budget():
+    texts = (SLEEP, ANXIETY, CRISIS)
+    docs = [Document(page_content=text) for text in texts]
+    # Tepat jumlah token tiap potongan: separator di antaranya tidak lagi muat
+    budget = sum(count_tokens(text) for text in texts)
+    packed = pack_context(docs, token_budget=budget, max_chunk_tokens=budget)
+    assert len(packed.documents) > 1
+    assert count_tokens(packed.text) <= budget
+    assert packed.tokens == count_tokens(packed.text)
+
+
+def test_long_chunk_is_truncated_to_max_chunk_tokens():
+    packed = pack_context([Document(page_content=" ".join([ANXIETY] * 30))], token_budget=400, max_chunk_tokens=50)
+    assert 0 < packed.tokens <= 50
+
+
+def test_empty_candidates():
+    assert pack_context([]).text == ""
@@ -0,0 +1,47 @@
+# tests/test_conversation_memory.py
+import time
+
+from conversation_memory import ConversationMemory
+
+
+def _wait_summarized(memory: ConversationMemory, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        stats = memory.stats()
+        if stats["pending_turns"] == stats["window_turns"]:
+            return stats
+        time.sleep(0.005)
+    raise AssertionError("ringkasan tidak selesai")
+
+
+def test_greeting_alone_is_not_context():
+    memory = ConversationMemory()
+    memory.add("assistant", "Halo! Cerita apa hari ini?")
+    assert memory.context() == ""
+    memory.add("user", "Aku susah tidur")
+    assert "Aku susah tidur" in memory.context()
+    memory.clear()
+    memory.add("assistant", "Riwayat dihapus. Yuk mulai lagi.")
+    assert memory.context() == ""
+
+
+def test_summarized_turns_are_dropped():
+    memory = ConversationMemory(window_tokens=40, summary_tokens=50, display_turns=30,
+                                summarizer=lambda summary, turns: f"{summary} +{len(turns)}".strip())
+    for i in range(200):
+        memory.add("user" if i % 2 == 0 else "assistant", f"giliran ke-{i} " + "kata " * 10)
+        if i % 20 == 0:
+            _wait_summarized(memory)
+    stats = _wait_summarized(memory)
+
+    # Yang tersisa hanya window; sisanya sudah dilipat ke ringkasan
+    assert stats["pending_turns"] == stats["window_turns"] <= 5
+    assert stats["summarized_turns"] + stats["pending_turns"] == 200
+    assert stats["window_tokens"] <= 40
+    assert "giliran ke-199" in memory.context()
+    assert memory.summary
+
+    # Log tampilan dibatasi display_turns
+    assert len(memory) == 30
+    assert memory.last(1)[0].content.startswith("giliran ke-199")
+    assert [turn.content for turn in memory.page(2, 10)][0].startswith("giliran ke-170")
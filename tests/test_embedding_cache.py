@@ -0,0 +1,103 @@
+# tests/test_embedding_cache.py
+import json
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from embedding_cache import DiskEmbeddingStore, QueryEmbeddingCache, make_cache_key
+
+
+def _vector(i: int, dim: int = 8) -> np.ndarray:
+    return np.arange(dim, dtype=np.float32) + i * 100
+
+
+def _fill(path: str, start: int, end: int):
+    store = DiskEmbeddingStore(path)
+    for i in range(start, end):
+        store.put(f"k{i}", _vector(i))
+
+
+def _read_keys(path: str):
+    meta = json.load(open(os.path.join(path, "meta.json"), encoding="utf-8"))
+    with open(os.path.join(path, f"keys-{meta['generation']}.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_disk_store_maps_each_key_to_its_own_row(tmp_path):
+    store = DiskEmbeddingStore(str(tmp_path))
+    for i in range(20):
+        store.put(f"k{i}", _vector(i))
+    # Key yang sudah ada tidak menambah baris
+    store.put("k3", _vector(999))
+
+    reopened = DiskEmbeddingStore(str(tmp_path))
+    assert len(reopened) == 20
+    for i in range(20):
+        np.testing.assert_array_equal(reopened.get(f"k{i}"), _vector(i))
+    rows = [item["row"] for item in _read_keys(str(tmp_path))]
+    assert sorted(rows) == list(range(20))
+
+
+def test_disk_store_sees_keys_written_by_another_instance(tmp_path):
+    first = DiskEmbeddingStore(str(tmp_path))
+    second = DiskEmbeddingStore(str(tmp_path))
+    first.put("a", _vector(1))
+    second.put("b", _vector(2))
+
+    np.testing.assert_array_equal(first.get("b"), _vector(2))
+    np.testing.assert_array_equal(second.get("a"), _vector(1))
+    assert [item["row"] for item in _read_keys(str(tmp_path))] == [0, 1]
+
+
+def test_disk_store_rows_do_not_collide_across_processes(tmp_path):
+    path = str(tmp_path)
+    ctx = multiprocessing.get_context("spawn")
+    # Rentang key tumpang tindih: tiap key tetap hanya punya satu baris
+    workers = [ctx.Process(target=_fill, args=(path, start, start + 60)) for start in (0, 30, 60)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    store = DiskEmbeddingStore(path)
+    assert len(store) == 120
+    items = _read_keys(path)
+    assert len(items) == 120
+    assert len({item["row"] for item in items}) == 120
+    for i in range(120):
+        np.testing.assert_array_equal(store.get(f"k{i}"), _vector(i))
+
+
+def test_disk_store_compacts_to_max_entries(tmp_path):
+    store = DiskEmbeddingStore(str(tmp_path), max_entries=10)
+    for i in range(25):
+        store.put(f"k{i}", _vector(i))
+    assert len(store) <= 10
+    # Entri terbaru tetap ada dan barisnya tetap benar setelah generasi baru ditulis
+    np.testing.assert_array_equal(store.get("k24"), _vector(24))
+    assert "k0" not in store
+
+
+def test_disk_store_rejects_dimension_change(tmp_path):
+    store = DiskEmbeddingStore(str(tmp_path))
+    store.put("a", _vector(1, dim=8))
+    with pytest.raises(ValueError):
+        store.put("b", _vector(2, dim=4))
+
+
+def test_query_cache_memory_then_disk(tmp_path):
+    key = make_cache_key("Apa itu depresi?", "model")
+    assert key == make_cache_key("  apa itu   DEPRESI? ", "model")
+
+    cache = QueryEmbeddingCache(str(tmp_path), maxsize=2)
+    assert cache.get(key) is None
+    cache.put(key, _vector(1))
+    np.testing.assert_array_equal(cache.get(key), _vector(1))
+
+    fresh = QueryEmbeddingCache(str(tmp_path), maxsize=2)
+    np.testing.assert_array_equal(fresh.get(key), _vector(1))
+    stats = fresh.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (0, 1, 0)
@@ -0,0 +1,85 @@
+# tests/test_embedding_coalescer.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from embedding_cache import CachedEmbeddings, QueryEmbeddingCache
+from embedding_coalescer import EmbeddingCoalescer
+
+
+class RecordingEmbedder:
+    def __init__(self, release: threading.Event = None, fail: bool = False):
+        self.batches = []
+        self.release = release
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        if self.release is not None:
+            self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("cohere down")
+        return [[float(len(text)), float(sum(map(ord, text)))] for text in texts]
+
+
+def test_concurrent_queries_share_one_batch():
+    embedder = RecordingEmbedder()
+    coalescer = EmbeddingCoalescer(embedder, window_ms=50, max_batch=32)
+    texts = [f"pertanyaan {i}" for i in range(10)]
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        vectors = list(pool.map(lambda text: coalescer.embed(text, timeout=5), texts))
+    assert vectors == [[float(len(text)), float(sum(map(ord, text)))] for text in texts]
+    assert len(embedder.batches) < 10
+    assert sorted(text for batch in embedder.batches for text in batch) == sorted(texts)
+
+
+def test_identical_in_flight_texts_are_sent_once():
+    release = threading.Event()
+    embedder = RecordingEmbedder(release=release)
+    coalescer = EmbeddingCoalescer(embedder, window_ms=1)
+    calls = []
+    futures = [coalescer.submit("apa itu depresi?", on_result=calls.append) for _ in range(5)]
+    assert len({id(future) for future in futures}) == 1
+    release.set()
+    assert futures[0].result(5) == futures[-1].result(5)
+
+    stats = coalescer.stats()
+    assert (stats["requests"], stats["deduplicated"], stats["texts"]) == (5, 4, 1)
+    # on_result (mis. mengisi cache) hanya dipanggil sekali per key
+    assert len(calls) == 1
+    # Setelah selesai, key yang sama dikirim ulang (bukan future lama)
+    assert coalescer.submit("apa itu depresi?") is not futures[0]
+
+
+def test_batch_error_reaches_every_waiter_and_is_not_cached(tmp_path):
+    coalescer = EmbeddingCoalescer(RecordingEmbedder(fail=True), window_ms=20)
+    cache = QueryEmbeddingCache(str(tmp_path))
+    embeddings = CachedEmbeddings(base=None, cache=cache, model_name="m", coalescer=coalescer)
+    futures = [embeddings.submit_query(text) for text in ("a", "b", "a")]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="cohere down"):
+            future.result(5)
+    assert coalescer.stats()["errors"] >= 1
+    assert embeddings.cached_query("a") is None
+
+
+def test_wrong_vector_count_fails_the_batch():
+    coalescer = EmbeddingCoalescer(lambda texts: [[0.0]], window_ms=20)
+    futures = [coalescer.submit(text) for text in ("a", "b")]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(5)
+
+
+def test_cached_embeddings_fill_cache_through_coalescer(tmp_path):
+    embedder = RecordingEmbedder()
+    embeddings = CachedEmbeddings(base=None, cache=QueryEmbeddingCache(str(tmp_path)), model_name="m",
+                                  coalescer=EmbeddingCoalescer(embedder, window_ms=1))
+    first = embeddings.embed_query("halo")
+    assert embeddings.embed_query("halo") == first
+    assert len(embedder.batches) == 1
+    np.testing.assert_array_equal(embeddings.cached_query("halo"), first)
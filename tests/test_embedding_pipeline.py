@@ -0,0 +1,66 @@
+# tests/test_embedding_pipeline.py
+import threading
+import time
+
+import pytest
+
+from embedding_pipeline import COHERE_MAX_BATCH, embed_batches, iter_batches
+from rate_limiter import TokenBucket
+
+
+def test_token_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=50, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    start = time.monotonic()
+    assert bucket.acquire()
+    # Satu token baru butuh 1/50 detik
+    assert 0.01 <= time.monotonic() - start < 0.5
+    assert bucket.waited_seconds > 0
+
+
+def test_token_bucket_timeout_and_limits():
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0.01) is False
+    with pytest.raises(ValueError):
+        bucket.acquire(tokens=2)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_iter_batches_sizes():
+    assert [len(batch) for batch in iter_batches(range(10), 4)] == [4, 4, 2]
+    with pytest.raises(ValueError):
+        next(iter_batches(range(10), COHERE_MAX_BATCH + 1))
+
+
+def test_embed_batches_keeps_vectors_with_their_batch_and_retries():
+    failures = {"left": 2}
+    lock = threading.Lock()
+
+    def embed(texts):
+        with lock:
+            if failures["left"]:
+                failures["left"] -= 1
+                raise RuntimeError("429")
+        return [[float(text)] for text in texts]
+
+    batches = list(iter_batches([str(i) for i in range(50)], 7))
+    results = list(embed_batches(batches, embed, max_workers=3, base_delay=0.001))
+    assert len(results) == len(batches)
+    for batch, vectors in results:
+        assert vectors == [[float(text)] for text in batch]
+
+
+def test_embed_batches_raises_after_max_retries():
+    def embed(texts):
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        list(embed_batches([["a"]], embed, max_retries=1, base_delay=0.001))
+
+
+def test_embed_batches_rejects_wrong_vector_count():
+    with pytest.raises(RuntimeError):
+        list(embed_batches([["a", "b"]], lambda texts: [[0.0]], max_retries=0))
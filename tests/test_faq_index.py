@@ -0,0 +1,81 @@
+# tests/test_faq_index.py
+import os
+
+import numpy as np
+import pandas as pd
+
+from bm25_index import BM25_FILE, BM25Index
+from create_index import CSV_PATH, INDEX_DIR
+from doc_store import MmapDocstore
+from faq_index import FaqIndex, normalize_question
+from index_pointer import resolve_index_dir
+
+ROW_IDS = ["1", "2", "3"]
+QUESTIONS = ["Apa itu depresi?", "Bagaimana cara mengatasi kecemasan?", "Apa itu insomnia?"]
+ANSWERS = ["Jawaban depresi", "Jawaban kecemasan", "Jawaban insomnia"]
+VECTORS = np.eye(3, dtype=np.float32)
+
+
+def _embed_rows(texts):
+    return [VECTORS[QUESTIONS.index(text)] for text in texts]
+
+
+def test_normalize_question_ignores_case_spacing_and_punctuation():
+    assert normalize_question("  APA itu   depresi ?? ") == normalize_question("Apa itu depresi")
+
+
+def test_exact_then_fuzzy_then_vector():
+    faq = FaqIndex.build(ROW_IDS, QUESTIONS, ANSWERS, embed=_embed_rows)
+
+    exact = faq.match("apa itu DEPRESI")
+    assert (exact.row_id, exact.method, exact.score) == ("1", "exact", 1.0)
+
+    fuzzy = faq.match("Bagaimana cara mengatasi kecemsan")
+    assert (fuzzy.row_id, fuzzy.method) == ("2", "fuzzy")
+    assert fuzzy.score >= 0.85
+
+    vector = faq.match("susah tidur terus", vector=[0.05, 0.0, 1.0])
+    assert (vector.row_id, vector.method) == ("3", "vector")
+
+
+def test_unrelated_query_does_not_match():
+    faq = FaqIndex.build(ROW_IDS, QUESTIONS, ANSWERS, embed=_embed_rows)
+    assert faq.match("resep nasi goreng", vector=[0.6, 0.6, 0.5]) is None
+    assert faq.match("") is None
+
+
+def test_rebuild_reuses_vectors_of_unchanged_questions():
+    previous = FaqIndex.build(ROW_IDS, QUESTIONS, ANSWERS, embed=_embed_rows)
+    embedded = []
+
+    def embed(texts):
+        embedded.extend(texts)
+        return [[1.0, 1.0, 0.0] for _ in texts]
+
+    FaqIndex.build(ROW_IDS + ["4"], QUESTIONS + ["Apa itu stres?"], ANSWERS + ["Jawaban stres"],
+                   embed=embed, previous=previous)
+    assert embedded == ["Apa itu stres?"]
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    faq = FaqIndex.build(ROW_IDS, QUESTIONS, ANSWERS, embed=_embed_rows)
+    faq.save(str(tmp_path))
+    assert FaqIndex.exists(str(tmp_path))
+    loaded = FaqIndex.load(str(tmp_path))
+    assert len(loaded) == 3
+    assert loaded.match(vector=[0.0, 1.0, 0.0]).row_id == "2"
+    assert loaded.match("apa itu insomnia").answer == "Jawaban insomnia"
+
+
+def test_bundled_index_ships_faq_and_bm25_sidecars():
+    index_dir = resolve_index_dir(INDEX_DIR)
+    assert FaqIndex.exists(index_dir)
+    assert os.path.exists(os.path.join(index_dir, BM25_FILE))
+
+    questions = pd.read_csv(CSV_PATH).fillna("")["Questions"].astype(str).tolist()
+    faq = FaqIndex.load(index_dir)
+    assert len(faq) == len(questions)
+    assert faq.match(questions[0]).method == "exact"
+
+    bm25 = BM25Index.load(index_dir)
+    assert sorted(bm25.doc_ids) == sorted(MmapDocstore(index_dir).positions)
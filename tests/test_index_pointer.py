@@ -0,0 +1,34 @@
+# tests/test_index_pointer.py
+import os
+
+from index_pointer import current_version, new_version_dir, publish_version, resolve_index_dir
+
+
+def _write(path, name, text):
+    with open(os.path.join(path, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_legacy_files_survive_publish_and_current_wins(tmp_path):
+    index_dir = str(tmp_path / "faiss_index")
+    os.makedirs(index_dir)
+    for name in ("index.faiss", "index.pkl", "docstore_text.bin"):
+        _write(index_dir, name, "lama")
+    assert resolve_index_dir(index_dir) == index_dir
+
+    versions = []
+    for i in range(3):
+        version_dir = new_version_dir(index_dir)
+        _write(version_dir, "index.faiss", f"baru-{i}")
+        publish_version(index_dir, version_dir)
+        versions.append(os.path.basename(version_dir))
+
+    assert current_version(index_dir) == versions[-1]
+    assert resolve_index_dir(index_dir) == os.path.join(index_dir, versions[-1])
+    # File format lama (dilacak git di index bawaan) tidak pernah dihapus
+    for name in ("index.faiss", "index.pkl", "docstore_text.bin"):
+        with open(os.path.join(index_dir, name), encoding="utf-8") as f:
+            assert f.read() == "lama"
+    # Hanya versi aktif dan satu versi sebelumnya yang disimpan
+    remaining = sorted(entry for entry in os.listdir(index_dir) if os.path.isdir(os.path.join(index_dir, entry)))
+    assert remaining == sorted(versions[-2:])
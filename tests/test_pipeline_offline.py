@@ -0,0 +1,103 @@
+# tests/test_pipeline_offline.py
+# Pipeline end-to-end dengan backend palsu dari benchmarks/fakes.py (tanpa API key dan jaringan).
+import pandas as pd
+import pytest
+
+import main as chat_app
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, TimingCallbackHandler
+from conversation_memory import ConversationMemory
+from create_index import CSV_PATH, create_faiss_index
+from retriever import FaissRetriever
+from semantic_cache import get_semantic_cache
+
+
+@pytest.fixture(scope="module")
+def index_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("index") / "faiss_index")
+    build = create_faiss_index(incremental=False, csv_path=CSV_PATH, index_dir=path,
+                               embeddings=FakeEmbeddings(latency=0.0), requests_per_second=1000.0)
+    assert build["chunks"] > 0
+    return path
+
+
+@pytest.fixture
+def retriever(index_dir, tmp_path):
+    retriever = FaissRetriever(index_path=index_dir, cache_dir=str(tmp_path / "cache"),
+                               embeddings=FakeEmbeddings(latency=0.0), reload_interval=0)
+    # Jalur cepat FAQ dimatikan supaya yang diuji jalur retrieval + LLM
+    retriever.faq_enabled = False
+    return retriever
+
+
+def test_incremental_rebuild_embeds_nothing(index_dir):
+    embeddings = FakeEmbeddings(latency=0.0)
+    create_faiss_index(incremental=True, csv_path=CSV_PATH, index_dir=index_dir,
+                       embeddings=embeddings, requests_per_second=1000.0)
+    assert embeddings.texts_embedded == 0
+
+
+def test_faq_question_retrieves_its_row(retriever):
+    rows = pd.read_csv(CSV_PATH).fillna("").drop_duplicates("Questions").head(10)
+    found = sum(
+        str(row["Question_ID"]) in [doc.metadata.get("row_id") for doc in retriever.search(row["Questions"], k=3)]
+        for _, row in rows.iterrows()
+    )
+    assert found >= 8
+
+
+def _ask(retriever, question, history=None):
+    handler = TimingCallbackHandler()
+    answer = chat_app.run_agent(question, retriever, callback_handler=handler,
+                                llm=FakeChatModel(first_token_latency=0.0, token_latency=0.0, answer_tokens=10),
+                                history=history)
+    return answer, handler.generation_seconds is not None
+
+
+def test_repeated_question_is_served_from_answer_cache(retriever):
+    get_semantic_cache().invalidate()
+    question = pd.read_csv(CSV_PATH)["Questions"].iloc[0]
+    first, first_generated = _ask(retriever, question)
+    second, second_generated = _ask(retriever, question)
+    assert first and first == second
+    assert first_generated and not second_generated
+
+
+def test_search_fallback_notice_goes_through_handler(retriever, monkeypatch):
+    monkeypatch.setattr(retriever, "search_with_vectors", lambda *args, **kwargs: ([], None))
+    monkeypatch.setattr(chat_app, "get_google_search_results", lambda query: f"hasil web untuk {query}")
+    monkeypatch.setattr(chat_app.st, "info", lambda *args, **kwargs: pytest.fail("st.info dipanggil dari pipeline"))
+
+    class NoticeHandler(TimingCallbackHandler):
+        def __init__(self):
+            super().__init__()
+            self.notices = []
+
+        def on_notice(self, message):
+            self.notices.append(message)
+
+    handler = NoticeHandler()
+    answer = chat_app.run_agent("pertanyaan di luar database", retriever, callback_handler=handler,
+                                llm=FakeChatModel(first_token_latency=0.0, token_latency=0.0, answer_tokens=10))
+    assert answer == "hasil web untuk pertanyaan di luar database"
+    assert len(handler.notices) == 1 and not handler.streamed
+
+
+def test_fresh_session_with_greeting_uses_answer_cache(retriever):
+    get_semantic_cache().invalidate()
+    question = pd.read_csv(CSV_PATH)["Questions"].iloc[2]
+    sessions = []
+    for _ in range(2):
+        # Sama seperti sesi baru di main.py: memori hanya berisi sapaan asisten
+        memory = ConversationMemory()
+        memory.add("assistant", "Halo! Cerita apa hari ini?")
+        sessions.append(_ask(retriever, question, history=memory.context()))
+    assert sessions[0][0] == sessions[1][0]
+    assert sessions[0][1] and not sessions[1][1]
+
+
+def test_answers_with_history_bypass_answer_cache(retriever):
+    get_semantic_cache().invalidate()
+    question = pd.read_csv(CSV_PATH)["Questions"].iloc[1]
+    _, first_generated = _ask(retriever, question, history="user: nama saya Sari")
+    _, second_generated = _ask(retriever, question, history="user: nama saya Budi")
+    assert first_generated and second_generated
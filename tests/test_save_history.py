@@ -0,0 +1,63 @@
+# tests/test_save_history.py
+import time
+
+import pytest
+
+from tools.save_history import CLIENT_PREFIX, ChatHistoryStore, client_key, new_resume_code
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite"), flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def test_last_turns_are_per_client_and_chronological(store):
+    alice, bob = client_key(new_resume_code()), client_key(new_resume_code())
+    for i in range(5):
+        store.append(alice, "s1", "user", f"a{i}", ts=100 + i)
+    store.append(bob, "s1", "user", "b0", ts=103.5)
+    assert store.flush()
+
+    turns = store.load_last_turns(alice, n=3)
+    assert [turn["content"] for turn in turns] == ["a2", "a3", "a4"]
+    assert [turn["content"] for turn in store.load_last_turns(bob)] == ["b0"]
+
+
+def test_typed_name_cannot_reach_client_history(store):
+    code = new_resume_code()
+    assert len(code) >= 16 and code != new_resume_code()
+    store.append(client_key(code), "s1", "user", "rahasia")
+    assert store.flush()
+    assert client_key(f"  {code} ") == CLIENT_PREFIX + code
+    assert store.load_last_turns("Sari") == []
+    assert store.load_last_turns(client_key(code))[0]["content"] == "rahasia"
+
+
+def test_save_messages_appends_only_new_messages(store):
+    messages = [{"role": "user", "content": "halo"}]
+    store.save_messages(messages, "u", "s")
+    messages.append({"role": "assistant", "content": "hai"})
+    store.save_messages(messages, "u", "s")
+    assert store.flush()
+    assert [turn["content"] for turn in store.load_last_turns("u")] == ["halo", "hai"]
+
+
+def test_compacted_sessions_still_load(store):
+    old = time.time() - 90 * 86400
+    for i in range(4):
+        store.append("u", "lama", "user", f"old{i}", ts=old + i)
+    store.append("u", "baru", "user", "new0")
+    assert store.compact(older_than_days=30) == 1
+
+    turns = store.load_last_turns("u", n=3)
+    assert [turn["content"] for turn in turns] == ["old2", "old3", "new0"]
+    assert [s["session"] for s in store.sessions("u")] == ["baru"]
+
+
+def test_append_after_close_fails(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / "history.sqlite"))
+    store.close()
+    with pytest.raises(RuntimeError):
+        store.append("u", "s", "user", "x")
@@ -0,0 +1,56 @@
+# tests/test_semantic_cache.py
+from types import SimpleNamespace
+
+import numpy as np
+
+from semantic_cache import SemanticAnswerCache, documents_key
+
+
+def _docs(*texts):
+    return [SimpleNamespace(page_content=text) for text in texts]
+
+
+def test_documents_key_ignores_order():
+    assert documents_key(_docs("a", "b")) == documents_key(_docs("b", "a"))
+    assert documents_key(_docs("a", "b")) != documents_key(_docs("a", "c"))
+
+
+def test_paraphrase_hits_only_with_same_documents():
+    cache = SemanticAnswerCache(threshold=0.9)
+    key = documents_key(_docs("insomnia"))
+    cache.store("susah tidur", [1.0, 0.0, 0.0], key, "Jawaban insomnia")
+
+    assert cache.lookup([0.99, 0.05, 0.0], key) == "Jawaban insomnia"
+    # Dokumen pendukung berbeda atau makna terlalu jauh -> miss
+    assert cache.lookup([0.99, 0.05, 0.0], documents_key(_docs("depresi"))) is None
+    assert cache.lookup([0.0, 1.0, 0.0], key) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_index_version_change_clears_entries():
+    cache = SemanticAnswerCache()
+    cache.store("q", [1.0, 0.0], "docs", "jawaban", index_version=1)
+    assert cache.lookup([1.0, 0.0], "docs", index_version=1) == "jawaban"
+    assert cache.lookup([1.0, 0.0], "docs", index_version=2) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction_and_ttl():
+    cache = SemanticAnswerCache(maxsize=2)
+    for i in range(3):
+        vector = np.zeros(3, dtype=np.float32)
+        vector[i] = 1.0
+        cache.store(f"q{i}", vector, "docs", f"a{i}")
+    assert cache.lookup([1.0, 0.0, 0.0], "docs") is None
+    assert cache.lookup([0.0, 0.0, 1.0], "docs") == "a2"
+
+    expired = SemanticAnswerCache(ttl=-1.0)
+    expired.store("q", [1.0, 0.0], "docs", "a")
+    assert expired.lookup([1.0, 0.0], "docs") is None
+    assert expired.stats()["size"] == 0
+
+
+def test_blank_answers_are_not_stored():
+    cache = SemanticAnswerCache()
+    cache.store("q", [1.0, 0.0], "docs", "   ")
+    assert cache.stats()["size"] == 0
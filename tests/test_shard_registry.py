@@ -0,0 +1,83 @@
+# tests/test_shard_registry.py
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings
+from create_index import CSV_PATH, create_faiss_index
+from retriever import FaissRetriever
+from shard_registry import RRF_K, calibrate, load_registry, merge_ranked, merge_scored, select_shards
+
+
+def _write_registry(tmp_path, shards):
+    path = tmp_path / "shards.json"
+    path.write_text(json.dumps({"shards": shards}), encoding="utf-8")
+    return str(path)
+
+
+def test_load_registry_resolves_paths_and_routes(tmp_path):
+    specs = load_registry(_write_registry(tmp_path, [
+        {"name": "faq", "path": "faiss_index", "budget_ms": 300},
+        {"name": "krisis", "path": "shards/krisis", "routes": ["Bunuh Diri"], "weight": 1.2},
+    ]))
+    assert [spec.name for spec in specs] == ["faq", "krisis"]
+    assert specs[0].path == str(tmp_path / "faiss_index") and specs[0].budget_ms == 300
+    assert specs[1].routes == ("bunuh diri",) and specs[1].weight == 1.2
+
+
+def test_load_registry_rejects_duplicates_and_empty(tmp_path):
+    with pytest.raises(ValueError):
+        load_registry(_write_registry(tmp_path, [{"name": "a", "path": "x"}, {"name": "a", "path": "y"}]))
+    with pytest.raises(ValueError):
+        load_registry(_write_registry(tmp_path, []))
+
+
+def test_select_shards_by_route_and_name(tmp_path):
+    specs = load_registry(_write_registry(tmp_path, [
+        {"name": "faq", "path": "a"},
+        {"name": "krisis", "path": "b", "routes": ["bunuh diri"]},
+    ]))
+    assert [s.name for s in select_shards(specs, "Apa itu depresi?")] == ["faq"]
+    assert [s.name for s in select_shards(specs, "Aku ingin BUNUH DIRI")] == ["faq", "krisis"]
+    assert [s.name for s in select_shards(specs, "apa saja", names=["krisis"])] == ["krisis"]
+
+
+def test_calibrate_applies_floor_and_weight():
+    assert calibrate([1.0, 0.5], floor=0.5, weight=2.0) == [2.0, 0.0]
+    assert calibrate([0.8]) == [0.8]
+
+
+def test_merge_scored_takes_global_top_k():
+    merged = merge_scored([("a", [("a1", 0.9), ("a2", 0.2)]), ("b", [("b1", 0.5), ("b2", 0.4)])], k=3)
+    assert [(name, item) for name, item, _ in merged] == [("a", "a1"), ("b", "b1"), ("b", "b2")]
+    assert merge_scored([], k=3) == []
+
+
+def test_merge_ranked_uses_weighted_rrf():
+    merged = merge_ranked([("a", ["a1", "a2"]), ("b", ["b1"])], {"b": 2.0}, k=3)
+    assert [item for _, item, _ in merged] == ["b1", "a1", "a2"]
+    assert merged[0][2] == 2.0 / (RRF_K + 1)
+
+
+def test_retriever_merges_hits_across_shards(tmp_path):
+    faq = pd.read_csv(CSV_PATH).fillna("").drop_duplicates("Questions")
+    embeddings = FakeEmbeddings(latency=0.0)
+    for name, rows in (("umum", faq.iloc[:30]), ("lain", faq.iloc[30:60])):
+        csv_path = tmp_path / f"{name}.csv"
+        rows.to_csv(csv_path, index=False)
+        create_faiss_index(incremental=False, csv_path=str(csv_path), index_dir=str(tmp_path / name),
+                           embeddings=embeddings, requests_per_second=1000.0)
+    specs = load_registry(_write_registry(tmp_path, [
+        {"name": "umum", "path": "umum"},
+        {"name": "lain", "path": "lain", "budget_ms": 5000},
+    ]))
+    retriever = FaissRetriever(cache_dir=str(tmp_path / "cache"), embeddings=embeddings,
+                               reload_interval=0, shards=specs, search_mode="vector")
+
+    for _, row in faq.iloc[[5, 40]].iterrows():
+        docs = retriever.search(row["Questions"], k=3)
+        assert str(row["Question_ID"]) in [doc.metadata.get("row_id") for doc in docs]
+    shards = {doc.metadata["shard"] for doc in retriever.search(faq.iloc[40]["Questions"], k=3)}
+    assert "lain" in shards
+    assert all(stats["ok"] >= 1 for stats in retriever.shard_stats().values())
@@ -0,0 +1,92 @@
+# tests/test_upstream.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from upstream import LimitedEmbeddings, UpstreamBusy, UpstreamLimiter
+
+
+def _hold_slot(limiter, entered, release):
+    with limiter.slot():
+        entered.set()
+        release.wait(5)
+
+
+def test_full_queue_is_rejected_immediately():
+    limiter = UpstreamLimiter("cohere", limit=1, max_queue=1, wait_timeout=5)
+    entered, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold_slot, args=(limiter, entered, release))
+    holder.start()
+    assert entered.wait(5)
+
+    # Satu request boleh menunggu di antrean, request berikutnya langsung ditolak
+    waiter_entered, waiter_release = threading.Event(), threading.Event()
+    waiter_release.set()
+    waiter = threading.Thread(target=_hold_slot, args=(limiter, waiter_entered, waiter_release))
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while limiter.stats()["waiting"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    with pytest.raises(UpstreamBusy) as error:
+        with limiter.slot():
+            pass
+    assert error.value.reason == "antrean penuh"
+
+    release.set()
+    holder.join(5)
+    waiter.join(5)
+    assert waiter_entered.is_set()
+    stats = limiter.stats()
+    assert (stats["active"], stats["waiting"], stats["rejected"], stats["completed"]) == (0, 0, 1, 2)
+
+
+def test_wait_timeout_rejects_and_frees_queue():
+    limiter = UpstreamLimiter("gemini", limit=1, max_queue=4, wait_timeout=0.05)
+    entered, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=_hold_slot, args=(limiter, entered, release))
+    holder.start()
+    assert entered.wait(5)
+    with pytest.raises(UpstreamBusy):
+        with limiter.slot():
+            pass
+    release.set()
+    holder.join(5)
+
+    with limiter.slot():
+        assert limiter.stats()["active"] == 1
+    stats = limiter.stats()
+    assert (stats["active"], stats["waiting"], stats["rejected"], stats["completed"]) == (0, 0, 1, 2)
+
+
+def test_slot_is_released_when_call_fails():
+    class Failing:
+        def embed_query(self, text):
+            raise RuntimeError("down")
+
+    limiter = UpstreamLimiter("cohere", limit=1)
+    embeddings = LimitedEmbeddings(Failing(), limiter)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            embeddings.embed_query("halo")
+    assert limiter.stats()["active"] == 0
+
+
+def test_sse_handler_counts_tokens_not_chunks():
+    api_server = pytest.importorskip("api_server")
+    from token_utils import count_tokens
+
+    async def run():
+        events = asyncio.Queue()
+        handler = api_server.SSECallbackHandler(asyncio.get_running_loop(), events)
+        chunks = ["Halo, apa kabar hari ini?", "", " Semoga harimu menyenangkan."]
+        for chunk in chunks:
+            handler.on_llm_new_token(chunk)
+        await asyncio.sleep(0)
+        return handler, events.qsize(), chunks
+
+    handler, queued, chunks = asyncio.run(run())
+    assert handler.chunk_count == 2 and queued == 2
+    assert handler.token_count == sum(count_tokens(chunk) for chunk in chunks if chunk)
+    assert handler.token_count > handler.chunk_count
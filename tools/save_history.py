@@ -1,13 +1,254 @@
 # mental_health_chatbot/tools/save_history_tool.py
+# Riwayat chat append-only di SQLite (mode WAL): penulisan masuk antrean dan di-flush per batch oleh
+# thread latar, jadi thread Streamlit tidak pernah menunggu disk. Index (user, session, ts) membuat
+# pemuatan N giliran terakhir user yang kembali tetap cepat; sesi lama bisa dipadatkan (compaction).
+# Kolom `user` berisi kunci klien yang opaque (client_key), bukan nama yang diketik user: riwayat hanya
+# bisa dimuat ulang oleh pemegang kode riwayat yang dibuat server.
+import atexit
 import json
-from datetime import datetime
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional
 
-def save_chat_history(messages):
+DEFAULT_DB_PATH = "data/chat_history.sqlite"
+FLUSH_INTERVAL = 0.2
+MAX_BATCH = 2000
+# Prefix kunci klien: baris lama yang dikunci nama (sebelum ada kode riwayat) tidak bisa dijangkau lewat kode
+CLIENT_PREFIX = "client:"
+
+
+def new_resume_code() -> str:
+    """Kode riwayat acak (128 bit) yang ditunjukkan ke user untuk melanjutkan percakapan nanti"""
+    return secrets.token_urlsafe(16)
+
+
+def client_key(resume_code: str) -> str:
+    """Kunci riwayat di kolom `user` untuk satu klien (kode riwayat Streamlit / client_id API)"""
+    return CLIENT_PREFIX + resume_code.strip()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    session TEXT NOT NULL,
+    ts REAL NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_user_session_ts ON messages (user, session, ts);
+CREATE INDEX IF NOT EXISTS idx_messages_user_ts ON messages (user, ts);
+CREATE TABLE IF NOT EXISTS archived_sessions (
+    user TEXT NOT NULL,
+    session TEXT NOT NULL,
+    start_ts REAL NOT NULL,
+    end_ts REAL NOT NULL,
+    turns INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (user, session)
+);
+CREATE INDEX IF NOT EXISTS idx_archived_user_end ON archived_sessions (user, end_ts);
+"""
+
+
+class ChatHistoryStore:
+    """Store riwayat chat per user/sesi: append non-blocking, flush batch di latar, baca lewat index"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._local = threading.local()
+        self._saved_counts: Dict[tuple, int] = {}
+        self._counts_lock = threading.Lock()
+        self._closed = False
+        self.appended = 0
+        self.written = 0
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # ---- tulis ----
+
+    def append(self, user: str, session: str, role: str, content: str, ts: Optional[float] = None):
+        """Masukkan satu giliran ke antrean (tidak menunggu disk)"""
+        if self._closed:
+            raise RuntimeError("❌ ChatHistoryStore sudah ditutup")
+        self._queue.put((user, session, ts if ts is not None else time.time(), role, content))
+        self.appended += 1
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Kumpulkan yang sudah antre (atau datang dalam flush_interval) jadi satu transaksi
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < MAX_BATCH and item is not None:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            rows = [row for row in batch if row is not None and not isinstance(row, threading.Event)]
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO messages (user, session, ts, role, content) VALUES (?, ?, ?, ?, ?)", rows
+                        )
+                    self.written += len(rows)
+                except sqlite3.Error as e:
+                    print(f"❌ Gagal menyimpan riwayat chat: {str(e)}")
+            for row in batch:
+                if isinstance(row, threading.Event):
+                    row.set()
+                self._queue.task_done()
+            if None in batch:
+                conn.close()
+                return
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Tunggu sampai semua giliran yang sudah di-append tersimpan"""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=10.0)
+
+    # ---- baca ----
+
+    def load_last_turns(self, user: str, n: int = 10, session: Optional[str] = None) -> List[Dict]:
+        """N giliran terakhir user (opsional satu sesi), urut kronologis"""
+        if session is None:
+            rows = self._reader().execute(
+                "SELECT session, ts, role, content FROM messages WHERE user = ? ORDER BY ts DESC LIMIT ?",
+                (user, n)
+            ).fetchall()
+        else:
+            rows = self._reader().execute(
+                "SELECT session, ts, role, content FROM messages WHERE user = ? AND session = ? "
+                "ORDER BY ts DESC LIMIT ?",
+                (user, session, n)
+            ).fetchall()
+        if len(rows) < n and session is None:
+            rows += self._archived_turns(user, n - len(rows), before=rows[-1][1] if rows else None)
+        return [{"session": s, "ts": ts, "role": role, "content": content} for s, ts, role, content in reversed(rows)]
+
+    def _archived_turns(self, user: str, n: int, before: Optional[float]) -> List[tuple]:
+        rows = []
+        query = "SELECT session, payload FROM archived_sessions WHERE user = ? ORDER BY end_ts DESC"
+        for session, payload in self._reader().execute(query, (user,)):
+            for ts, role, content in reversed(json.loads(zlib.decompress(payload))):
+                if before is None or ts <= before:
+                    rows.append((session, ts, role, content))
+                    if len(rows) >= n:
+                        return rows
+        return rows
+
+    def sessions(self, user: str, limit: int = 20) -> List[Dict]:
+        """Sesi terbaru user beserta jumlah giliran dan waktu terakhir"""
+        rows = self._reader().execute(
+            "SELECT session, COUNT(*), MIN(ts), MAX(ts) FROM messages WHERE user = ? "
+            "GROUP BY session ORDER BY MAX(ts) DESC LIMIT ?",
+            (user, limit)
+        ).fetchall()
+        return [{"session": s, "turns": turns, "start_ts": start, "end_ts": end} for s, turns, start, end in rows]
+
+    # ---- compaction ----
+
+    def compact(self, older_than_days: float = 30.0) -> int:
+        """Padatkan sesi yang tidak aktif: giliran dipindah ke satu blob terkompresi per sesi"""
+        self.flush()
+        cutoff = time.time() - older_than_days * 86400
+        conn = self._connect()
+        try:
+            sessions = conn.execute(
+                "SELECT user, session FROM messages GROUP BY user, session HAVING MAX(ts) < ?", (cutoff,)
+            ).fetchall()
+            for user, session in sessions:
+                turns = conn.execute(
+                    "SELECT ts, role, content FROM messages WHERE user = ? AND session = ? ORDER BY ts",
+                    (user, session)
+                ).fetchall()
+                with conn:
+                    existing = conn.execute(
+                        "SELECT payload FROM archived_sessions WHERE user = ? AND session = ?", (user, session)
+                    ).fetchone()
+                    if existing:
+                        turns = json.loads(zlib.decompress(existing[0])) + [list(t) for t in turns]
+                    conn.execute(
+                        "INSERT OR REPLACE INTO archived_sessions VALUES (?, ?, ?, ?, ?, ?)",
+                        (user, session, turns[0][0], turns[-1][0], len(turns),
+                         zlib.compress(json.dumps(turns, ensure_ascii=False).encode("utf-8")))
+                    )
+                    conn.execute("DELETE FROM messages WHERE user = ? AND session = ?", (user, session))
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return len(sessions)
+        finally:
+            conn.close()
+
+    # ---- kompatibilitas save_chat_history ----
+
+    def save_messages(self, messages: List[Dict], user: str, session: str):
+        """Append hanya pesan yang belum pernah disimpan untuk sesi ini"""
+        key = (user, session)
+        with self._counts_lock:
+            start = self._saved_counts.get(key, 0)
+            if start > len(messages):
+                start = 0
+            self._saved_counts[key] = len(messages)
+        for message in messages[start:]:
+            self.append(user, session, message.get("role", ""), message.get("content", ""))
+
+
+_shared_store: Optional[ChatHistoryStore] = None
+_shared_lock = threading.Lock()
+_default_session = uuid.uuid4().hex
+
+
+def get_history_store() -> ChatHistoryStore:
+    """Store riwayat dipakai bersama satu proses; ditutup (flush) saat proses keluar"""
+    global _shared_store
+    if _shared_store is None:
+        with _shared_lock:
+            if _shared_store is None:
+                _shared_store = ChatHistoryStore(os.getenv("KINDORA_HISTORY_DB", DEFAULT_DB_PATH))
+                atexit.register(_shared_store.close)
+    return _shared_store
+
+
+def save_chat_history(messages, user: str = "anonymous", session: Optional[str] = None):
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"chat_history_{timestamp}.json"
-        
-        with open(filename, "w") as f:
-            json.dump(messages, f, indent=2)
+        get_history_store().save_messages(messages, user, session or _default_session)
     except Exception as e:
         print(f"Error saving chat history: {str(e)}")
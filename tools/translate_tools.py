@@ -1,10 +1,221 @@
-from deep_translator import GoogleTranslator
-from time import sleep
+import asyncio
+import hashlib
+import os
 import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from deep_translator import GoogleTranslator
+from rate_limiter import TokenBucket
+from tracing import traced
+
+DEFAULT_CACHE_PATH = "data/translation_cache.sqlite"
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+# Tiap segmen dalam satu request diberi nomor "[i] " supaya hasilnya bisa dicocokkan ke sumbernya
+_MARKED_LINE = re.compile(r"^\s*\[\s*(\d+)\s*\]\s*(.*)$")
+
+
+class GoogleTranslateBackend:
+    """Backend deep_translator; satu GoogleTranslator per thread per pasangan bahasa (objeknya tidak thread-safe)"""
+
+    name = "google"
+    max_chars = 5000
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        translators = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        translator = translators.get((source, target))
+        if translator is None:
+            translator = translators[(source, target)] = GoogleTranslator(source=source, target=target)
+        return translator.translate(text)
+
+
+class TranslationMemory:
+    """Cache terjemahan persisten (SQLite), key = (hash teks, bahasa sumber, bahasa target)"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "text_hash TEXT, source TEXT, target TEXT, translated TEXT, ts REAL, "
+            "PRIMARY KEY (text_hash, source, target))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: Sequence[str], source: str, target: str) -> Dict[str, str]:
+        hashes = {self.text_hash(text): text for text in texts}
+        found = {}
+        with self._lock:
+            items = list(hashes)
+            for start in range(0, len(items), 500):
+                chunk = items[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, translated FROM translations WHERE source = ? AND target = ? "
+                    f"AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [source, target, *chunk]
+                ).fetchall()
+                found.update({hashes[text_hash]: translated for text_hash, translated in rows})
+        return found
+
+    def put_many(self, pairs: Dict[str, str], source: str, target: str):
+        if not pairs:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                [(self.text_hash(text), source, target, translated, now) for text, translated in pairs.items()]
+            )
+            self._conn.commit()
+
+
+def _mark(segments: List[str]) -> str:
+    return "\n".join(f"[{i}] {segment}" for i, segment in enumerate(segments))
+
+
+def _unmark(result: str, count: int) -> Optional[List[str]]:
+    """Terjemahan per segmen dari hasil bernomor; None kalau nomor hilang, ganda, tak berurutan, atau ada baris
+    tanpa nomor (provider menggabung/memecah segmen)"""
+    translations = []
+    for line in (result or "").split("\n"):
+        if not line.strip():
+            continue
+        match = _MARKED_LINE.match(line)
+        if match is None or int(match.group(1)) != len(translations):
+            return None
+        translations.append(match.group(2).strip())
+    return translations if len(translations) == count else None
+
+
+def _split_long(line: str, max_chars: int) -> List[str]:
+    """Pecah satu baris yang melebihi batas provider di batas kalimat/spasi"""
+    pieces, current = [], ""
+    for sentence in re.split(r"(?<=[.!?])\s+", line):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
 
 class TranslationService:
     MAX_RETRIES = 3
     BASE_DELAY = 1.5
+    FAILED_MESSAGE = "Translation failed after multiple attempts."
+
+    def __init__(self, backend=None, memory: Optional[TranslationMemory] = None,
+                 rate_limiter: Optional[TokenBucket] = None):
+        self.backend = backend or GoogleTranslateBackend()
+        self.memory = memory if memory is not None else TranslationMemory()
+        # Hanya menunda kalau batas request benar-benar hampir tercapai (pengganti sleep tetap 1.5-3 detik)
+        self.rate_limiter = rate_limiter or TokenBucket(DEFAULT_REQUESTS_PER_SECOND)
+        self.max_chars = getattr(self.backend, "max_chars", 5000)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.cache_hits = 0
+
+    def _call(self, text: str, source: str, target: str) -> str:
+        for attempt in range(self.MAX_RETRIES):
+            self.rate_limiter.acquire()
+            with self._lock:
+                self.requests += 1
+            try:
+                return self.backend.translate(text, source, target)
+            except Exception as e:
+                print(f"Translation failed on attempt {attempt + 1}: {e}")
+                if attempt + 1 < self.MAX_RETRIES:
+                    time.sleep(self.BASE_DELAY * (2 ** attempt) * random.uniform(0.5, 1.0))
+        raise RuntimeError(self.FAILED_MESSAGE)
+
+    def _pack(self, segments: List[str]) -> List[List[str]]:
+        """Kelompokkan segmen (bernomor, dipisah newline) supaya tiap request di bawah batas karakter provider"""
+        chunks, current, size = [], [], 0
+        for segment in segments:
+            length = len(segment) + len(f"[{len(current)}] ")
+            if current and size + 1 + length > self.max_chars:
+                chunks.append(current)
+                current, size = [], 0
+                length = len(segment) + len("[0] ")
+            current.append(segment)
+            size += length + (1 if size else 0)
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _translate_segments(self, segments: List[str], source: str, target: str) -> Dict[str, str]:
+        translated = {}
+        for chunk in self._pack(segments):
+            if len(chunk) == 1:
+                translated[chunk[0]] = self._call(chunk[0], source, target)
+                continue
+            lines = _unmark(self._call(_mark(chunk), source, target), len(chunk))
+            if lines is not None:
+                translated.update(zip(chunk, lines))
+            else:
+                # Nomor segmen tidak utuh: pasangan sumber-terjemahan tidak bisa dipastikan, jangan sampai
+                # terjemahan yang tertukar masuk cache permanen; terjemahkan segmen satu per satu
+                translated.update({segment: self._call(segment, source, target) for segment in chunk})
+        return translated
+
+    def translate_batch(self, texts: Sequence[str], target: str, source: str = "auto") -> List[str]:
+        """Terjemahkan banyak teks sekaligus; segmen yang sudah pernah diterjemahkan diambil dari cache"""
+        plans = []
+        for text in texts:
+            plan = []
+            for line in (text or "").split("\n"):
+                stripped = line.strip()
+                plan.append(_split_long(stripped, self.max_chars) if stripped else [])
+            plans.append(plan)
+
+        segments = list(dict.fromkeys(piece for plan in plans for pieces in plan for piece in pieces))
+        known = self.memory.get_many(segments, source, target)
+        with self._lock:
+            self.cache_hits += len(known)
+        missing = [segment for segment in segments if segment not in known]
+        if missing:
+            fresh = self._translate_segments(missing, source, target)
+            self.memory.put_many(fresh, source, target)
+            known.update(fresh)
+
+        return ["\n".join(" ".join(known[piece] for piece in pieces) for pieces in plan) for plan in plans]
+
+    def translate(self, text: str, target: str, source: str = "auto") -> str:
+        if not text:
+            return ""
+        return self.translate_batch([text], target, source)[0]
+
+    async def atranslate(self, text: str, target: str, source: str = "auto") -> str:
+        return await asyncio.to_thread(self.translate, text, target, source)
+
+    async def atranslate_batch(self, texts: Sequence[str], target: str, source: str = "auto") -> List[str]:
+        return await asyncio.to_thread(self.translate_batch, texts, target, source)
+
+    def stats(self) -> Dict[str, float]:
+        return {"requests": self.requests, "cache_hits": self.cache_hits,
+                "rate_limit_wait_seconds": round(self.rate_limiter.waited_seconds, 3)}
 
     @staticmethod
     def translate_to_indonesian(text: str) -> str:
@@ -15,17 +226,28 @@ class TranslationService:
         return TranslationService._translate(text, target='en')
 
     @staticmethod
+    @traced("tool.terjemah_bahasa")
     def _translate(text: str, target: str) -> str:
         if not text:
             return ""
-        
-        for attempt in range(TranslationService.MAX_RETRIES):
-            try:
-                # Translate using Google Translator
-                translated_text = GoogleTranslator(target=target).translate(text)
-                sleep(random.uniform(TranslationService.BASE_DELAY, TranslationService.BASE_DELAY * 2))
-                return translated_text
-            except Exception as e:
-                print(f"Translation failed on attempt {attempt + 1}: {e}")
-                sleep(TranslationService.BASE_DELAY)
-        return "Translation failed after multiple attempts."
+        try:
+            return get_translation_service().translate(text, target)
+        except Exception:
+            return TranslationService.FAILED_MESSAGE
+
+
+_shared_service: Optional[TranslationService] = None
+_shared_lock = threading.Lock()
+
+
+def get_translation_service() -> TranslationService:
+    """Service terjemahan dipakai bersama (rate limit dan cache berlaku untuk semua sesi)"""
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                _shared_service = TranslationService(
+                    memory=TranslationMemory(os.getenv("KINDORA_TRANSLATION_CACHE", DEFAULT_CACHE_PATH)),
+                    rate_limiter=TokenBucket(float(os.getenv("KINDORA_TRANSLATE_RPS", DEFAULT_REQUESTS_PER_SECOND)))
+                )
+    return _shared_service
@@ -0,0 +1,352 @@
+# tracing.py
+# Tracing ringan per tahap (embed query, FAISS, prompt, Gemini, fallback Google) dengan span bersarang,
+# hitungan token prompt/jawaban, dan estimasi biaya per request. Agregat per tahap selalu dihitung
+# (murah: satu update dict), detail span dan hitungan token hanya untuk trace yang ter-sample dan disimpan
+# di ring buffer, lalu diekspor ke endpoint teks bergaya Prometheus. Ekspor ke file JSONL opsional
+# (KINDORA_TRACE_FILE=data/traces.jsonl) dan dirotasi begitu melewati KINDORA_TRACE_FILE_MAX_MB.
+
+import functools
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from token_utils import count_tokens
+
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_BUFFER_SIZE = 500
+DEFAULT_TRACE_FILE_MAX_MB = 50
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Harga USD per 1.000 token (prompt, jawaban); bisa ditimpa lewat env KINDORA_PRICE_<MODEL>="in,out"
+MODEL_PRICES = {
+    "gemini-1.5-flash": (0.000075, 0.0003),
+    "gemini-1.5-pro": (0.00125, 0.005),
+}
+
+
+def model_price(model: str):
+    override = os.getenv("KINDORA_PRICE_" + model.upper().replace("-", "_").replace(".", "_"))
+    if override:
+        prompt_price, completion_price = (float(part) for part in override.split(","))
+        return prompt_price, completion_price
+    return MODEL_PRICES.get(model, (0.0, 0.0))
+
+
+class Span:
+    """Satu tahap dalam trace; durasi dalam detik"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "start", "_t0",
+                 "duration", "attributes", "status", "children")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16] if sampled else ""
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration = 0.0
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.children: List["Span"] = []
+
+    def set(self, **attributes):
+        if self.sampled:
+            self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("kindora_current_span", default=None)
+
+
+class _StageStats:
+    __slots__ = ("count", "errors", "total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class Tracer:
+    """Span bersarang via contextvars; trace ter-sample masuk ring buffer dan antrean ekspor JSONL"""
+
+    def __init__(self, sample_rate: float = DEFAULT_SAMPLE_RATE, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 jsonl_path: Optional[str] = None, max_file_bytes: int = DEFAULT_TRACE_FILE_MAX_MB * 1024 * 1024):
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.jsonl_path = jsonl_path
+        self.max_file_bytes = max_file_bytes
+        self._traces: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _StageStats] = {}
+        self._tokens: Dict[str, List[float]] = {}
+        self._export_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._metric_sources: Dict[object, Callable[[], List[str]]] = {}
+
+    # ---- span ----
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Span anak dari span aktif; tanpa span aktif, span ini menjadi root trace baru (di-sample)"""
+        parent = _current_span.get()
+        if parent is None:
+            sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+            span = Span(name, uuid.uuid4().hex if sampled else "", None, sampled, attributes if sampled else None)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, parent.sampled,
+                        attributes if parent.sampled else None)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception:
+            # Hanya Exception: st.rerun()/st.stop() (ScriptControlException turunan BaseException),
+            # KeyboardInterrupt dan GeneratorExit adalah alur kontrol, bukan kegagalan tahap
+            span.status = "error"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration = time.perf_counter() - span._t0
+            self._observe(name, span.duration, span.status == "error")
+            if span.sampled:
+                if parent is not None:
+                    parent.children.append(span)
+                else:
+                    self._finish_trace(span)
+
+    def set_attributes(self, **attributes):
+        """Tambah atribut ke span aktif (diabaikan kalau trace tidak di-sample)"""
+        span = _current_span.get()
+        if span is not None and span.sampled:
+            span.set(**attributes)
+
+    def record_tokens(self, model: str, prompt: str, completion: str) -> Dict[str, Any]:
+        """Hitung token prompt/jawaban + biaya, tambahkan ke agregat dan span aktif.
+
+        Tokenisasi hanya untuk trace yang ter-sample; panggilan yang tidak ter-sample cukup dihitung
+        jumlahnya (dict kosong dikembalikan).
+        """
+        span = _current_span.get()
+        if span is None or not span.sampled:
+            with self._lock:
+                self._tokens.setdefault(model, [0, 0, 0.0, 0])[3] += 1
+            return {}
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(completion)
+        prompt_price, completion_price = model_price(model)
+        cost = prompt_tokens / 1000 * prompt_price + completion_tokens / 1000 * completion_price
+        with self._lock:
+            totals = self._tokens.setdefault(model, [0, 0, 0.0, 0])
+            totals[0] += prompt_tokens
+            totals[1] += completion_tokens
+            totals[2] += cost
+            totals[3] += 1
+        usage = {"model": model, "prompt_tokens": prompt_tokens,
+                 "completion_tokens": completion_tokens, "cost_usd": round(cost, 8)}
+        self.set_attributes(**usage)
+        return usage
+
+    # ---- agregat & ekspor ----
+
+    def _observe(self, name: str, seconds: float, error: bool):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = _StageStats()
+            stats.count += 1
+            stats.total += seconds
+            stats.errors += error
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+                    break
+
+    def _finish_trace(self, root: Span):
+        record = {"trace_id": root.trace_id, **root.to_dict()}
+        self._traces.append(record)
+        if self.jsonl_path:
+            self._export_queue.put(record)
+            if self._writer is None:
+                with self._lock:
+                    if self._writer is None:
+                        self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+                        self._writer.start()
+
+    def _write_loop(self):
+        # Tulis JSONL di thread terpisah supaya request tidak menunggu disk
+        os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+        while True:
+            records = [self._export_queue.get()]
+            while True:
+                try:
+                    records.append(self._export_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._rotate_if_full()
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"❌ Gagal menulis trace: {str(e)}")
+
+    def _rotate_if_full(self):
+        """File trace yang melewati batas dipindah ke <file>.1 (menimpa rotasi sebelumnya)"""
+        if self.max_file_bytes <= 0:
+            return
+        try:
+            if os.path.getsize(self.jsonl_path) < self.max_file_bytes:
+                return
+        except FileNotFoundError:
+            return
+        os.replace(self.jsonl_path, self.jsonl_path + ".1")
+
+    def recent(self, n: int = 20) -> List[Dict[str, Any]]:
+        """Trace ter-sample terbaru (paling baru di akhir)"""
+        return list(self._traces)[-n:]
+
+    def register_metrics(self, source: Callable[[], List[str]], name: Optional[str] = None):
+        """Tambahkan baris metrik dari komponen lain (mis. pool client LLM) ke /metrics.
+
+        Sumber dengan name yang sama menggantikan yang lama (mis. retriever yang dibuat ulang).
+        """
+        self._metric_sources[name or source] = source
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {"count": s.count, "errors": s.errors,
+                       "avg_ms": round(s.total / s.count * 1000, 3) if s.count else 0.0}
+                for name, s in self._stages.items()
+            }
+
+    def prometheus_text(self) -> str:
+        """Metrik dalam format teks Prometheus"""
+        lines = [
+            "# HELP kindora_stage_seconds Durasi tiap tahap request",
+            "# TYPE kindora_stage_seconds histogram",
+        ]
+        with self._lock:
+            for name, s in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, s.buckets):
+                    cumulative += count
+                    lines.append(f'kindora_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'kindora_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {s.count}')
+                lines.append(f'kindora_stage_seconds_sum{{stage="{name}"}} {s.total:.6f}')
+                lines.append(f'kindora_stage_seconds_count{{stage="{name}"}} {s.count}')
+            lines += ["# HELP kindora_stage_errors_total Tahap yang gagal",
+                      "# TYPE kindora_stage_errors_total counter"]
+            lines += [f'kindora_stage_errors_total{{stage="{name}"}} {s.errors}'
+                      for name, s in sorted(self._stages.items())]
+            lines += ["# HELP kindora_tokens_total Token LLM per model (hanya trace ter-sample)",
+                      "# TYPE kindora_tokens_total counter"]
+            for model, (prompt_tokens, completion_tokens, _, _) in sorted(self._tokens.items()):
+                lines.append(f'kindora_tokens_total{{model="{model}",kind="prompt"}} {prompt_tokens}')
+                lines.append(f'kindora_tokens_total{{model="{model}",kind="completion"}} {completion_tokens}')
+            lines += ["# HELP kindora_llm_cost_usd_total Estimasi biaya LLM (hanya trace ter-sample)",
+                      "# TYPE kindora_llm_cost_usd_total counter"]
+            lines += [f'kindora_llm_cost_usd_total{{model="{model}"}} {totals[2]:.8f}'
+                      for model, totals in sorted(self._tokens.items())]
+            lines += ["# HELP kindora_llm_calls_total Panggilan LLM",
+                      "# TYPE kindora_llm_calls_total counter"]
+            lines += [f'kindora_llm_calls_total{{model="{model}"}} {totals[3]}'
+                      for model, totals in sorted(self._tokens.items())]
+        lines += ["# TYPE kindora_trace_sample_rate gauge", f"kindora_trace_sample_rate {self.sample_rate}"]
+        for source in list(self._metric_sources.values()):
+            try:
+                lines += source()
+            except Exception as e:
+                print(f"⚠️ Sumber metrik gagal: {str(e)}")
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Endpoint /metrics (Prometheus) dan /traces (JSON trace terbaru) di thread latar"""
+        if self._server is not None:
+            return self._server
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics"):
+                    body, content_type = tracer.prometheus_text().encode("utf-8"), "text/plain; version=0.0.4"
+                elif self.path.startswith("/traces"):
+                    body, content_type = json.dumps(tracer.recent(50)).encode("utf-8"), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        return self._server
+
+
+_shared_tracer: Optional[Tracer] = None
+_shared_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Tracer dipakai bersama satu proses; dikonfigurasi lewat env KINDORA_TRACE_* (file JSONL opt-in)"""
+    global _shared_tracer
+    if _shared_tracer is None:
+        with _shared_lock:
+            if _shared_tracer is None:
+                _shared_tracer = Tracer(
+                    sample_rate=float(os.getenv("KINDORA_TRACE_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)),
+                    buffer_size=int(os.getenv("KINDORA_TRACE_BUFFER", DEFAULT_BUFFER_SIZE)),
+                    jsonl_path=os.getenv("KINDORA_TRACE_FILE") or None,
+                    max_file_bytes=int(float(os.getenv("KINDORA_TRACE_FILE_MAX_MB", DEFAULT_TRACE_FILE_MAX_MB))
+                                       * 1024 * 1024),
+                )
+                port = os.getenv("KINDORA_METRICS_PORT")
+                if port:
+                    try:
+                        _shared_tracer.start_http_server(int(port))
+                    except OSError as e:
+                        print(f"⚠️ Endpoint metrik tidak bisa dibuka di port {port}: {str(e)}")
+    return _shared_tracer
+
+
+def traced(name: Optional[str] = None):
+    """Dekorator dengan tracer bersama (tracer diambil saat fungsi dipanggil, bukan saat import)"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,126 @@
+# upstream.py
+# Batas konkurensi per layanan hulu (Cohere, Gemini, pencarian web, parsing PDF) dengan antrean
+# terbatas: kalau slot penuh, request menunggu; kalau antrean juga penuh, langsung ditolak
+# (backpressure) daripada menumpuk thread yang menunggu tanpa batas.
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+class UpstreamBusy(RuntimeError):
+    """Layanan hulu penuh (antrean penuh atau menunggu slot terlalu lama)"""
+
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"❌ Layanan {name} sedang penuh: {reason}")
+        self.name = name
+        self.reason = reason
+
+
+class UpstreamLimiter:
+    """Semaphore dengan batas antrean dan batas waktu tunggu, plus statistik untuk /metrics"""
+
+    def __init__(self, name: str, limit: int, max_queue: int = 64, wait_timeout: Optional[float] = 30.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise UpstreamBusy(self.name, "antrean penuh")
+            self.waiting += 1
+        start = time.perf_counter()
+        acquired = self._semaphore.acquire(timeout=self.wait_timeout if self.wait_timeout is not None else -1)
+        with self._lock:
+            self.waiting -= 1
+            self.wait_seconds += time.perf_counter() - start
+            if not acquired:
+                self.rejected += 1
+            else:
+                self.active += 1
+        if not acquired:
+            raise UpstreamBusy(self.name, "menunggu slot terlalu lama")
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"limit": self.limit, "active": self.active, "waiting": self.waiting,
+                    "completed": self.completed, "rejected": self.rejected,
+                    "wait_seconds": round(self.wait_seconds, 3)}
+
+
+class LimitedEmbeddings(Embeddings):
+    """Embeddings yang tiap panggilannya memakai satu slot limiter"""
+
+    def __init__(self, base: Embeddings, limiter: UpstreamLimiter):
+        self.base = base
+        self.limiter = limiter
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self.limiter.slot():
+            return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self.limiter.slot():
+            return self.base.embed_query(text)
+
+    def embed(self, texts: List[str], input_type: Optional[str] = None) -> List[List[float]]:
+        """Batch dengan input_type (dipakai EmbeddingCoalescer untuk batch query)"""
+        with self.limiter.slot():
+            embed = getattr(self.base, "embed", None)
+            if callable(embed):
+                return embed(texts, input_type=input_type)
+            return self.base.embed_documents(texts)
+
+
+class LimitedLLM:
+    """Pembungkus chat model untuk _generate: slot dipegang selama invoke/stream berjalan"""
+
+    def __init__(self, llm, limiter: UpstreamLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    @property
+    def model(self) -> str:
+        return getattr(self.llm, "model", None) or self.llm._llm_type
+
+    def invoke(self, prompt, config=None, **kwargs):
+        with self.limiter.slot():
+            return self.llm.invoke(prompt, config=config, **kwargs)
+
+    def stream(self, prompt, config=None, **kwargs) -> Iterator:
+        with self.limiter.slot():
+            yield from self.llm.stream(prompt, config=config, **kwargs)
+
+
+class LimitedSearchBackend:
+    """Backend SearchService dengan slot limiter"""
+
+    def __init__(self, backend, limiter: UpstreamLimiter):
+        self.backend = backend
+        self.limiter = limiter
+        self.name = getattr(backend, "name", type(backend).__name__)
+
+    def __call__(self, query: str, num_results: int = 10, lang: str = "id") -> List[str]:
+        with self.limiter.slot():
+            return self.backend(query, num_results=num_results, lang=lang)